@@ -1,20 +1,24 @@
-import csv
-import os
+import json
+import uuid
+from pathlib import Path
 
 from django import forms
 from django.contrib import admin, messages
 from django.contrib.admin import action
-from django.core.files.storage import FileSystemStorage
-from django.core.files.uploadedfile import TemporaryUploadedFile
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import redirect, render
-from django.urls import path
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import (HttpResponse, HttpResponseNotAllowed,
+                         HttpResponseRedirect, JsonResponse)
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import path, reverse
 from django.utils.html import format_html
 
-from offersAdmin.settings.base import MEDIA_ROOT
-
-from .models import (Offer, OfferChoices, OfferWall, OfferWallOffer,
+from .assignments import assign_offers, unassign_offers
+from .images import ImageProcessingError, queue_offer_image
+from .models import (Offer, OfferImportJob, OfferWall, OfferWallOffer,
                      OfferWallPopupOffer)
+from .notifications import collect_changes, publish_offer_changes
+from .ranking import renormalize
 
 
 def authenticated_only(view):
@@ -26,28 +30,255 @@ def authenticated_only(view):
     return wrapper
 
 
-class OfferWallOfferInline(admin.TabularInline):
-    model = OfferWallOffer
+class ChangeFeedMixin:
+    """Publish a single change notification per admin request."""
+
+    def changeform_view(self, *args, **kwargs):
+        with collect_changes():
+            return super().changeform_view(*args, **kwargs)
+
+    def changelist_view(self, *args, **kwargs):
+        with collect_changes():
+            return super().changelist_view(*args, **kwargs)
+
+    def delete_view(self, *args, **kwargs):
+        with collect_changes():
+            return super().delete_view(*args, **kwargs)
+
+
+class BulkAssignmentForm(forms.Form):
+    """Second step of the bulk (un)assignment actions."""
+
+    popup = forms.BooleanField(required=False, label="Popup offers")
+    position = forms.IntegerField(
+        min_value=0,
+        required=False,
+        help_text="Number of offers to keep in front of the new ones on each "
+        "wall. Leave empty to add them at the end.",
+    )
+
+    def __init__(self, *args, targets, label, assign, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["targets"] = forms.ModelMultipleChoiceField(
+            queryset=targets,
+            label=label,
+            widget=forms.SelectMultiple(attrs={"size": 20}),
+        )
+        if not assign:
+            del self.fields["position"]
+
+
+def bulk_assignment_action(modeladmin, request, selected, assign):
+    """
+    Ask for the offers or offerwalls to pair with the ``selected`` ones, then
+    add or remove all the pairs in one statement.
+    """
+    if selected.model is Offer:
+        targets, label = OfferWall.objects.order_by("name"), "Offerwalls"
+    else:
+        targets, label = Offer.objects.order_by("name"), "Offers"
+    form = BulkAssignmentForm(
+        request.POST if "apply" in request.POST else None,
+        targets=targets,
+        label=label,
+        assign=assign,
+    )
+    if form.is_valid():
+        offers, walls = selected, form.cleaned_data["targets"]
+        if selected.model is OfferWall:
+            offers, walls = walls, offers
+        popup = form.cleaned_data["popup"]
+        if assign:
+            count = assign_offers(
+                offers, walls, popup=popup, position=form.cleaned_data["position"]
+            )
+            modeladmin.message_user(request, f"Added {count} offer assignments.")
+        else:
+            count = unassign_offers(offers, walls, popup=popup)
+            modeladmin.message_user(request, f"Removed {count} offer assignments.")
+        return None
+
+    return render(
+        request,
+        "admin/core/bulk_assignment.html",
+        {
+            **modeladmin.admin_site.each_context(request),
+            "title": f"{'Add' if assign else 'Remove'} offers",
+            "opts": modeladmin.model._meta,
+            "form": form,
+            "selected": selected,
+            "action": request.POST["action"],
+            "select_across": request.POST.get("select_across", "0"),
+            "assign": assign,
+        },
+    )
+
+
+class AssignedOfferSelect(AutocompleteSelect):
+    """
+    Offer autocomplete that labels the row's current offer from the
+    instance instead of querying it once per row.
+    """
+
+    offer = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.offer is None or [str(v) for v in value] != [str(self.offer.pk)]:
+            return super().optgroups(name, value, attr)
+        label = self.choices.field.label_from_instance(self.offer)
+        option = self.create_option(name, self.offer.pk, label, True, 0)
+        return [(None, [option], 0)]
+
+
+class AssignmentForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.offer_id is not None:
+            widget = self.fields["offer"].widget
+            # Unwrap the admin's RelatedFieldWidgetWrapper
+            getattr(widget, "widget", widget).offer = self.instance.offer
+
+
+class AssignmentInline(admin.TabularInline):
+    """
+    Offers of a wall as cards with an offer autocomplete (searching
+    OfferAdmin) rather than a <select> of every offer per card.
+    """
+
+    form = AssignmentForm
     extra = 0
-    ordering = ["order"]
+    ordering = ["order", "id"]
+    autocomplete_fields = ("offer",)
     template = "admin/offerwalloffer_inline.html"
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("offer", "offer_wall")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "offer":
+            kwargs["widget"] = AssignedOfferSelect(
+                db_field, self.admin_site, using=kwargs.get("using")
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
-class OfferWallPopupOfferInline(admin.TabularInline):
+class OfferWallOfferInline(AssignmentInline):
+    model = OfferWallOffer
+
+
+class OfferWallPopupOfferInline(AssignmentInline):
     model = OfferWallPopupOffer
-    extra = 0
-    ordering = ["order"]
-    template = "admin/offerwalloffer_inline.html"
 
 
 @admin.register(OfferWall)
-class OfferWallAdmin(admin.ModelAdmin):
+class OfferWallAdmin(ChangeFeedMixin, admin.ModelAdmin):
     list_display = ("name", "token", "url_link", "description_preview")
     search_fields = ("token", "url", "description")
     ordering = ("name",)
     readonly_fields = ("token",)
     inlines = [OfferWallOfferInline, OfferWallPopupOfferInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # The inline writes dense positions; keep gaps for move_offer().
+        # Ranks aren't published, so the order readers see is unchanged.
+        for model in (OfferWallOffer, OfferWallPopupOffer):
+            renormalize(model, [form.instance.token])
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path("<uuid:token>/reorder/", self.reorder, name="offerwall_reorder"),
+            path(
+                "assign/",
+                self.bulk_assignments,
+                {"assign": True},
+                name="offerwall_assign",
+            ),
+            path(
+                "unassign/",
+                self.bulk_assignments,
+                {"assign": False},
+                name="offerwall_unassign",
+            ),
+        ]
+        return custom_urls + urls
+
+    @authenticated_only
+    def bulk_assignments(self, request, assign):
+        """
+        POST ``{"offers": [<uuid>, ...], "walls": [<token>, ...]}`` to add
+        (``assign/``) or remove (``unassign/``) every offer on every wall.
+        ``"popup": true`` targets popup offers; ``"position": <n>`` puts added
+        offers after the first n offers of each wall instead of at the end.
+        """
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not self.has_change_permission(request):
+            return JsonResponse({"error": "Permission denied"}, status=403)
+
+        try:
+            data = json.loads(request.body)
+            offers = [uuid.UUID(str(value)) for value in data["offers"]]
+            walls = [uuid.UUID(str(value)) for value in data["walls"]]
+            popup = bool(data.get("popup", False))
+            position = data.get("position")
+            if position is not None and (not isinstance(position, int) or position < 0):
+                raise ValueError("position must be a non-negative integer")
+            with collect_changes():
+                if assign:
+                    count = assign_offers(offers, walls, popup, position)
+                else:
+                    count = unassign_offers(offers, walls, popup)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+        return JsonResponse({"assigned" if assign else "removed": count})
+
+    @action(description="Add offers to selected offerwalls")
+    def add_offers(self, request, queryset):
+        return bulk_assignment_action(self, request, queryset, assign=True)
+
+    @action(description="Remove offers from selected offerwalls")
+    def remove_offers(self, request, queryset):
+        return bulk_assignment_action(self, request, queryset, assign=False)
+
+    actions = ["add_offers", "remove_offers"]
+
+    @authenticated_only
+    def reorder(self, request, token):
+        """
+        POST ``{"offers": [<offer uuid>, ...]}`` to apply a full new order in
+        one statement, or ``{"offer": <uuid>, "before": <uuid or null>}`` to
+        move a single offer. ``"popup": true`` orders the popup offers.
+        """
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not self.has_change_permission(request):
+            return JsonResponse({"error": "Permission denied"}, status=403)
+        offerwall = get_object_or_404(OfferWall, token=token)
+
+        try:
+            data = json.loads(request.body)
+            popup = bool(data.get("popup", False))
+            if "offers" in data:
+                changed = offerwall.reorder_offers(
+                    [uuid.UUID(str(value)) for value in data["offers"]], popup=popup
+                )
+            else:
+                before = data.get("before")
+                changed = offerwall.move_offer(
+                    uuid.UUID(str(data["offer"])),
+                    before=None if before is None else uuid.UUID(str(before)),
+                    popup=popup,
+                )
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return JsonResponse({"error": f"Invalid request: {e}"}, status=400)
+        except ObjectDoesNotExist:
+            return JsonResponse(
+                {"error": "The offer is not on this offerwall"}, status=400
+            )
+        return JsonResponse({"changed": changed})
+
     def url_link(self, obj):
         if obj.url:
             return format_html('<a href="{}" target="_blank">{}</a>', obj.url, obj.url)
@@ -65,6 +296,55 @@ class OfferWallAdmin(admin.ModelAdmin):
     description_preview.admin_order_field = "description"
 
 
+def import_job_state(job):
+    """What the import progress page polls for."""
+    eta = job.eta_seconds()
+    return {
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "finished": job.finished,
+        "percent": round(job.progress() * 100, 1),
+        "rows_done": job.rows_done,
+        "rows_rejected": job.rows_rejected,
+        "offers_saved": job.offers_saved,
+        "eta_seconds": None if eta is None else round(eta),
+        "errors": job.errors,
+        "message": job.message,
+    }
+
+
+@admin.register(OfferImportJob)
+class OfferImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "original_name",
+        "status",
+        "rows_done",
+        "rows_rejected",
+        "offers_saved",
+        "created_by",
+        "created_at",
+        "finished_at",
+        "progress_link",
+    )
+    list_filter = ("status",)
+    search_fields = ("original_name",)
+    readonly_fields = [field.name for field in OfferImportJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def progress_link(self, obj):
+        return format_html(
+            '<a href="{}">Progress</a>',
+            reverse("admin:offer_import_job", args=[obj.pk]),
+        )
+
+    progress_link.short_description = "Progress"
+
+
 class CSVImportForm(forms.Form):
     csv_file = forms.FileField()
 
@@ -96,10 +376,11 @@ class AddImagesForm(forms.Form):
 
 
 @admin.register(Offer)
-class OfferAdmin(admin.ModelAdmin):
+class OfferAdmin(ChangeFeedMixin, admin.ModelAdmin):
     list_display = ("name", "offer_image", "url_link", "is_active")
     list_filter = ("name", "is_active")
     search_fields = ("uuid", "name", "url")
+    ordering = ("name",)
     readonly_fields = ("uuid",)
     list_editable = ("is_active",)
 
@@ -110,6 +391,16 @@ class OfferAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path("import-csv/", self.import_csv, name="offer_import_csv"),
+            path(
+                "import-jobs/<int:job_id>/",
+                self.import_job,
+                name="offer_import_job",
+            ),
+            path(
+                "import-jobs/<int:job_id>/status/",
+                self.import_job_status,
+                name="offer_import_job_status",
+            ),
             path("add-images/", self.add_images, name="offer_add_images"),
         ]
         return custom_urls + urls
@@ -126,69 +417,14 @@ class OfferAdmin(admin.ModelAdmin):
                     messages.error(request, "Please upload a CSV file.")
                     return HttpResponseRedirect(request.path_info)
 
-                # Read and decode the CSV file
-                try:
-                    decoded_file = csv_file.read().decode("utf-8").splitlines()
-                    reader = csv.DictReader(decoded_file)
-
-                    # Validate required fields
-                    required_fields = {
-                        "id",
-                        "name",
-                        "sum_to",
-                        "term_to",
-                        "percent_rate",
-                        "status",
-                        "url",
-                    }
-                    if not all(field in reader.fieldnames for field in required_fields):
-                        missing_fields = required_fields - set(reader.fieldnames)
-                        messages.error(
-                            request,
-                            f"CSV is missing required fields.\nMissing fields: {missing_fields}",
-                        )
-                        return HttpResponseRedirect(request.path_info)
-                    # Process each row
-                    choices = [choice[1] for choice in OfferChoices.choices]
-                    for row in reader:
-                        try:
-                            # Convert status to boolean
-                            status = row["status"].lower() == "true"
-                            if row["name"] not in choices:
-                                messages.warning(
-                                    request,
-                                    f'Invalid offer name in row {row["id"]}: {row["name"]}',
-                                )
-                                continue
-
-                            # Create or update Offer object
-                            # Note: Assuming your Offer model has these fields
-                            offer, created = self.model.objects.update_or_create(
-                                name=row["name"],
-                                defaults={
-                                    "id": int(row["id"]),
-                                    "sum_to": row["sum_to"],
-                                    "term_to": int(row["term_to"]),
-                                    "percent_rate": int(row["percent_rate"]),
-                                    "is_active": status,
-                                    # Add url if it exists in CSV, otherwise set as empty
-                                    "url": row.get("url", ""),
-                                },
-                            )
-                        except (ValueError, KeyError) as e:
-                            messages.warning(
-                                request, f'Error in row {row["id"]}: {str(e)}'
-                            )
-                            continue
-
-                    messages.success(
-                        request, "CSV file has been imported successfully!"
-                    )
-                    return redirect("..")
-
-                except Exception as e:
-                    messages.error(request, f"Error processing file: {str(e)}")
-                    return HttpResponseRedirect(request.path_info)
+                # Imported by a process_import_jobs worker, not this request
+                job = OfferImportJob.objects.create(
+                    file=csv_file,
+                    original_name=csv_file.name,
+                    bytes_total=csv_file.size,
+                    created_by=request.user,
+                )
+                return redirect("admin:offer_import_job", job_id=job.pk)
 
         # If GET request or form invalid, show the form
         form = CSVImportForm()
@@ -198,6 +434,32 @@ class OfferAdmin(admin.ModelAdmin):
             {"form": form, "title": "Import CSV"},
         )
 
+    @authenticated_only
+    def import_job(self, request, job_id):
+        job = get_object_or_404(OfferImportJob, pk=job_id)
+        return render(
+            request,
+            "admin/core/offer/import_job.html",
+            {
+                "job": job,
+                "state": import_job_state(job),
+                "title": f"Import of {job.original_name}",
+            },
+        )
+
+    @authenticated_only
+    def import_job_status(self, request, job_id):
+        job = get_object_or_404(OfferImportJob, pk=job_id)
+        return JsonResponse(import_job_state(job))
+
+    def get_search_results(self, request, queryset, search_term):
+        # A pasted UUID is a primary key lookup, not a substring search
+        try:
+            offer_uuid = uuid.UUID(search_term.strip())
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(uuid=offer_uuid), False
+
     def url_link(self, obj):
         if obj.url:
             return format_html('<a href="{}" target="_blank">{}</a>', obj.url, obj.url)
@@ -206,9 +468,11 @@ class OfferAdmin(admin.ModelAdmin):
     url_link.short_description = "Redirect URL"
 
     def offer_image(self, obj):
+        # The smallest variant is plenty for the change list
+        src = obj.images[0]["url"] if obj.images else f"/media/offers/{obj.name}.png"
         return format_html(
             '<img src="{}" alt="Offer Image" style="max-width: 100px; max-height: 100px;">',
-            "/media/offers/" + obj.name + ".png",
+            src,
         )
 
     offer_image.short_description = "Offer Image"
@@ -218,32 +482,28 @@ class OfferAdmin(admin.ModelAdmin):
         if request.method == "POST":
             form = AddImagesForm(request.POST, request.FILES)
             if form.is_valid():
-                images = request.FILES.getlist("images")
-                clean_images = []
-                try:
-                    for image in images:
-                        image: TemporaryUploadedFile
-                        if image.name.endswith(".png"):
-                            clean_images.append(image)
-                        else:
-                            messages.error(
-                                request,
-                                f"Invalid image file: {image.name}. Only PNG files are allowed.",
-                            )
-                    for clean_image in clean_images:
-                        img_path = os.path.join(MEDIA_ROOT, "offers", clean_image.name)
-                        if os.path.exists(img_path):
-                            os.remove(img_path)
-                        FileSystemStorage(location="media/offers").save(
-                            clean_image.name,
-                            clean_image,
+                queued = 0
+                for image in request.FILES.getlist("images"):
+                    if not image.name.endswith(".png"):
+                        messages.error(
+                            request,
+                            f"Invalid image file: {image.name}. Only PNG files are allowed.",
                         )
-                    messages.success(request, "Images have been added successfully!")
-                    return redirect("..")
-
-                except Exception as e:
-                    messages.error(request, f"Error processing file: {str(e)}")
-                    return HttpResponseRedirect(request.path_info)
+                        continue
+                    try:
+                        queue_offer_image(Path(image.name).stem, image)
+                    except ImageProcessingError as exc:
+                        messages.error(request, f"Error processing file: {exc}")
+                        continue
+                    queued += 1
+                if queued:
+                    # Resized by a process_import_jobs worker, not this request
+                    messages.success(
+                        request,
+                        f"{queued} images have been added successfully! "
+                        "Their resized versions will be ready shortly.",
+                    )
+                return redirect("..")
             errors = list(
                 str(error)
                 .replace('<ul class="errorlist"><li>', "")
@@ -260,11 +520,17 @@ class OfferAdmin(admin.ModelAdmin):
         )
 
     # Actions
+    @action(description="Add to offerwalls")
+    def add_to_offerwalls(self, request, queryset):
+        return bulk_assignment_action(self, request, queryset, assign=True)
+
+    @action(description="Remove from offerwalls")
+    def remove_from_offerwalls(self, request, queryset):
+        return bulk_assignment_action(self, request, queryset, assign=False)
+
     @action(description="Remove from all offerwalls")
     def remove_from_all_offerwalls(self, request, queryset):
-        offer_wall_offers = OfferWallOffer.objects.filter(offer__in=queryset)
-        count = offer_wall_offers.count()
-        offer_wall_offers.delete()
+        count = unassign_offers(queryset) + unassign_offers(queryset, popup=True)
         self.message_user(
             request,
             f"Removed {count} offers from all offerwalls.",
@@ -272,7 +538,9 @@ class OfferAdmin(admin.ModelAdmin):
 
     @action(description="Activate selected offers")
     def activate(self, request, queryset):
+        offers = list(queryset)
         count = queryset.update(is_active=True)
+        publish_offer_changes(offers)
         self.message_user(
             request,
             f"Activated {count} offers.",
@@ -280,10 +548,18 @@ class OfferAdmin(admin.ModelAdmin):
 
     @action(description="Deactivate selected offers")
     def deactivate(self, request, queryset):
+        offers = list(queryset)
         count = queryset.update(is_active=False)
+        publish_offer_changes(offers)
         self.message_user(
             request,
             f"Deactivated {count} offers.",
         )
 
-    actions = ["activate", "deactivate", "remove_from_all_offerwalls"]
+    actions = [
+        "activate",
+        "deactivate",
+        "add_to_offerwalls",
+        "remove_from_offerwalls",
+        "remove_from_all_offerwalls",
+    ]
@@ -1,3 +1,11 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from drf_spectacular.utils import (OpenApiExample, OpenApiResponse,
                                    extend_schema)
 from rest_framework import mixins, routers, serializers, viewsets
@@ -9,7 +17,16 @@ from admin_panel.models import (Offer, OfferChoices, OfferWall, OfferWallOffer,
                                 OfferWallPopupOffer)
 
 
+class OfferImageSerializer(serializers.Serializer):
+    url = serializers.CharField()
+    width = serializers.IntegerField()
+    height = serializers.IntegerField()
+    format = serializers.CharField()
+
+
 class OfferSerializer(serializers.ModelSerializer):
+    images = OfferImageSerializer(many=True, read_only=True)
+
     class Meta:
         model = Offer
         fields = [
@@ -21,6 +38,7 @@ class OfferSerializer(serializers.ModelSerializer):
             "sum_to",
             "term_to",
             "percent_rate",
+            "images",
         ]
 
 
@@ -56,6 +74,36 @@ class OfferWallSerializer(serializers.ModelSerializer):
         ]
 
 
+class OfferWallBatchSerializer(serializers.Serializer):
+    tokens = serializers.ListField(
+        child=serializers.CharField(),
+        min_length=1,
+        max_length=settings.OFFERWALL_BATCH_MAX_TOKENS,
+    )
+
+
+def prefetch_assignments(queryset):
+    """Load assignments and their offers in two extra queries, in order."""
+    return queryset.prefetch_related(
+        Prefetch(
+            "offer_assignments",
+            queryset=OfferWallOffer.objects.select_related("offer").order_by(
+                "order", "id"
+            ),
+        ),
+        Prefetch(
+            "popup_assignments",
+            queryset=OfferWallPopupOffer.objects.select_related("offer").order_by(
+                "order", "id"
+            ),
+        ),
+    )
+
+
+def offerwall_cache_key(token, version):
+    return f"offerwall:{token}:{version}"
+
+
 class OfferWallViewSet(viewsets.GenericViewSet, mixins.RetrieveModelMixin):
     """
     A viewset for viewing and editing OfferWall instances with their assigned offers. Offers in offer_assignments are sorted by order
@@ -67,6 +115,75 @@ class OfferWallViewSet(viewsets.GenericViewSet, mixins.RetrieveModelMixin):
     serializer_class = OfferWallSerializer
     lookup_field = "token"
 
+    def get_queryset(self):
+        return prefetch_assignments(super().get_queryset())
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve the offerwall with ETag/Last-Modified validators. Conditional
+        requests matching the current data version get a 304 after a single
+        primary-key lookup, without running the serializer. Other requests
+        are answered from the cache entry for that version when present.
+        """
+        try:
+            state = (
+                OfferWall.objects.filter(token=kwargs[self.lookup_field])
+                .values("version", "updated_at")
+                .first()
+            )
+        except (ValueError, ValidationError):
+            state = None
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = f'"{state["version"]}"'
+        last_modified = int(state["updated_at"].timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            token = uuid.UUID(kwargs[self.lookup_field])
+            key = offerwall_cache_key(token, state["version"])
+            data = cache.get(key)
+            if data is None:
+                data = self.get_serializer(self.get_object()).data
+                cache.set(key, data, settings.OFFERWALL_CACHE_TIMEOUT)
+            response = Response(data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    @extend_schema(
+        request=OfferWallBatchSerializer,
+        responses=OpenApiResponse(
+            response=200,
+            description="Offerwalls keyed by requested token, null when unknown",
+        ),
+    )
+    @action(methods=["post"], detail=False)
+    def batch(self, request):
+        serializer = OfferWallBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        tokens = {}
+        for token in dict.fromkeys(serializer.validated_data["tokens"]):
+            try:
+                tokens[token] = uuid.UUID(token)
+            except ValueError:
+                tokens[token] = None
+        offerwalls = {
+            offerwall.token: offerwall
+            for offerwall in self.get_queryset().filter(
+                token__in=[value for value in tokens.values() if value]
+            )
+        }
+
+        data = {}
+        for token, value in tokens.items():
+            offerwall = offerwalls.get(value)
+            data[token] = OfferWallSerializer(offerwall).data if offerwall else None
+        return Response(data)
+
     @extend_schema(
         responses=OpenApiResponse(
             response=200,
@@ -0,0 +1,121 @@
+"""
+Set-based assignment of offers to offerwalls.
+
+Adding or removing a set of offers on a set of walls takes one
+``INSERT ... SELECT`` or one ``DELETE`` per assignment table, whatever the
+number of pairs, and publishes a single change notification for the walls
+that actually changed. These statements bypass model signals.
+"""
+
+from django.db import connection, transaction
+
+from admin_panel.models import (Offer, OfferWall, OfferWallOffer,
+                                OfferWallPopupOffer)
+from admin_panel.notifications import publish_changes
+from admin_panel.ranking import RANK_GAP, renormalize
+
+
+def assignment_model(popup):
+    return OfferWallPopupOffer if popup else OfferWallOffer
+
+
+def _uuids(objects):
+    return [str(getattr(obj, "pk", obj)) for obj in dict.fromkeys(objects)]
+
+
+def _bounds(table, order, position):
+    """
+    SQL for the ranks of the offers on wall ``w`` that new offers go
+    between (NULL at either end), and of its last offer.
+    """
+    ranks = f"SELECT {order} FROM {table} WHERE offer_wall_id = w.token"
+    last = f"(SELECT MAX({order}) FROM {table} WHERE offer_wall_id = w.token)"
+    if position is None:
+        return "NULL::integer", "NULL::integer", last
+    low = "NULL::integer"
+    if position > 0:
+        low = f"({ranks} ORDER BY {order}, id OFFSET {position - 1} LIMIT 1)"
+    high = f"({ranks} ORDER BY {order}, id OFFSET {position} LIMIT 1)"
+    return low, high, last
+
+
+def assign_offers(offers, walls, popup=False, position=None):
+    """
+    Assign ``offers`` (in that order) to every wall in ``walls``; both are
+    Offer/OfferWall instances or primary keys. Offers go ``position``
+    offers from the start of each wall, or to the end when None. Offers
+    already on a wall stay where they are. Returns the number of
+    assignments created.
+    """
+    offer_ids, wall_ids = _uuids(offers), _uuids(walls)
+    if not offer_ids or not wall_ids:
+        return 0
+    if position is not None and len(offer_ids) >= RANK_GAP:
+        raise ValueError(f"Cannot insert {len(offer_ids)} offers at a position")
+
+    model = assignment_model(popup)
+    qn = connection.ops.quote_name
+    table, order = qn(model._meta.db_table), qn("order")
+    low, high, last = _bounds(table, order, position)
+    with transaction.atomic():
+        if position is not None:
+            # Neighbours RANK_GAP apart leave room for the new offers.
+            renormalize(model, wall_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (offer_wall_id, offer_id, {order})
+                SELECT w.token, o.uuid,
+                    CASE WHEN b.high IS NULL
+                        THEN COALESCE(b.last, 0) + {RANK_GAP} * given.k
+                        ELSE COALESCE(b.low, 0)
+                            + (b.high - COALESCE(b.low, 0)) * given.k / (%s + 1)
+                    END
+                FROM {qn(OfferWall._meta.db_table)} AS w
+                CROSS JOIN LATERAL (
+                    SELECT {low} AS low, {high} AS high, {last} AS last
+                ) AS b
+                CROSS JOIN unnest(%s::uuid[]) WITH ORDINALITY AS given (offer_id, k)
+                JOIN {qn(Offer._meta.db_table)} AS o ON o.uuid = given.offer_id
+                WHERE w.token = ANY(%s::uuid[])
+                    AND NOT EXISTS (
+                        SELECT 1 FROM {table} AS a
+                        WHERE a.offer_wall_id = w.token AND a.offer_id = o.uuid
+                    )
+                ON CONFLICT DO NOTHING
+                RETURNING offer_wall_id
+                """,
+                [len(offer_ids), offer_ids, wall_ids],
+            )
+            changed = [row[0] for row in cursor.fetchall()]
+        publish_changes(wall_tokens=set(changed))
+    return len(changed)
+
+
+def unassign_offers(offers, walls=None, popup=False):
+    """
+    Remove ``offers`` from ``walls`` (from every wall when None) as regular
+    or popup offers. Returns the number of assignments deleted.
+    """
+    offer_ids = _uuids(offers)
+    if not offer_ids:
+        return 0
+    model = assignment_model(popup)
+    where, params = "offer_id = ANY(%s::uuid[])", [offer_ids]
+    if walls is not None:
+        wall_ids = _uuids(walls)
+        if not wall_ids:
+            return 0
+        where += " AND offer_wall_id = ANY(%s::uuid[])"
+        params.append(wall_ids)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)} "
+                f"WHERE {where} RETURNING offer_wall_id",
+                params,
+            )
+            changed = [row[0] for row in cursor.fetchall()]
+        publish_changes(wall_tokens=set(changed))
+    return len(changed)
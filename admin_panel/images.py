@@ -0,0 +1,255 @@
+"""
+Offer images resized into WebP and PNG variants with content-hashed names.
+
+Each uploaded image is scaled to the widths in OFFER_IMAGE_WIDTHS (never
+above its own width) and encoded once per format. Every variant is written
+to ``MEDIA_ROOT/offers/variants/<name>.<hash>.<width>w.<format>``, so a URL
+always points at the same bytes and nginx can serve it as immutable. The
+variant list (the manifest) is stored on ``Offer.images`` and exposed by
+the offerwall APIs. Decoding, resizing and encoding run in a thread pool;
+Pillow releases the GIL for most of that work.
+
+The uploaded original is kept at ``offers/<name>.png``, the path used
+before variants existed, and is what the variants are rendered from. The
+admin only stores the original and sets ``Offer.image_queued_at``;
+``process_import_jobs`` workers render queued offers in the background,
+and ``process_offer_images`` rebuilds variants on demand.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from admin_panel.models import Offer, OfferChoices
+from admin_panel.notifications import publish_offer_changes
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIRECTORY = "offers/variants"
+FORMATS = (
+    ("webp", {"quality": 85, "method": 6}),
+    ("png", {"optimize": True}),
+)
+HASH_LENGTH = 16
+# Queued offers rendered per process_queued_images() call; bounds the
+# originals held in memory at once
+QUEUE_BATCH_SIZE = 20
+
+
+class ImageProcessingError(Exception):
+    """One uploaded image could not be processed."""
+
+
+@dataclass
+class ProcessedImage:
+    name: str
+    # Manifest entries: {"url", "width", "height", "format"}
+    variants: list
+
+
+def media_url(path):
+    return f"/{settings.MEDIA_URL.strip('/')}/{path}"
+
+
+def original_path(name):
+    return Path(settings.MEDIA_ROOT) / "offers" / f"{name}.png"
+
+
+def _write_atomic(path, data):
+    """Write ``data`` (bytes or an iterable of byte chunks) to ``path``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in [data] if isinstance(data, bytes) else data:
+                f.write(chunk)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def render_variants(name, data, widths):
+    """Return ``(relative path, bytes, manifest entry)`` for every variant."""
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            source.load()
+            image = ImageOps.exif_transpose(source).convert("RGBA")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise ImageProcessingError(f"{name}: not a readable image ({exc})") from exc
+
+    variants = []
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image
+        if width != image.width:
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format, options in FORMATS:
+            out = io.BytesIO()
+            try:
+                resized.save(out, image_format, **options)
+            except (OSError, ValueError) as exc:
+                raise ImageProcessingError(
+                    f"{name}: could not be encoded as {image_format} ({exc})"
+                ) from exc
+            body = out.getvalue()
+            digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+            path = f"{VARIANT_DIRECTORY}/{name}.{digest}.{width}w.{image_format}"
+            entry = {
+                "url": media_url(path),
+                "width": width,
+                "height": height,
+                "format": image_format,
+            }
+            variants.append((path, body, entry))
+    return variants
+
+
+def process_image(name, data, widths, keep_original=True):
+    """Render and write one offer's variants; raises ImageProcessingError."""
+    if name not in OfferChoices.values:
+        raise ImageProcessingError(f"{name}: no offer with this name")
+    variants = render_variants(name, data, widths)
+    media_root = Path(settings.MEDIA_ROOT)
+    try:
+        for path, body, _ in variants:
+            target = media_root / path
+            # Content-addressed: an existing file already has these bytes
+            if not target.exists():
+                _write_atomic(target, body)
+        if keep_original:
+            _write_atomic(original_path(name), data)
+    except OSError as exc:
+        raise ImageProcessingError(f"{name}: could not be saved ({exc})") from exc
+    return ProcessedImage(name, [entry for _, _, entry in variants])
+
+
+def _render_images(images, keep_original):
+    """
+    Process ``(offer name, image bytes)`` pairs in a thread pool. Returns a
+    ``ProcessedImage`` or an ``ImageProcessingError`` per pair, in order.
+    """
+    widths = settings.OFFER_IMAGE_WIDTHS
+    with ThreadPoolExecutor(max_workers=settings.OFFER_IMAGE_WORKERS) as pool:
+        futures = [
+            (name, pool.submit(process_image, name, data, widths, keep_original))
+            for name, data in images
+        ]
+    results = []
+    for name, future in futures:
+        try:
+            results.append(future.result())
+        except ImageProcessingError as exc:
+            results.append(exc)
+        except Exception as exc:
+            # One broken image must not fail the rest of the batch
+            logger.exception("Processing the image of %s failed", name)
+            results.append(ImageProcessingError(f"{name}: {exc!r}"))
+    return results
+
+
+def process_offer_images(images, keep_original=True):
+    """
+    Process ``(offer name, image bytes)`` pairs in a thread pool and store
+    the manifests of the offers that exist. Returns a ``ProcessedImage`` or
+    an ``ImageProcessingError`` per pair, in order.
+    """
+    results = _render_images(images, keep_original)
+    processed = [result for result in results if isinstance(result, ProcessedImage)]
+    for result in processed:
+        Offer.objects.filter(name=result.name).update(images=result.variants)
+    publish_offer_changes(
+        Offer.objects.filter(name__in=[result.name for result in processed])
+    )
+    return results
+
+
+def queue_offer_image(name, upload):
+    """
+    Store an uploaded original (a Django ``UploadedFile``) without decoding
+    it and queue the offer for processing; raises ImageProcessingError.
+    Only the header is read, so a batch of uploads stays cheap.
+    """
+    if name not in OfferChoices.values:
+        raise ImageProcessingError(f"{name}: no offer with this name")
+    try:
+        with Image.open(upload) as image:
+            if image.format != "PNG":
+                raise ImageProcessingError(f"{name}: not a PNG image")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise ImageProcessingError(f"{name}: not a readable image ({exc})") from exc
+    upload.seek(0)
+    try:
+        _write_atomic(original_path(name), upload.chunks())
+    except OSError as exc:
+        raise ImageProcessingError(f"{name}: could not be saved ({exc})") from exc
+    Offer.objects.filter(name=name).update(image_queued_at=timezone.now())
+
+
+def process_queued_images(limit=QUEUE_BATCH_SIZE):
+    """
+    Render the variants of offers queued by ``queue_offer_image``. An offer
+    queued again while it was being processed stays queued, so the newer
+    upload is processed next time. Returns the results as
+    ``process_offer_images`` does.
+    """
+    queued = Offer.objects.filter(image_queued_at__isnull=False).order_by(
+        "image_queued_at"
+    )
+    queued = list(queued.values_list("name", "image_queued_at")[:limit])
+    images, seen = [], {}
+    for name, queued_at in queued:
+        seen[name] = queued_at
+        try:
+            images.append((name, original_path(name).read_bytes()))
+        except OSError as exc:
+            logger.error("Original image of %s is missing: %s", name, exc)
+            Offer.objects.filter(name=name, image_queued_at=queued_at).update(
+                image_queued_at=None
+            )
+
+    results = _render_images(images, keep_original=False)
+    updated = []
+    for (name, _), result in zip(images, results):
+        still_queued = Offer.objects.filter(name=name, image_queued_at=seen[name])
+        if isinstance(result, ProcessedImage):
+            if still_queued.update(images=result.variants, image_queued_at=None):
+                updated.append(name)
+        else:
+            logger.error("Could not process offer image: %s", result)
+            still_queued.update(image_queued_at=None)
+    publish_offer_changes(Offer.objects.filter(name__in=updated))
+    return results
+
+
+def prune_variants():
+    """Delete variant files no offer's manifest refers to; returns their number."""
+    directory = Path(settings.MEDIA_ROOT) / VARIANT_DIRECTORY
+    if not directory.is_dir():
+        return 0
+    referenced = {
+        entry["url"]
+        for images in Offer.objects.values_list("images", flat=True)
+        for entry in images or ()
+    }
+    removed = 0
+    for path in directory.iterdir():
+        # Dot files are variants still being written
+        if (
+            path.is_file()
+            and not path.name.startswith(".")
+            and media_url(f"{VARIANT_DIRECTORY}/{path.name}") not in referenced
+        ):
+            path.unlink()
+            removed += 1
+    return removed
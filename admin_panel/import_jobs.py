@@ -0,0 +1,162 @@
+"""
+Background offer CSV imports.
+
+The admin saves an upload as an ``OfferImportJob`` and returns at once;
+``manage.py process_import_jobs`` workers claim queued jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of them can run side by
+side. A job is imported by ``import_offers_csv`` in one transaction on a
+thread of its own, while the worker's main thread writes the progress to
+the job row over its own connection, where the admin's progress page can
+see it before the import commits.
+
+A running job whose heartbeat stops (the worker died) is picked up again
+after ``STALE_AFTER`` seconds; the import is an idempotent upsert, so
+running it twice is harmless. Jobs that keep failing that way are given up
+after ``MAX_ATTEMPTS``.
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from admin_panel.importing import CSVImportError, import_offers_csv
+from admin_panel.models import OfferImportJob
+from admin_panel.notifications import collect_changes
+
+logger = logging.getLogger(__name__)
+
+Status = OfferImportJob.Status
+
+# Seconds between progress writes (and heartbeats) of a running job
+PROGRESS_INTERVAL = 1.0
+STALE_AFTER = 60
+MAX_ATTEMPTS = 3
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=STALE_AFTER)
+
+
+def fail_abandoned_jobs():
+    """Give up on stale running jobs that already used all their attempts."""
+    return OfferImportJob.objects.filter(
+        status=Status.RUNNING,
+        heartbeat_at__lt=_stale_before(),
+        attempts__gte=MAX_ATTEMPTS,
+    ).update(
+        status=Status.FAILED,
+        message="The import worker stopped responding.",
+        finished_at=timezone.now(),
+    )
+
+
+def claim_job(worker=None):
+    """Mark the oldest runnable job as running and return it, or None."""
+    with transaction.atomic():
+        job = (
+            OfferImportJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Status.QUEUED)
+                | Q(status=Status.RUNNING, heartbeat_at__lt=_stale_before()),
+                attempts__lt=MAX_ATTEMPTS,
+            )
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        OfferImportJob.objects.filter(pk=job.pk).update(
+            status=Status.RUNNING,
+            attempts=F("attempts") + 1,
+            worker=worker or worker_name(),
+            started_at=now,
+            heartbeat_at=now,
+            bytes_done=0,
+            rows_done=0,
+            rows_rejected=0,
+        )
+    job.refresh_from_db()
+    return job
+
+
+class _Import(threading.Thread):
+    """Runs one job's import; its own database connection is closed at the end."""
+
+    def __init__(self, job):
+        super().__init__(name=f"import-job-{job.pk}", daemon=True)
+        self.job = job
+        self.bytes_done = 0
+        self.rows_done = 0
+        self.rows_rejected = 0
+        self.summary = None
+        self.error = None
+
+    def run(self):
+        try:
+            with open(self.job.file.path, "rb") as f:
+
+                def progress(summary):
+                    self.bytes_done = f.tell()
+                    self.rows_done = summary.rows
+                    self.rows_rejected = summary.rejected
+
+                with collect_changes():
+                    self.summary = import_offers_csv(f, progress=progress)
+        except (CSVImportError, DatabaseError, OSError) as exc:
+            self.error = str(exc)
+        except Exception as exc:
+            logger.exception("Import job %s failed", self.job.pk)
+            self.error = f"Unexpected error: {exc!r}"
+        finally:
+            connection.close()
+
+
+def run_job(job, interval=PROGRESS_INTERVAL):
+    """Import a claimed job, reporting progress until it finishes."""
+    jobs = OfferImportJob.objects.filter(pk=job.pk)
+    worker = _Import(job)
+    worker.start()
+    while worker.is_alive():
+        worker.join(interval)
+        jobs.update(
+            bytes_done=worker.bytes_done,
+            rows_done=worker.rows_done,
+            rows_rejected=worker.rows_rejected,
+            heartbeat_at=timezone.now(),
+        )
+
+    summary = worker.summary
+    if summary is None:
+        jobs.update(
+            status=Status.FAILED, message=worker.error, finished_at=timezone.now()
+        )
+    else:
+        # The outcome is kept on the job; the upload itself is not needed.
+        job.file.storage.delete(job.file.name)
+        jobs.update(
+            status=Status.DONE,
+            file="",
+            bytes_done=job.bytes_total,
+            rows_done=summary.rows,
+            rows_rejected=summary.rejected,
+            offers_saved=summary.saved,
+            errors=[str(error) for error in summary.errors],
+            message=(
+                f"Imported {summary.rows - summary.rejected} of {summary.rows} "
+                f"rows into {summary.saved} offers."
+            ),
+            finished_at=timezone.now(),
+        )
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,138 @@
+"""
+Streaming CSV import of offers.
+
+The upload is decoded incrementally and validated row by row; valid rows
+are upserted on ``name`` with ``bulk_create(update_conflicts=True)``, one
+statement per batch, all inside one transaction. Postgres cannot update
+the same row twice in one INSERT ... ON CONFLICT, so rows are merged by
+name before each write and the last row for a name wins, as it did with
+``update_or_create``.
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from admin_panel.models import Offer, OfferChoices
+from admin_panel.notifications import publish_offer_changes
+
+OFFER_NAMES = frozenset(OfferChoices.values)
+REQUIRED_FIELDS = ("id", "name", "sum_to", "term_to", "percent_rate", "status", "url")
+UPDATE_FIELDS = ["id", "sum_to", "term_to", "percent_rate", "is_active", "url"]
+BATCH_SIZE = 1000
+# Errors kept for the summary; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+
+class CSVImportError(Exception):
+    """The file as a whole cannot be imported."""
+
+
+@dataclass
+class RowError:
+    line: int
+    message: str
+
+    def __str__(self):
+        return f"Line {self.line}: {self.message}"
+
+
+@dataclass
+class ImportSummary:
+    rows: int = 0
+    saved: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(line, message))
+
+
+def offer_from_row(row):
+    """Validate one CSV row and build the unsaved ``Offer``; raises ValueError."""
+    if None in row.values():
+        raise ValueError("too few columns")
+    if row["name"] not in OFFER_NAMES:
+        raise ValueError(f"invalid offer name {row['name']!r}")
+    return Offer(
+        id=int(row["id"]),
+        name=row["name"],
+        sum_to=row["sum_to"],
+        term_to=int(row["term_to"]),
+        percent_rate=int(row["percent_rate"]),
+        is_active=row["status"].lower() == "true",
+        url=row["url"] or "",
+    )
+
+
+def _upsert(pending):
+    Offer.objects.bulk_create(
+        pending.values(),
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def import_offers_csv(binary_file, batch_size=BATCH_SIZE, progress=None):
+    """
+    Import offers from a binary CSV file object (e.g. an upload) and return
+    an ``ImportSummary``. Bad rows are skipped and reported; a file without
+    the required columns or with invalid UTF-8 raises ``CSVImportError`` and
+    changes nothing.
+
+    ``progress``, when given, is called with the running summary every
+    ``batch_size`` rows and once more before the transaction commits.
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    try:
+        with transaction.atomic():
+            summary = _import_rows(reader, batch_size, progress)
+    except UnicodeDecodeError as exc:
+        raise CSVImportError(f"File is not valid UTF-8: {exc}") from exc
+    except csv.Error as exc:
+        raise CSVImportError(f"Line {reader.line_num}: {exc}") from exc
+    finally:
+        # Leave the upload open for Django to clean up.
+        text.detach()
+    return summary
+
+
+def _import_rows(reader, batch_size, progress):
+    missing = set(REQUIRED_FIELDS) - set(reader.fieldnames or ())
+    if missing:
+        raise CSVImportError(
+            f"CSV is missing required fields: {', '.join(sorted(missing))}"
+        )
+
+    summary = ImportSummary()
+    names = set()
+    pending = {}
+    for row in reader:
+        summary.rows += 1
+        try:
+            offer = offer_from_row(row)
+        except (ValueError, TypeError, AttributeError) as exc:
+            summary.reject(reader.line_num, str(exc))
+        else:
+            pending[offer.name] = offer
+            if len(pending) >= batch_size:
+                _upsert(pending)
+                names.update(pending)
+                pending = {}
+        if progress is not None and summary.rows % batch_size == 0:
+            progress(summary)
+    if pending:
+        _upsert(pending)
+        names.update(pending)
+
+    summary.saved = len(names)
+    publish_offer_changes(Offer.objects.filter(name__in=names))
+    if progress is not None:
+        progress(summary)
+    return summary
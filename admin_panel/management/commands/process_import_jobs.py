@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_panel.images import process_queued_images
+from admin_panel.import_jobs import (claim_job, fail_abandoned_jobs, run_job,
+                                     worker_name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued offer CSV imports and render offer images uploaded "
+        "through the admin. Start as many workers as needed; each import job "
+        "is processed by exactly one of them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are queued now and exit",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between checks for new jobs (default: 2)",
+        )
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f"Import worker {worker} started")
+        while True:
+            fail_abandoned_jobs()
+            images = process_queued_images()
+            if images:
+                self.stdout.write(f"Processed {len(images)} offer images")
+            job = claim_job(worker)
+            if job is None:
+                if images:
+                    continue
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+
+            self.stdout.write(f"Importing {job.original_name} (job {job.pk})")
+            job = run_job(job)
+            style = (
+                self.style.SUCCESS
+                if job.status == job.Status.DONE
+                else self.style.ERROR
+            )
+            self.stdout.write(style(f"Job {job.pk} {job.status}: {job.message}"))
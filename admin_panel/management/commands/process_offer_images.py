@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.images import (original_path, process_offer_images,
+                                prune_variants)
+from admin_panel.models import Offer
+from admin_panel.notifications import collect_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the resized, content-hashed variants of offer images from "
+        "the originals in MEDIA_ROOT/offers/<name>.png"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help="Offer names to process; all offers when omitted",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Afterwards delete variant files no offer refers to any more",
+        )
+
+    def handle(self, *args, **options):
+        names = options["names"] or Offer.objects.values_list("name", flat=True)
+        images = []
+        for name in names:
+            path = original_path(name)
+            if path.is_file():
+                images.append((name, path.read_bytes()))
+            elif options["names"]:
+                raise CommandError(f"{path} does not exist")
+
+        with collect_changes():
+            results = process_offer_images(images, keep_original=False)
+        failed = 0
+        for result in results:
+            if isinstance(result, Exception):
+                failed += 1
+                self.stderr.write(self.style.ERROR(str(result)))
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {len(results) - failed} offer images")
+        )
+        if options["prune"]:
+            self.stdout.write(f"Removed {prune_variants()} unused variant files")
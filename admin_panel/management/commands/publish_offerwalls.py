@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.publishing import (publish_offerwalls,
+                                    publish_pending_offerwalls)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render offerwalls to static JSON (with gzip and brotli variants) "
+        "under OFFERWALL_PUBLISH_ROOT for nginx to serve"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "tokens",
+            nargs="*",
+            help="Offerwall tokens to publish; all offerwalls when omitted",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running and republish offerwalls as they change",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between checks for changes (default: 1)",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.OFFERWALL_PUBLISH_ROOT:
+            raise CommandError("OFFERWALL_PUBLISH_ROOT is not set")
+        if not options["watch"]:
+            written, removed = publish_offerwalls(options["tokens"] or None)
+            self.stdout.write(
+                self.style.SUCCESS(f"Published {written} offerwalls, removed {removed}")
+            )
+            return
+
+        self.stdout.write("Publishing changed offerwalls")
+        while True:
+            written, removed = publish_pending_offerwalls()
+            if written or removed:
+                self.stdout.write(f"Published {written} offerwalls, removed {removed}")
+            time.sleep(options["poll"])
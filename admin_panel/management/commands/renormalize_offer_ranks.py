@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from admin_panel.models import OfferWallOffer, OfferWallPopupOffer
+from admin_panel.ranking import renormalize
+
+
+class Command(BaseCommand):
+    help = (
+        "Respace offer ranks on offerwalls so single offers can be moved "
+        "again by writing one row. Only ranks that change are written, and "
+        "the order of offers is kept, so it is safe to run from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "tokens",
+            nargs="*",
+            help="Offerwall tokens to renormalize; all offerwalls when omitted",
+        )
+
+    def handle(self, *args, **options):
+        tokens = options["tokens"] or None
+        updated = sum(
+            renormalize(model, tokens)
+            for model in (OfferWallOffer, OfferWallPopupOffer)
+        )
+        self.stdout.write(self.style.SUCCESS(f"Renormalized {updated} offer ranks"))
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0004_alter_offerwalloffer_unique_together_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offerwall",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AddField(
+            model_name="offerwall",
+            name="version",
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:40
+
+from django.db import migrations
+
+# Spread existing ranks RANK_GAP (1024) apart, keeping the current order
+RESPACE = """
+UPDATE {table} AS a SET "order" = ranked.position * 1024
+FROM (
+    SELECT id, row_number() OVER (
+        PARTITION BY offer_wall_id ORDER BY "order", id
+    ) AS position
+    FROM {table}
+) AS ranked
+WHERE a.id = ranked.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0006_offerimportjob"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="offerwalloffer",
+            options={"ordering": ["order", "id"]},
+        ),
+        migrations.AlterModelOptions(
+            name="offerwallpopupoffer",
+            options={"ordering": ["order", "id"]},
+        ),
+        migrations.RunSQL(
+            RESPACE.format(table="admin_panel_offerwalloffer"),
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            RESPACE.format(table="admin_panel_offerwallpopupoffer"),
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0007_sparse_offer_ranks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offer",
+            name="images",
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
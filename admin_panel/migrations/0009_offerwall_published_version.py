@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0008_offer_images"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offerwall",
+            name="published_version",
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
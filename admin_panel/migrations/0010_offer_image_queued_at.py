@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("admin_panel", "0009_offerwall_published_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offer",
+            name="image_queued_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
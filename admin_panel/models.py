@@ -1,6 +1,12 @@
 import uuid
 
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .ranking import RANK_GAP, apply_order, rank_between, renormalize
 
 
 class OfferChoices(models.TextChoices):
@@ -47,27 +53,128 @@ class OfferWall(models.Model):
     name = models.CharField(max_length=255, blank=True, null=True)
     url = models.URLField(null=True, default=None, blank=True)
     description = models.TextField(blank=True, null=True)
+    # Bumped whenever the wall, its assignments or the offers it shows change
+    version = models.PositiveBigIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Version of the files under OFFERWALL_PUBLISH_ROOT, see publishing.py
+    published_version = models.PositiveBigIntegerField(
+        null=True, blank=True, editable=False
+    )
 
     def __str__(self):
         return f"OfferWall {self.token}"
 
-    def add_offer(self, offer, order=None):
-        """Add an offer with optional order position"""
+    def save(self, *args, **kwargs):
+        # version/updated_at only move through bump_versions() and
+        # published_version through publishing; writing them back from a
+        # stale instance would reuse an old version number.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ("version", "updated_at", "published_version")
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_versions(cls, tokens):
+        """Increment the data version of the given walls in one UPDATE"""
+        return cls.objects.filter(token__in=tokens).update(
+            version=models.F("version") + 1, updated_at=timezone.now()
+        )
+
+    def _assignment_model(self, popup):
+        return OfferWallPopupOffer if popup else OfferWallOffer
+
+    def _rank_before(self, model, before, exclude=None):
+        """
+        A free rank just before the offer ``before`` (at the end when None)
+        in this wall's ``model`` assignments, ignoring the offer ``exclude``.
+        Renormalizes the wall when the neighbours have no room between them.
+        """
+        siblings = model.objects.filter(offer_wall=self)
+        if exclude is not None:
+            siblings = siblings.exclude(offer=exclude)
+        for _ in range(2):
+            if before is None:
+                low = siblings.aggregate(models.Max("order"))["order__max"]
+                high = None
+            else:
+                neighbours = (
+                    siblings.filter(offer=before)
+                    .annotate(
+                        low=models.Subquery(
+                            siblings.filter(order__lt=models.OuterRef("order"))
+                            .order_by("-order")
+                            .values("order")[:1]
+                        )
+                    )
+                    .values_list("low", "order")
+                    .first()
+                )
+                if neighbours is None:
+                    raise model.DoesNotExist(f"{before} is not on {self}")
+                low, high = neighbours
+            rank = rank_between(low, high)
+            if rank is not None:
+                return rank
+            renormalize(model, [self.token])
+        raise RuntimeError(f"No free rank before {before} on {self}")
+
+    def add_offer(self, offer, order=None, before=None):
+        """
+        Add an offer at ``order``, just before the offer ``before``, or at
+        the end of the wall. Appending is a single INSERT that reads the
+        maximum rank itself. Under READ COMMITTED concurrent appends can
+        still read the same maximum; their equal ranks are ordered by id
+        and spread apart by the next renormalize.
+        """
+        if order is None and before is not None:
+            order = self._rank_before(OfferWallOffer, before)
         if order is None:
-            # If no order specified, put at the end
-            max_order = (
-                self.offer_assignments.aggregate(models.Max("order"))["order__max"] or 0
+            last = (
+                OfferWallOffer.objects.filter(offer_wall=self)
+                .values("offer_wall")
+                .annotate(last=models.Max("order"))
+                .values("last")
             )
-            order = max_order + 1
+            order = Coalesce(models.Subquery(last), 0) + RANK_GAP
         OfferWallOffer.objects.create(offer_wall=self, offer=offer, order=order)
 
-    def reorder_offers(self, offer_order_list):
-        """Reorder offers based on a list of offer UUIDs"""
+    def move_offer(self, offer, before=None, popup=False):
+        """
+        Move an assigned offer just before the offer ``before`` (to the end
+        when None). Only the moved assignment is written unless its new
+        neighbours have no free rank left between them.
+        """
+        from .notifications import publish_changes
+
+        model = self._assignment_model(popup)
         with transaction.atomic():
-            for index, offer_uuid in enumerate(offer_order_list):
-                OfferWallOffer.objects.filter(
-                    offer_wall=self, offer__uuid=offer_uuid
-                ).update(order=index)
+            rank = self._rank_before(model, before, exclude=offer)
+            moved = model.objects.filter(offer_wall=self, offer=offer).update(
+                order=rank
+            )
+            if moved:
+                publish_changes(wall_tokens=[self.token])
+        return moved
+
+    def reorder_offers(self, offer_order_list, popup=False):
+        """
+        Reorder offers based on a list of offer UUIDs, in one statement.
+        Offers left out of the list follow the listed ones in their current
+        order. Returns the number of assignments whose rank changed.
+        """
+        from .notifications import publish_changes
+
+        with transaction.atomic():
+            changed = apply_order(
+                self._assignment_model(popup), self.token, offer_order_list
+            )
+            if changed:
+                publish_changes(wall_tokens=[self.token])
+        return changed
 
     def get_offers(self):
         """Get all offers in order"""
@@ -85,6 +192,10 @@ class Offer(models.Model):
     sum_to = models.CharField(null=True, default=None, blank=True)
     term_to = models.IntegerField(null=True, default=None, blank=True)
     percent_rate = models.IntegerField(null=True, default=None, blank=True)
+    # Resized variants of the offer image, see admin_panel/images.py
+    images = models.JSONField(default=list, blank=True, editable=False)
+    # Set when a new original is waiting for process_import_jobs to render it
+    image_queued_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -104,7 +215,7 @@ class OfferWallOffer(models.Model):
         #     "offer_wall",
         #     "offer",
         # )  # Prevents duplicate offers in same wall
-        ordering = ["order"]  # Default ordering by order field
+        ordering = ["order", "id"]  # Default ordering by order field
 
     def __str__(self):
         return f"{self.offer.name} in {self.offer_wall.token} (Order: {self.order})"
@@ -124,7 +235,81 @@ class OfferWallPopupOffer(models.Model):
             "offer_wall",
             "offer",
         )  # Prevents duplicate offers in same wall
-        ordering = ["order"]  # Default ordering by order field
+        ordering = ["order", "id"]  # Default ordering by order field
 
     def __str__(self):
         return f"{self.offer.name} in {self.offer_wall.token} (Order: {self.order})"
+
+
+def import_storage():
+    return FileSystemStorage(location=settings.OFFER_IMPORT_ROOT)
+
+
+class OfferImportJob(models.Model):
+    """An uploaded offer CSV and the progress of its background import."""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    # Emptied once the import succeeds
+    file = models.FileField(
+        upload_to="offers/%Y/%m/", storage=import_storage, blank=True
+    )
+    original_name = models.CharField(max_length=255)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=255, blank=True)
+
+    bytes_total = models.PositiveBigIntegerField(default=0)
+    bytes_done = models.PositiveBigIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    offers_saved = models.PositiveIntegerField(default=0)
+    # The first rejected rows as "Line N: reason" strings
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import of {self.original_name} ({self.get_status_display()})"
+
+    @property
+    def finished(self):
+        return self.status in (self.Status.DONE, self.Status.FAILED)
+
+    def progress(self):
+        """Fraction of the file read so far, between 0 and 1."""
+        if self.status == self.Status.DONE:
+            return 1.0
+        if not self.bytes_total:
+            return 0.0
+        return min(self.bytes_done / self.bytes_total, 1.0)
+
+    def eta_seconds(self):
+        """Seconds left, extrapolated from the bytes read so far; None if unknown."""
+        if self.status != self.Status.RUNNING or not self.started_at:
+            return None
+        fraction = self.progress()
+        if not fraction:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        return max(elapsed / fraction - elapsed, 0.0)
@@ -0,0 +1,119 @@
+"""
+Change feed for services that cache offerwall data.
+
+Every change to an offerwall, its assignments or the offers it shows is
+published with Postgres NOTIFY once the surrounding transaction commits.
+The payload is a JSON object listing the affected wall tokens and offer
+ids; when it would not fit into a single notification it is replaced by
+``{"all": true}`` and listeners drop everything they hold.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from admin_panel.models import OfferWall
+from admin_panel.publishing import unpublish_offerwalls
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD_SIZE = 7900
+
+_local = threading.local()
+
+
+class _Changes:
+    def __init__(self):
+        self.wall_tokens = set()
+        self.offer_ids = set()
+
+    def update(self, wall_tokens, offer_ids):
+        self.wall_tokens.update(str(token) for token in wall_tokens)
+        self.offer_ids.update(int(offer_id) for offer_id in offer_ids)
+
+
+def _send(payload):
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, %s)", [settings.OFFERWALL_CHANGES_CHANNEL, payload]
+        )
+
+
+def _encode(changes):
+    payload = json.dumps(
+        {
+            "walls": sorted(changes.wall_tokens),
+            "offers": sorted(changes.offer_ids),
+        },
+        separators=(",", ":"),
+    )
+    if len(payload.encode()) > MAX_PAYLOAD_SIZE:
+        payload = json.dumps({"all": True})
+    return payload
+
+
+def publish_changes(wall_tokens=(), offer_ids=()):
+    """
+    Announce that the given offerwalls and offers changed.
+
+    Inside ``collect_changes()`` the change is merged into the pending
+    notification. Otherwise the walls' data versions are bumped right away
+    and the notification is sent when the current transaction commits.
+    """
+    pending = getattr(_local, "changes", None)
+    if pending is not None:
+        pending.update(wall_tokens, offer_ids)
+        return
+
+    changes = _Changes()
+    changes.update(wall_tokens, offer_ids)
+    if not changes.wall_tokens and not changes.offer_ids:
+        return
+    if changes.wall_tokens:
+        OfferWall.bump_versions(changes.wall_tokens)
+    payload = _encode(changes)
+    transaction.on_commit(lambda: _send(payload))
+    if changes.wall_tokens and settings.OFFERWALL_PUBLISH_ROOT:
+        # Republished out of band by `publish_offerwalls --watch`
+        tokens = sorted(changes.wall_tokens)
+        transaction.on_commit(lambda: unpublish_offerwalls(tokens), robust=True)
+
+
+def publish_offer_changes(offers):
+    """
+    Announce changes to ``offers`` (a queryset or iterable of ``Offer``) and
+    every offerwall that shows them. Use it after ``update()``/``delete()`` and
+    other bulk paths that bypass model signals.
+    """
+    offers = list(offers)
+    if not offers:
+        return
+    wall_tokens = (
+        OfferWall.objects.filter(
+            Q(offer_assignments__offer__in=offers)
+            | Q(popup_assignments__offer__in=offers)
+        )
+        .values_list("token", flat=True)
+        .distinct()
+    )
+    publish_changes(wall_tokens, [offer.id for offer in offers])
+
+
+@contextmanager
+def collect_changes():
+    """Merge everything published inside the block into one notification."""
+    if getattr(_local, "changes", None) is not None:
+        yield
+        return
+
+    _local.changes = changes = _Changes()
+    try:
+        yield
+    finally:
+        _local.changes = None
+        publish_changes(changes.wall_tokens, changes.offer_ids)
@@ -0,0 +1,164 @@
+"""
+Pre-rendered offerwall JSON for nginx to serve without calling an API.
+
+Every offerwall is rendered with the API serializer to
+``<OFFERWALL_PUBLISH_ROOT>/offerwalls/<token>.json``, with ``.gz`` and
+``.br`` variants next to it. Files are written under a temporary name and
+renamed into place, compressed variants first, so nginx never serves a
+partial file. Their mtime is the wall's ``updated_at``, which nginx sends
+as Last-Modified. Deleted walls lose their files, and a wall that fails to
+publish has its old files removed so nginx falls back to the API instead
+of serving stale data.
+
+Rendering is too slow for admin requests. When a wall changes, its files
+are only removed once the transaction commits (``unpublish_offerwalls``),
+and nginx answers from the API until a ``publish_offerwalls --watch``
+worker renders the walls whose ``published_version`` is behind their
+``version``.
+"""
+
+import gzip
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import brotli
+from django.conf import settings
+from django.db.models import F, Q
+from rest_framework.renderers import JSONRenderer
+
+from admin_panel.api.offer_walls import (OfferWallSerializer,
+                                         prefetch_assignments)
+from admin_panel.models import OfferWall
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = (".br", ".gz", "")
+# Full publishes compress hardest; the watch worker trades a few percent
+# of size for renders that keep up with edits.
+BROTLI_QUALITY = 11
+PENDING_BROTLI_QUALITY = 5
+
+
+def encode_variants(body, brotli_quality=BROTLI_QUALITY):
+    """``(suffix, bytes)`` per file, in the order they must be written."""
+    return [
+        (".br", brotli.compress(body, quality=brotli_quality)),
+        (".gz", gzip.compress(body, compresslevel=9, mtime=0)),
+        ("", body),
+    ]
+
+
+def publish_directory():
+    if not settings.OFFERWALL_PUBLISH_ROOT:
+        return None
+    return Path(settings.OFFERWALL_PUBLISH_ROOT) / "offerwalls"
+
+
+def render_offerwall(offerwall):
+    """The exact body ``GET /api/offerwalls/<token>/`` responds with."""
+    return JSONRenderer().render(OfferWallSerializer(offerwall).data)
+
+
+def _write_atomic(path, data, mtime):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _remove(directory, token):
+    # The plain file goes first: nginx only looks at variants when it exists.
+    existed = (directory / f"{token}.json").exists()
+    for suffix in reversed(SUFFIXES):
+        (directory / f"{token}.json{suffix}").unlink(missing_ok=True)
+    return existed
+
+
+def unpublish_offerwalls(tokens):
+    """
+    Remove the published files of the given offerwalls, so nginx serves
+    them from the API until the watch worker publishes them again. Cheap
+    enough to run as part of every change; errors are logged, not raised.
+    """
+    directory = publish_directory()
+    if directory is None:
+        return 0
+    removed = 0
+    for token in tokens:
+        try:
+            removed += _remove(directory, str(token))
+        except OSError:
+            logger.exception("Could not unpublish offerwall %s", token)
+    return removed
+
+
+def publish_offerwalls(tokens=None, brotli_quality=BROTLI_QUALITY):
+    """
+    Render the given offerwalls (all of them when ``tokens`` is None) and
+    remove the files of those that no longer exist. Returns the number of
+    walls written and removed; does nothing unless OFFERWALL_PUBLISH_ROOT
+    is set.
+    """
+    directory = publish_directory()
+    if directory is None:
+        return 0, 0
+    directory.mkdir(parents=True, exist_ok=True)
+
+    queryset = prefetch_assignments(OfferWall.objects.all())
+    if tokens is not None:
+        queryset = queryset.filter(token__in=tokens)
+
+    published = set()
+    for offerwall in queryset.iterator(chunk_size=500):
+        token = str(offerwall.token)
+        body = render_offerwall(offerwall)
+        mtime = offerwall.updated_at.timestamp()
+        try:
+            for suffix, data in encode_variants(body, brotli_quality):
+                _write_atomic(directory / f"{token}.json{suffix}", data, mtime)
+        except OSError:
+            logger.exception("Could not publish offerwall %s", token)
+            _remove(directory, token)
+            continue
+        # A change committed since the wall was read has already removed
+        # its files or will do so after this check; either way the files
+        # just written are the old version and must go.
+        current = OfferWall.objects.filter(
+            token=offerwall.token, version=offerwall.version
+        ).update(published_version=offerwall.version)
+        if not current:
+            _remove(directory, token)
+            continue
+        published.add(token)
+
+    if tokens is None:
+        stale = {path.name.removesuffix(".json") for path in directory.glob("*.json")}
+    else:
+        stale = {str(token) for token in tokens}
+    removed = sum(_remove(directory, token) for token in stale - published)
+    return len(published), removed
+
+
+def pending_offerwalls():
+    """Tokens of the offerwalls whose published files are missing or stale."""
+    return list(
+        OfferWall.objects.filter(
+            Q(published_version__isnull=True) | ~Q(published_version=F("version"))
+        ).values_list("token", flat=True)
+    )
+
+
+def publish_pending_offerwalls():
+    """Publish the walls changed since their files were written."""
+    tokens = pending_offerwalls()
+    if not tokens:
+        return 0, 0
+    return publish_offerwalls(tokens, brotli_quality=PENDING_BROTLI_QUALITY)
@@ -0,0 +1,96 @@
+"""
+Sparse ranks for offer assignments.
+
+``order`` values are spaced ``RANK_GAP`` apart, so an offer can be added or
+moved by writing its own row only, with a rank halfway between its new
+neighbours. When two neighbours end up adjacent the wall is renormalized:
+one statement spreads its ranks ``RANK_GAP`` apart again, keeping the
+current order (ties broken by id, as readers sort). A full new order is
+applied the same way, in one ``UPDATE ... FROM`` statement.
+"""
+
+from django.db import connection
+
+RANK_GAP = 1024
+
+
+def rank_between(low, high):
+    """
+    A rank strictly between ``low`` and ``high`` (None meaning the start or
+    the end of the list), or None when there is no room left.
+    """
+    low = 0 if low is None else low
+    if high is None:
+        return low + RANK_GAP
+    if high - low < 2:
+        return None
+    return (low + high) // 2
+
+
+def _table(model):
+    qn = connection.ops.quote_name
+    return qn(model._meta.db_table), qn("order")
+
+
+def renormalize(model, wall_tokens=None):
+    """
+    Respace the ranks of ``model`` assignments (of the given walls, or of
+    all walls) to multiples of RANK_GAP. Only rows whose rank changes are
+    written; returns their number.
+    """
+    table, order = _table(model)
+    where, params = "", []
+    if wall_tokens is not None:
+        wall_tokens = [str(token) for token in wall_tokens]
+        if not wall_tokens:
+            return 0
+        where, params = "WHERE offer_wall_id = ANY(%s::uuid[])", [wall_tokens]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} AS a SET {order} = ranked.position * {RANK_GAP}
+            FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY offer_wall_id ORDER BY {order}, id
+                ) AS position
+                FROM {table}
+                {where}
+            ) AS ranked
+            WHERE a.id = ranked.id AND a.{order} <> ranked.position * {RANK_GAP}
+            """,
+            params,
+        )
+        return cursor.rowcount
+
+
+def apply_order(model, wall_token, offer_uuids):
+    """
+    Rank a wall's ``model`` assignments in the order of ``offer_uuids`` with
+    a single statement. Assignments of offers that are not listed keep their
+    relative order after the listed ones; unknown offers are ignored.
+    Returns the number of rows whose rank changed.
+    """
+    table, order = _table(model)
+    offer_uuids = [str(offer_uuid) for offer_uuid in dict.fromkeys(offer_uuids)]
+    given = "SELECT NULL::uuid, NULL::integer WHERE false"
+    if offer_uuids:
+        given = "VALUES " + ", ".join(["(%s::uuid, %s)"] * len(offer_uuids))
+    params = [value for item in enumerate(offer_uuids) for value in item[::-1]]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} AS a SET {order} = ranked.position * {RANK_GAP}
+            FROM (
+                SELECT s.id, row_number() OVER (
+                    ORDER BY given.position NULLS LAST, s.{order}, s.id
+                ) AS position
+                FROM {table} AS s
+                LEFT JOIN ({given}) AS given (offer_id, position)
+                    ON given.offer_id = s.offer_id
+                WHERE s.offer_wall_id = %s::uuid
+            ) AS ranked
+            WHERE a.id = ranked.id AND a.{order} <> ranked.position * {RANK_GAP}
+            """,
+            [*params, str(wall_token)],
+        )
+        return cursor.rowcount
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (Offer, OfferImportJob, OfferWall, OfferWallOffer,
+                     OfferWallPopupOffer)
+from .notifications import publish_changes, publish_offer_changes
+
+
+@receiver(post_save, sender=OfferWall)
+@receiver(post_delete, sender=OfferWall)
+def offerwall_changed(sender, instance, **kwargs):
+    publish_changes(wall_tokens=[instance.token])
+
+
+@receiver(post_save, sender=OfferWallOffer)
+@receiver(post_delete, sender=OfferWallOffer)
+@receiver(post_save, sender=OfferWallPopupOffer)
+@receiver(post_delete, sender=OfferWallPopupOffer)
+def assignment_changed(sender, instance, **kwargs):
+    publish_changes(wall_tokens=[instance.offer_wall_id])
+
+
+@receiver(post_save, sender=Offer)
+def offer_saved(sender, instance, **kwargs):
+    publish_offer_changes([instance])
+
+
+@receiver(post_delete, sender=Offer)
+def offer_deleted(sender, instance, **kwargs):
+    # Assignments are cascade-deleted first and announce their own walls.
+    publish_changes(offer_ids=[instance.id])
+
+
+@receiver(post_delete, sender=OfferImportJob)
+def import_job_deleted(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.delete(save=False)
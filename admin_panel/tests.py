@@ -1,3 +1,1029 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from admin_panel import importing
+from admin_panel.assignments import assign_offers, unassign_offers
+from admin_panel.images import (VARIANT_DIRECTORY, ImageProcessingError,
+                                original_path, process_offer_images,
+                                process_queued_images)
+from admin_panel.import_jobs import (MAX_ATTEMPTS, STALE_AFTER, claim_job,
+                                     fail_abandoned_jobs, run_job)
+from admin_panel.importing import (MAX_REPORTED_ERRORS, CSVImportError,
+                                   ImportSummary, import_offers_csv)
+from admin_panel.models import (Offer, OfferChoices, OfferImportJob, OfferWall,
+                                OfferWallOffer, OfferWallPopupOffer)
+from admin_panel.notifications import collect_changes, publish_changes
+from admin_panel.publishing import (pending_offerwalls, publish_directory,
+                                    publish_offerwalls,
+                                    publish_pending_offerwalls,
+                                    render_offerwall)
+from admin_panel.ranking import RANK_GAP, renormalize
+
+ASSIGNMENT_COUNTS = (1, 50, 500)
+
+
+class QueryBudgetMixin:
+    """Fixtures and assertions shared by the SQL statement budget tests."""
+
+    @staticmethod
+    def create_offers(count):
+        return Offer.objects.bulk_create(
+            Offer(id=i, name=f"Offer{i}", url=f"https://example.com/{i}")
+            for i in range(count)
+        )
+
+    @staticmethod
+    def create_walls(offers, popups=0):
+        """
+        One wall per ``ASSIGNMENT_COUNTS`` entry, keyed by it, showing that
+        many ``offers``; the first ``popups`` of them (all for ``None``) are
+        popup offers as well.
+        """
+        walls = {}
+        for count in ASSIGNMENT_COUNTS:
+            wall = OfferWall.objects.create(name=f"{count} offers")
+            OfferWallOffer.objects.bulk_create(
+                OfferWallOffer(offer_wall=wall, offer=offer, order=order)
+                for order, offer in enumerate(offers[:count])
+            )
+            popup_count = count if popups is None else min(count, popups)
+            OfferWallPopupOffer.objects.bulk_create(
+                OfferWallPopupOffer(offer_wall=wall, offer=offer, order=order)
+                for order, offer in enumerate(offers[:popup_count])
+            )
+            walls[count] = wall
+        return walls
+
+    def assertQueryBudget(self, budget, call):
+        with CaptureQueriesContext(connection) as queries:
+            result = call()
+        self.assertEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return result
+
+
+class OfferWallQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Every API endpoint runs a fixed number of SQL statements, however many
+    offers are assigned to the walls it serves.
+    """
+
+    # Statements per request, including the version lookup of retrieve()
+    RETRIEVE_BUDGET = 4
+    CACHED_RETRIEVE_BUDGET = 1
+    NOT_MODIFIED_BUDGET = 1
+    NOT_FOUND_BUDGET = 2
+    BATCH_BUDGET = 3
+    OFFER_NAMES_BUDGET = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        offers = cls.create_offers(max(ASSIGNMENT_COUNTS))
+        cls.walls = cls.create_walls(offers, popups=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_retrieve(self):
+        for count, wall in self.walls.items():
+            with self.subTest(assignments=count):
+                response = self.assertQueryBudget(
+                    self.RETRIEVE_BUDGET,
+                    lambda: self.client.get(f"/api/offerwalls/{wall.token}/"),
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["offer_assignments"]), count)
+
+    def test_retrieve_cached(self):
+        for count, wall in self.walls.items():
+            with self.subTest(assignments=count):
+                first = self.client.get(f"/api/offerwalls/{wall.token}/")
+                response = self.assertQueryBudget(
+                    self.CACHED_RETRIEVE_BUDGET,
+                    lambda: self.client.get(f"/api/offerwalls/{wall.token}/"),
+                )
+                self.assertEqual(response.json(), first.json())
+
+    def test_retrieve_after_change(self):
+        wall = self.walls[50]
+        self.client.get(f"/api/offerwalls/{wall.token}/")
+        wall.name = "Renamed"
+        wall.save()
+
+        response = self.client.get(f"/api/offerwalls/{wall.token}/")
+
+        self.assertEqual(response.json()["name"], "Renamed")
+
+    def test_retrieve_not_modified(self):
+        for count, wall in self.walls.items():
+            wall.refresh_from_db(fields=["version"])
+            with self.subTest(assignments=count):
+                response = self.assertQueryBudget(
+                    self.NOT_MODIFIED_BUDGET,
+                    lambda: self.client.get(
+                        f"/api/offerwalls/{wall.token}/",
+                        HTTP_IF_NONE_MATCH=f'"{wall.version}"',
+                    ),
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_retrieve_unknown_token(self):
+        response = self.assertQueryBudget(
+            self.NOT_FOUND_BUDGET,
+            lambda: self.client.get(f"/api/offerwalls/{uuid.uuid4()}/"),
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch(self):
+        for count in ASSIGNMENT_COUNTS:
+            walls = [wall for size, wall in self.walls.items() if size <= count]
+            tokens = [str(wall.token) for wall in walls] + [str(uuid.uuid4())]
+            with self.subTest(assignments=count):
+                response = self.assertQueryBudget(
+                    self.BATCH_BUDGET,
+                    lambda: self.client.post(
+                        "/api/offerwalls/batch/",
+                        {"tokens": tokens},
+                        content_type="application/json",
+                    ),
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()), len(tokens))
+
+    def test_get_offer_names(self):
+        response = self.assertQueryBudget(
+            self.OFFER_NAMES_BUDGET,
+            lambda: self.client.get("/api/offerwalls/get_offer_names/"),
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class PublishingTests(TestCase):
+    """
+    Changing a wall only removes its published files, so nginx falls back
+    to the API; the watch worker renders it again.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.wall = OfferWall.objects.create(name="Published")
+        cls.other = OfferWall.objects.create(name="Untouched")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = self.settings(OFFERWALL_PUBLISH_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.directory = publish_directory()
+
+    def published(self):
+        return sorted(path.name for path in self.directory.iterdir())
+
+    def test_change_unpublishes_until_the_worker_runs(self):
+        self.assertEqual(publish_offerwalls(), (2, 0))
+        self.assertEqual(pending_offerwalls(), [])
+        files = self.published()
+        self.assertEqual(len(files), 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with collect_changes():
+                self.wall.name = "Renamed"
+                self.wall.save()
+
+        self.assertEqual(
+            self.published(),
+            [name for name in files if str(self.wall.token) not in name],
+        )
+        self.assertEqual(pending_offerwalls(), [self.wall.token])
+
+        self.assertEqual(publish_pending_offerwalls(), (1, 0))
+        self.assertEqual(self.published(), files)
+        self.assertEqual(pending_offerwalls(), [])
+        body = (self.directory / f"{self.wall.token}.json").read_bytes()
+        self.assertEqual(json.loads(body)["name"], "Renamed")
+
+    def test_publish_skips_walls_changed_meanwhile(self):
+        def render_during_change(offerwall):
+            # A change commits while the wall is being rendered
+            OfferWall.bump_versions([offerwall.token])
+            return render_offerwall(offerwall)
+
+        with mock.patch(
+            "admin_panel.publishing.render_offerwall", render_during_change
+        ):
+            self.assertEqual(publish_offerwalls([self.wall.token]), (0, 0))
+
+        self.assertEqual(self.published(), [])
+        self.assertEqual(pending_offerwalls().count(self.wall.token), 1)
+
+
+class OfferRankingTests(QueryBudgetMixin, TestCase):
+    """
+    Reordering runs a fixed number of SQL statements whatever the size of
+    the wall, and moving or adding one offer writes a single assignment.
+    """
+
+    # SAVEPOINT, the UPDATE, the version bump and RELEASE SAVEPOINT
+    REORDER_BUDGET = 4
+    # The above plus the neighbour lookup
+    MOVE_BUDGET = 5
+    # The INSERT and the version bump of the post_save signal
+    APPEND_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.offers = cls.create_offers(max(ASSIGNMENT_COUNTS) + 1)
+        cls.walls = cls.create_walls(cls.offers)
+        renormalize(OfferWallOffer)
+
+    def ranks(self, wall):
+        return dict(
+            OfferWallOffer.objects.filter(offer_wall=wall).values_list(
+                "offer_id", "order"
+            )
+        )
+
+    def offer_ids(self, wall):
+        return [offer.uuid for offer in wall.get_offers()]
+
+    def test_reorder(self):
+        for count, wall in self.walls.items():
+            if count < 2:
+                continue
+            new_order = self.offer_ids(wall)[::-1]
+            with self.subTest(assignments=count):
+                changed = self.assertQueryBudget(
+                    self.REORDER_BUDGET, lambda: wall.reorder_offers(new_order)
+                )
+                self.assertEqual(changed, count)
+                self.assertEqual(self.offer_ids(wall), new_order)
+
+    def test_reorder_keeps_unlisted_offers_after_listed(self):
+        wall = self.walls[50]
+        current = self.offer_ids(wall)
+
+        wall.reorder_offers([current[10], current[3], uuid.uuid4()])
+
+        self.assertEqual(
+            self.offer_ids(wall),
+            [current[10], current[3]]
+            + [offer for offer in current if offer not in (current[3], current[10])],
+        )
+
+    def test_move_writes_one_row(self):
+        for count, wall in self.walls.items():
+            if count < 2:
+                continue
+            current = self.offer_ids(wall)
+            before = self.ranks(wall)
+            with self.subTest(assignments=count):
+                moved = self.assertQueryBudget(
+                    self.MOVE_BUDGET,
+                    lambda: wall.move_offer(current[-1], before=current[0]),
+                )
+                after = self.ranks(wall)
+                self.assertEqual(moved, 1)
+                self.assertEqual(self.offer_ids(wall), [current[-1]] + current[:-1])
+                self.assertEqual(
+                    {offer for offer in after if after[offer] != before[offer]},
+                    {current[-1]},
+                )
+
+    def test_move_renormalizes_when_ranks_run_out(self):
+        wall = self.walls[50]
+        current = self.offer_ids(wall)
+        OfferWallOffer.objects.filter(offer_wall=wall).update(
+            order=F("order") / RANK_GAP
+        )
+
+        wall.move_offer(current[-1], before=current[1])
+
+        self.assertEqual(
+            self.offer_ids(wall), [current[0], current[-1]] + current[1:-1]
+        )
+        ranks = sorted(self.ranks(wall).values())
+        self.assertEqual(ranks[0], RANK_GAP)
+        self.assertTrue(all(b - a > 1 for a, b in zip(ranks, ranks[1:])))
+
+    def test_add_offer_appends(self):
+        for count, wall in self.walls.items():
+            offer = self.offers[-1]
+            with self.subTest(assignments=count):
+                self.assertQueryBudget(
+                    self.APPEND_BUDGET, lambda: wall.add_offer(offer)
+                )
+                self.assertEqual(self.offer_ids(wall)[-1], offer.uuid)
+                self.assertEqual(self.ranks(wall)[offer.uuid], (count + 1) * RANK_GAP)
+
+    def test_add_offer_before(self):
+        wall = self.walls[50]
+        current = self.offer_ids(wall)
+
+        wall.add_offer(self.offers[-1], before=current[1])
+
+        self.assertEqual(
+            self.offer_ids(wall), [current[0], self.offers[-1].uuid] + current[1:]
+        )
+
+    def test_reorder_endpoint(self):
+        user = User.objects.create_superuser("ranker", "ranker@example.com", "x")
+        self.client.force_login(user)
+        wall = self.walls[50]
+        new_order = self.offer_ids(wall)[::-1]
+        url = reverse("admin:offerwall_reorder", args=[wall.token])
+
+        response = self.client.post(
+            url, {"offers": [str(offer) for offer in new_order]}, "application/json"
+        )
+        self.assertEqual(response.json(), {"changed": 50})
+        self.assertEqual(self.offer_ids(wall), new_order)
+
+        response = self.client.post(
+            url,
+            {"offer": str(new_order[0]), "before": None},
+            "application/json",
+        )
+        self.assertEqual(response.json(), {"changed": 1})
+        self.assertEqual(self.offer_ids(wall), new_order[1:] + new_order[:1])
+
+        response = self.client.post(url, {"offer": "nope"}, "application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_save_keeps_gaps(self):
+        user = User.objects.create_superuser("ranker", "ranker@example.com", "x")
+        self.client.force_login(user)
+        wall = OfferWall.objects.create(name="Edited")
+        assignments = OfferWallOffer.objects.bulk_create(
+            OfferWallOffer(offer_wall=wall, offer=offer, order=order)
+            for order, offer in enumerate(self.offers[:3])
+        )
+        data = {"name": wall.name, "url": "", "description": ""}
+        for prefix, rows in (
+            ("offer_assignments", assignments),
+            ("popup_assignments", []),
+        ):
+            data.update(
+                {
+                    f"{prefix}-TOTAL_FORMS": len(rows),
+                    f"{prefix}-INITIAL_FORMS": len(rows),
+                    f"{prefix}-MIN_NUM_FORMS": 0,
+                    f"{prefix}-MAX_NUM_FORMS": 1000,
+                }
+            )
+            # Dense positions, as the inline's drag and drop writes them
+            for i, assignment in enumerate(reversed(rows)):
+                data.update(
+                    {
+                        f"{prefix}-{i}-id": assignment.pk,
+                        f"{prefix}-{i}-offer_wall": wall.pk,
+                        f"{prefix}-{i}-offer": assignment.offer_id,
+                        f"{prefix}-{i}-order": i + 1,
+                    }
+                )
+
+        response = self.client.post(
+            reverse("admin:admin_panel_offerwall_change", args=[wall.pk]), data
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.offer_ids(wall), [offer.uuid for offer in self.offers[2::-1]]
+        )
+        self.assertEqual(
+            sorted(self.ranks(wall).values()), [RANK_GAP, 2 * RANK_GAP, 3 * RANK_GAP]
+        )
+
+
+class OfferAssignmentTests(QueryBudgetMixin, TestCase):
+    """
+    Bulk assignment runs a fixed number of SQL statements whatever the
+    number of walls, and bumps only the walls it changed.
+    """
+
+    # SAVEPOINT, the INSERT or DELETE, the version bump and RELEASE SAVEPOINT
+    ASSIGN_BUDGET = 4
+    # The above plus respacing the walls
+    ASSIGN_AT_POSITION_BUDGET = 5
+    UNASSIGN_BUDGET = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.offers = cls.create_offers(6)
+        cls.walls = OfferWall.objects.bulk_create(
+            OfferWall(name=f"Wall{i}") for i in range(max(ASSIGNMENT_COUNTS))
+        )
+        # Every wall shows Offer0, Offer1 and Offer2, in that order
+        for model in (OfferWallOffer, OfferWallPopupOffer):
+            model.objects.bulk_create(
+                model(offer_wall=wall, offer=offer, order=(rank + 1) * RANK_GAP)
+                for wall in cls.walls
+                for rank, offer in enumerate(cls.offers[:3])
+            )
+
+    def names(self, wall, popup=False):
+        model = OfferWallPopupOffer if popup else OfferWallOffer
+        return list(
+            model.objects.filter(offer_wall=wall)
+            .order_by("order", "id")
+            .values_list("offer__name", flat=True)
+        )
+
+    def versions(self):
+        return dict(OfferWall.objects.values_list("token", "version"))
+
+    def test_assign_positions(self):
+        new = self.offers[3:5]
+        for position, expected in (
+            (None, ["Offer0", "Offer1", "Offer2", "Offer3", "Offer4"]),
+            (0, ["Offer3", "Offer4", "Offer0", "Offer1", "Offer2"]),
+            (1, ["Offer0", "Offer3", "Offer4", "Offer1", "Offer2"]),
+            (3, ["Offer0", "Offer1", "Offer2", "Offer3", "Offer4"]),
+            (10, ["Offer0", "Offer1", "Offer2", "Offer3", "Offer4"]),
+        ):
+            with self.subTest(position=position):
+                wall = OfferWall.objects.create(name=f"At {position}")
+                for offer in self.offers[:3]:
+                    wall.add_offer(offer)
+
+                self.assertEqual(assign_offers(new, [wall], position=position), 2)
+
+                self.assertEqual(self.names(wall), expected)
+
+    def test_assign_skips_existing_pairs(self):
+        wall = self.walls[0]
+        offers = [self.offers[1], self.offers[3], self.offers[3]]
+
+        self.assertEqual(assign_offers(offers, [wall], position=0), 1)
+        self.assertEqual(assign_offers(offers, [wall]), 0)
+
+        self.assertEqual(self.names(wall), ["Offer3", "Offer0", "Offer1", "Offer2"])
+
+    def test_popup_and_regular_assignments_are_separate(self):
+        wall = self.walls[0]
+
+        assign_offers([self.offers[3]], [wall], popup=True)
+        unassign_offers([self.offers[0]], [wall])
+
+        self.assertEqual(self.names(wall), ["Offer1", "Offer2"])
+        self.assertEqual(
+            self.names(wall, popup=True), ["Offer0", "Offer1", "Offer2", "Offer3"]
+        )
+
+    def test_unassign(self):
+        walls = self.walls[:2]
+
+        self.assertEqual(unassign_offers(self.offers[1:4], walls), 4)
+
+        for wall in walls:
+            self.assertEqual(self.names(wall), ["Offer0"])
+            self.assertEqual(
+                self.names(wall, popup=True), ["Offer0", "Offer1", "Offer2"]
+            )
+        self.assertEqual(self.names(self.walls[2]), ["Offer0", "Offer1", "Offer2"])
+
+    def test_remove_from_all_offerwalls(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(user)
+
+        response = self.client.post(
+            reverse("admin:admin_panel_offer_changelist"),
+            {
+                "action": "remove_from_all_offerwalls",
+                "_selected_action": [self.offers[0].pk],
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        for popup in (False, True):
+            model = OfferWallPopupOffer if popup else OfferWallOffer
+            self.assertFalse(model.objects.filter(offer=self.offers[0]).exists())
+            self.assertEqual(self.names(self.walls[0], popup), ["Offer1", "Offer2"])
+
+    def test_bumps_only_changed_walls(self):
+        walls = self.walls[:3]
+        # Already shows Offer3, so assigning it changes nothing there
+        OfferWallOffer.objects.create(
+            offer_wall=walls[0], offer=self.offers[3], order=10 * RANK_GAP
+        )
+        changed = {walls[1].token, walls[2].token}
+
+        for call in (
+            lambda: assign_offers([self.offers[3]], walls),
+            lambda: unassign_offers([self.offers[3]], walls[1:]),
+        ):
+            before = self.versions()
+            with mock.patch(
+                "admin_panel.assignments.publish_changes", wraps=publish_changes
+            ) as publish:
+                call()
+
+            publish.assert_called_once_with(wall_tokens=changed)
+            after = self.versions()
+            self.assertEqual(
+                {token for token in after if after[token] != before[token]}, changed
+            )
+            self.assertTrue(all(after[token] == before[token] + 1 for token in changed))
+
+    def test_statement_budget(self):
+        new = self.offers[5]
+        for count in ASSIGNMENT_COUNTS:
+            walls = self.walls[:count]
+            with self.subTest(walls=count):
+                self.assertEqual(
+                    self.assertQueryBudget(
+                        self.ASSIGN_BUDGET, lambda: assign_offers([new], walls)
+                    ),
+                    count,
+                )
+                self.assertEqual(
+                    self.assertQueryBudget(
+                        self.UNASSIGN_BUDGET, lambda: unassign_offers([new], walls)
+                    ),
+                    count,
+                )
+                self.assertEqual(
+                    self.assertQueryBudget(
+                        self.ASSIGN_AT_POSITION_BUDGET,
+                        lambda: assign_offers([new], walls, position=1),
+                    ),
+                    count,
+                )
+                unassign_offers([new], walls)
+
+
+class OfferWallAdminTests(QueryBudgetMixin, TestCase):
+    """
+    The offerwall change page runs a fixed number of SQL statements however
+    many offers are assigned, and offers are picked through the offer
+    admin's autocomplete search.
+    """
+
+    # Session, user, SAVEPOINT, the wall, both assignment querysets (joined
+    # with their offers) and RELEASE SAVEPOINT
+    CHANGE_PAGE_BUDGET = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        cls.offers = cls.create_offers(max(ASSIGNMENT_COUNTS))
+        cls.walls = cls.create_walls(cls.offers, popups=None)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Cached per process; looked up by the first change page otherwise
+        ContentType.objects.get_for_model(OfferWall)
+
+    def test_change_page(self):
+        for count, wall in self.walls.items():
+            with self.subTest(assignments=count):
+                url = reverse("admin:admin_panel_offerwall_change", args=[wall.pk])
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    len(queries),
+                    self.CHANGE_PAGE_BUDGET,
+                    "\n".join(query["sql"] for query in queries.captured_queries),
+                )
+                # Every card shows its offer, selected in the autocomplete
+                content = response.content.decode()
+                self.assertEqual(content.count(" selected>Offer"), 2 * count)
+
+    def test_offer_autocomplete(self):
+        url = reverse("admin:autocomplete")
+        params = {
+            "app_label": "admin_panel",
+            "model_name": "offerwalloffer",
+            "field_name": "offer",
+        }
+
+        def search(term):
+            response = self.client.get(url, {**params, "term": term})
+            self.assertEqual(response.status_code, 200)
+            return sorted(result["text"] for result in response.json()["results"])
+
+        self.assertEqual(
+            search("offer49"), ["Offer49"] + [f"Offer49{i}" for i in range(10)]
+        )
+        self.assertEqual(search("fer49"), search("offer49"))
+        self.assertEqual(search(str(self.offers[7].uuid)), ["Offer7"])
+        self.assertEqual(search(str(self.offers[7].uuid)[:13]), ["Offer7"])
+        self.assertEqual(
+            search("example.com/12"), ["Offer12"] + [f"Offer12{i}" for i in range(10)]
+        )
+
+
+class OfferImageTests(TestCase):
+    """
+    Uploading offer images only stores the originals; a worker renders the
+    variants later.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        cls.names = OfferChoices.values[:2]
+        Offer.objects.bulk_create(
+            Offer(id=i, name=name) for i, name in enumerate(cls.names)
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = self.settings(MEDIA_ROOT=directory.name, OFFER_IMAGE_WIDTHS=[8, 16])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.variants = Path(directory.name) / VARIANT_DIRECTORY
+        self.client.force_login(self.user)
+
+    def png(self, name, height=32):
+        data = io.BytesIO()
+        Image.new("RGBA", (32, height), "red").save(data, "PNG")
+        return SimpleUploadedFile(f"{name}.png", data.getvalue(), "image/png")
+
+    def test_upload_queues_images(self):
+        response = self.client.post(
+            reverse("admin:offer_add_images"),
+            {
+                "images": [
+                    self.png(self.names[0]),
+                    self.png("NoSuchOffer"),
+                    SimpleUploadedFile(f"{self.names[1]}.png", b"not an image"),
+                ]
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.variants.exists())
+        offer = Offer.objects.get(name=self.names[0])
+        self.assertIsNotNone(offer.image_queued_at)
+        self.assertTrue(original_path(offer.name).is_file())
+        self.assertFalse(
+            Offer.objects.filter(name=self.names[1], image_queued_at__isnull=False)
+        )
+
+        results = process_queued_images()
+
+        self.assertEqual([result.name for result in results], [offer.name])
+        offer.refresh_from_db()
+        self.assertIsNone(offer.image_queued_at)
+        self.assertEqual(
+            sorted((image["width"], image["format"]) for image in offer.images),
+            [(8, "png"), (8, "webp"), (16, "png"), (16, "webp")],
+        )
+        self.assertEqual(len(list(self.variants.iterdir())), 4)
+        self.assertEqual(process_queued_images(), [])
+
+    def test_failed_image_does_not_fail_the_batch(self):
+        def save(image, fp, image_format, **options):
+            if image.size == (8, 12):
+                raise RuntimeError("encoder crashed")
+            return original_save(image, fp, image_format, **options)
+
+        original_save = Image.Image.save
+        broken, fine = self.names
+        images = [(broken, self.png(broken, 48).read()), (fine, self.png(fine).read())]
+        with mock.patch.object(Image.Image, "save", save):
+            with self.assertLogs("admin_panel.images", "ERROR"):
+                results = process_offer_images(images)
+
+        self.assertIsInstance(results[0], ImageProcessingError)
+        self.assertEqual(results[1].name, fine)
+        self.assertEqual(
+            list(Offer.objects.exclude(images=[]).values_list("name", flat=True)),
+            [fine],
+        )
+
+
+class OfferImportTests(TestCase):
+    """
+    CSV imports upsert valid rows on the offer name, report the rejected
+    ones and change nothing when the file as a whole is unusable.
+    """
+
+    HEADER = "id,name,sum_to,term_to,percent_rate,status,url"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.names = OfferChoices.values[:3]
+
+    def csv(self, *rows, header=HEADER):
+        return io.BytesIO("\n".join([header, *rows]).encode())
+
+    def test_rejected_rows_are_reported(self):
+        first, second, _ = self.names
+        summary = import_offers_csv(
+            self.csv(
+                f"1,{first},5000,30,1,True,https://example.com/1",
+                "2,NoSuchOffer,5000,30,1,True,",
+                f"3,{second},5000,thirty,1,True,",
+                f"4,{second},5000",
+            )
+        )
+
+        self.assertEqual((summary.rows, summary.saved, summary.rejected), (4, 1, 3))
+        self.assertEqual(
+            [str(error) for error in summary.errors],
+            [
+                "Line 3: invalid offer name 'NoSuchOffer'",
+                "Line 4: invalid literal for int() with base 10: 'thirty'",
+                "Line 5: too few columns",
+            ],
+        )
+        offer = Offer.objects.get()
+        self.assertEqual(
+            (offer.id, offer.name, offer.sum_to, offer.term_to, offer.percent_rate),
+            (1, first, "5000", 30, 1),
+        )
+        self.assertTrue(offer.is_active)
+
+    def test_reported_errors_are_capped(self):
+        rows = [f"{i},NoSuchOffer,1,1,1,True," for i in range(MAX_REPORTED_ERRORS + 5)]
+
+        summary = import_offers_csv(self.csv(*rows))
+
+        self.assertEqual(summary.rejected, MAX_REPORTED_ERRORS + 5)
+        self.assertEqual(len(summary.errors), MAX_REPORTED_ERRORS)
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(
+            CSVImportError, "CSV is missing required fields: status, url"
+        ):
+            import_offers_csv(
+                self.csv(
+                    f"1,{self.names[0]},5000,30,1",
+                    header="id,name,sum_to,term_to,percent_rate",
+                )
+            )
+
+        self.assertFalse(Offer.objects.exists())
+
+    def test_invalid_utf8(self):
+        data = self.csv(f"1,{self.names[0]},5000,30,1,True,").getvalue()
+
+        with self.assertRaisesMessage(CSVImportError, "File is not valid UTF-8"):
+            import_offers_csv(io.BytesIO(data + b"\n2,\xff\xfe,1,1,1,True,"))
+
+        self.assertFalse(Offer.objects.exists())
+
+    def test_failure_rolls_back_written_batches(self):
+        # Long enough that the bad byte is decoded after batches were written
+        rows = [
+            f"{i},{self.names[i % 3]},5000,30,1,True,https://example.com/{i}"
+            for i in range(500)
+        ]
+        data = self.csv(*rows).getvalue() + b"\n9,\xff,1,1,1,True,"
+
+        with mock.patch.object(importing, "_upsert", wraps=importing._upsert) as upsert:
+            with self.assertRaises(CSVImportError):
+                import_offers_csv(io.BytesIO(data), batch_size=1)
+
+        self.assertGreater(upsert.call_count, 0)
+        self.assertFalse(Offer.objects.exists())
+
+    def test_last_row_for_a_name_wins(self):
+        name = self.names[0]
+
+        summary = import_offers_csv(
+            self.csv(
+                f"1,{name},1000,10,1,True,",
+                f"2,{name},2000,20,2,False,",
+            )
+        )
+
+        self.assertEqual((summary.rows, summary.saved), (2, 1))
+        offer = Offer.objects.get()
+        self.assertEqual((offer.id, offer.sum_to, offer.is_active), (2, "2000", False))
+
+    def test_updates_existing_offer(self):
+        name = self.names[0]
+        existing = Offer.objects.create(id=1, name=name, sum_to="1000", term_to=10)
+
+        summary = import_offers_csv(
+            self.csv(f"7,{name},9000,90,3,False,https://example.com/new")
+        )
+
+        self.assertEqual(summary.saved, 1)
+        offer = Offer.objects.get()
+        self.assertEqual(offer.uuid, existing.uuid)
+        self.assertEqual(
+            (offer.id, offer.sum_to, offer.term_to, offer.percent_rate, offer.url),
+            (7, "9000", 90, 3, "https://example.com/new"),
+        )
+        self.assertFalse(offer.is_active)
+
+    def test_progress_is_reported_per_batch(self):
+        rows = [f"{i},{name},5000,30,1,True," for i, name in enumerate(self.names)]
+        calls = []
+
+        import_offers_csv(
+            self.csv(*rows),
+            batch_size=2,
+            progress=lambda summary: calls.append(summary.rows),
+        )
+
+        self.assertEqual(calls, [2, 3])
+
+
+class OfferImportJobTests(TransactionTestCase):
+    """
+    Import workers claim jobs without blocking each other, report progress
+    while a job runs and keep the outcome on the job. The import runs on a
+    thread with its own connection, so these tests commit for real.
+    """
+
+    HEADER = "id,name,sum_to,term_to,percent_rate,status,url"
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storage = FileSystemStorage(location=directory.name)
+        field = OfferImportJob._meta.get_field("file")
+        patcher = mock.patch.object(field, "storage", storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = storage
+        self.names = OfferChoices.values[:2]
+
+    def job(self, *rows, header=HEADER, **fields):
+        data = "\n".join([header, *rows]).encode()
+        return OfferImportJob.objects.create(
+            file=ContentFile(data, name="offers.csv"),
+            original_name="offers.csv",
+            bytes_total=len(data),
+            **fields,
+        )
+
+    def test_claim_takes_oldest_runnable_job(self):
+        first, second = self.job(), self.job()
+        stale = timezone.now() - timedelta(seconds=STALE_AFTER + 1)
+        given_up = self.job(
+            status=OfferImportJob.Status.RUNNING,
+            attempts=MAX_ATTEMPTS,
+            heartbeat_at=stale,
+        )
+
+        claimed = [claim_job("worker-a"), claim_job("worker-b"), claim_job("c")]
+
+        self.assertEqual(claimed[:2], [first, second])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(claimed[0].status, OfferImportJob.Status.RUNNING)
+        self.assertEqual((claimed[0].worker, claimed[0].attempts), ("worker-a", 1))
+
+        OfferImportJob.objects.filter(pk=first.pk).update(heartbeat_at=stale)
+        retried = claim_job("worker-c")
+        self.assertEqual((retried, retried.attempts), (first, 2))
+
+        self.assertEqual(fail_abandoned_jobs(), 1)
+        given_up.refresh_from_db()
+        self.assertEqual(given_up.status, OfferImportJob.Status.FAILED)
+
+    def test_claim_skips_locked_jobs(self):
+        locked_job, free_job = self.job(), self.job()
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    OfferImportJob.objects.select_for_update().get(pk=locked_job.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        try:
+            self.assertTrue(locked.wait(5))
+            self.assertEqual(claim_job("worker"), free_job)
+            self.assertIsNone(claim_job("worker"))
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(claim_job("worker"), locked_job)
+
+    def test_progress_and_eta_while_running(self):
+        job = self.job(f"1,{self.names[0]},5000,30,1,True,")
+        reported, finish = threading.Event(), threading.Event()
+
+        def slow_import(f, progress):
+            f.read(job.bytes_total // 2)
+            summary = ImportSummary(rows=5, rejected=1)
+            progress(summary)
+            reported.set()
+            finish.wait(5)
+            return summary
+
+        job = claim_job("worker")
+        OfferImportJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - timedelta(seconds=10)
+        )
+        job.refresh_from_db()
+
+        def run():
+            try:
+                run_job(job, interval=0.01)
+            finally:
+                connection.close()
+
+        with mock.patch("admin_panel.import_jobs.import_offers_csv", slow_import):
+            runner = threading.Thread(target=run)
+            runner.start()
+            try:
+                self.assertTrue(reported.wait(5))
+                for _ in range(500):
+                    running = OfferImportJob.objects.get(pk=job.pk)
+                    if running.rows_done:
+                        break
+                    time.sleep(0.01)
+            finally:
+                finish.set()
+                runner.join()
+
+        self.assertEqual(running.status, OfferImportJob.Status.RUNNING)
+        self.assertEqual((running.rows_done, running.rows_rejected), (5, 1))
+        self.assertEqual(running.bytes_done, job.bytes_total // 2)
+        self.assertAlmostEqual(running.progress(), 0.5, delta=0.05)
+        self.assertAlmostEqual(running.eta_seconds(), 10, delta=2)
+
+    def test_worker_runs_job_end_to_end(self):
+        first, second = self.names
+        job = self.job(
+            f"1,{first},5000,30,1,True,https://example.com/1",
+            f"2,{second},7000,60,2,False,",
+            "3,NoSuchOffer,1,1,1,True,",
+        )
+        file_name = job.file.name
+
+        call_command("process_import_jobs", "--once", stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, OfferImportJob.Status.DONE)
+        self.assertEqual(
+            (job.rows_done, job.rows_rejected, job.offers_saved), (3, 1, 2)
+        )
+        self.assertEqual(job.errors, ["Line 4: invalid offer name 'NoSuchOffer'"])
+        self.assertEqual(job.message, "Imported 2 of 3 rows into 2 offers.")
+        self.assertEqual((job.bytes_done, job.progress()), (job.bytes_total, 1.0))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.file.name, "")
+        self.assertFalse(self.storage.exists(file_name))
+        self.assertEqual(
+            sorted(Offer.objects.values_list("name", "sum_to")),
+            sorted([(first, "5000"), (second, "7000")]),
+        )
+
+    def test_worker_marks_failed_job(self):
+        job = self.job(f"1,{self.names[0]},5000", header="id,name,sum_to")
+
+        call_command("process_import_jobs", "--once", stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, OfferImportJob.Status.FAILED)
+        self.assertEqual(
+            job.message,
+            "CSV is missing required fields: percent_rate, status, term_to, url",
+        )
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(self.storage.exists(job.file.name))
+        self.assertFalse(Offer.objects.exists())
+
+    def test_unexpected_error_fails_the_job(self):
+        self.job()
+        job = claim_job("worker")
+
+        with mock.patch(
+            "admin_panel.import_jobs.import_offers_csv",
+            side_effect=RuntimeError("boom"),
+        ):
+            with self.assertLogs("admin_panel.import_jobs", "ERROR"):
+                job = run_job(job, interval=0.01)
+
+        self.assertEqual(job.status, OfferImportJob.Status.FAILED)
+        self.assertEqual(job.message, "Unexpected error: RuntimeError('boom')")
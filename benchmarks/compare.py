@@ -0,0 +1,75 @@
+"""
+Compare two benchmarks/replay.py result files and flag regressions.
+
+Exits with status 1 when any target/endpoint got slower (p50/p95/p99),
+lost throughput, raised its error rate or issued more DB statements per
+request by more than the threshold.
+
+    python -m benchmarks.compare base.json head.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# (metric path, higher is better)
+METRICS = (
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+    (("throughput_rps",), True),
+    (("error_rate",), False),
+    (("db_statements_per_request",), False),
+)
+
+
+def lookup(result: dict, path: tuple[str, ...]):
+    for key in path:
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def compare(base: dict, head: dict, threshold: float) -> list[str]:
+    regressions = []
+    for target, endpoints in head["results"].items():
+        for endpoint, result in endpoints.items():
+            previous = base["results"].get(target, {}).get(endpoint)
+            if previous is None:
+                continue
+            for path, higher_is_better in METRICS:
+                old, new = lookup(previous, path), lookup(result, path)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old * 100 if old else (100.0 if new else 0.0)
+                worse = -change if higher_is_better else change
+                marker = "REGRESSION" if worse > threshold else ""
+                name = ".".join(path)
+                print(
+                    f"{target:<10} {endpoint:<40} {name:<28} "
+                    f"{old:>10} -> {new:>10} ({change:+.1f}%) {marker}"
+                )
+                if marker:
+                    regressions.append(f"{target} {endpoint} {name}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    args = parser.parse_args()
+
+    regressions = compare(
+        json.loads(args.base.read_text()),
+        json.loads(args.head.read_text()),
+        args.threshold,
+    )
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Time the offer CSV import: the old per-row update_or_create loop against
+the streaming bulk upsert in admin_panel/importing.py.
+
+Generates CSV files of the given sizes (random offer names, about 1% bad
+rows) and imports each through both paths, counting SQL statements. Both
+paths write to the configured Django database, updating the offers whose
+names appear in the file. Run from the repository root:
+
+    python -m benchmarks.csv_import --rows 10000 100000
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def build_csv(rows: int, names: list[str], rng: random.Random) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(
+        ["id", "name", "sum_to", "term_to", "percent_rate", "status", "url"]
+    )
+    for i in range(rows):
+        name = rng.choice(names)
+        term_to = str(rng.randint(7, 60))
+        if rng.random() < 0.01:
+            # Unknown offer or non-numeric term: rejected by both paths
+            if rng.random() < 0.5:
+                name = f"Unknown{i}"
+            else:
+                term_to = "thirty"
+        writer.writerow(
+            [
+                names.index(name) + 1 if name in names else i,
+                name,
+                str(rng.randint(1, 50) * 1000),
+                term_to,
+                rng.randint(0, 3),
+                rng.choice(["true", "false"]),
+                f"https://example.com/{name.lower()}",
+            ]
+        )
+    return out.getvalue().encode()
+
+
+def legacy_import(data: bytes) -> int:
+    """The admin's previous import loop, minus the messages."""
+    from admin_panel.models import Offer, OfferChoices
+    from admin_panel.notifications import collect_changes
+
+    choices = [choice[1] for choice in OfferChoices.choices]
+    saved = 0
+    with collect_changes():
+        for row in csv.DictReader(data.decode("utf-8").splitlines()):
+            try:
+                if row["name"] not in choices:
+                    continue
+                Offer.objects.update_or_create(
+                    name=row["name"],
+                    defaults={
+                        "id": int(row["id"]),
+                        "sum_to": row["sum_to"],
+                        "term_to": int(row["term_to"]),
+                        "percent_rate": int(row["percent_rate"]),
+                        "is_active": row["status"].lower() == "true",
+                        "url": row.get("url", ""),
+                    },
+                )
+                saved += 1
+            except (ValueError, KeyError):
+                continue
+    return saved
+
+
+def bulk_import(data: bytes) -> int:
+    from admin_panel.importing import import_offers_csv
+    from admin_panel.notifications import collect_changes
+
+    with collect_changes():
+        summary = import_offers_csv(io.BytesIO(data))
+    return summary.rows - summary.rejected
+
+
+def measure(import_, data: bytes) -> tuple[float, int, int]:
+    from django.db import connection
+
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        started = time.perf_counter()
+        saved = import_(data)
+        elapsed = time.perf_counter() - started
+    return elapsed, queries, saved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="Only time the bulk import (the legacy loop is slow at 100k rows)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "offersAdmin.settings.base")
+    import django
+
+    django.setup()
+    from admin_panel.models import OfferChoices
+
+    names = list(OfferChoices.values)
+    rng = random.Random(args.seed)
+    paths = {"bulk": bulk_import}
+    if not args.skip_legacy:
+        paths = {"update_or_create": legacy_import, **paths}
+
+    print(f"{'rows':>8} {'path':<17} {'seconds':>9} {'rows/s':>9} {'queries':>8}")
+    for rows in args.rows:
+        data = build_csv(rows, names, rng)
+        for name, import_ in paths.items():
+            elapsed, queries, saved = measure(import_, data)
+            print(
+                f"{rows:>8} {name:<17} {elapsed:>9.2f} "
+                f"{saved / elapsed:>9.0f} {queries:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
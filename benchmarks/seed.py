@@ -0,0 +1,248 @@
+"""
+Seed the Django and Litestar databases with N walls x M offers and write a
+replay log for benchmarks/replay.py.
+
+Both services get the same wall tokens, so one log replays against either.
+Run from the repository root with both services' requirements installed:
+
+    python -m benchmarks.seed --walls 500 --offers 50 --requests 20000 \\
+        --log benchmarks/requests.log.jsonl --reset
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+POPUPS_PER_WALL = 3
+
+
+@dataclass
+class SeedOffer:
+    id: int
+    uuid: uuid.UUID
+    name: str
+    url: str
+    is_active: bool
+    sum_to: int
+    term_to: int
+    percent_rate: int
+
+
+@dataclass
+class SeedWall:
+    token: uuid.UUID
+    name: str
+    offers: list[int]
+    popups: list[int]
+
+
+def build_dataset(walls: int, offers: int, offers_per_wall: int, rng: random.Random):
+    catalog = [
+        SeedOffer(
+            id=i + 1,
+            uuid=uuid.UUID(int=rng.getrandbits(128), version=4),
+            name=f"Offer{i + 1}",
+            url=f"https://example.com/offers/{i + 1}",
+            is_active=rng.random() > 0.1,
+            sum_to=rng.choice((5000, 10000, 20000, 50000)),
+            term_to=rng.choice((7, 14, 30, 60)),
+            percent_rate=rng.randint(1, 5),
+        )
+        for i in range(offers)
+    ]
+    ids = [offer.id for offer in catalog]
+    per_wall = min(offers_per_wall, offers)
+    dataset = [
+        SeedWall(
+            token=uuid.UUID(int=rng.getrandbits(128), version=4),
+            name=f"Benchmark wall {i + 1}",
+            offers=rng.sample(ids, per_wall),
+            popups=rng.sample(ids, min(POPUPS_PER_WALL, offers)),
+        )
+        for i in range(walls)
+    ]
+    return catalog, dataset
+
+
+def seed_django(catalog, dataset, reset: bool) -> None:
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "offersAdmin.settings.base")
+    import django
+
+    django.setup()
+    from django.db import transaction
+
+    from admin_panel.models import (Offer, OfferWall, OfferWallOffer,
+                                    OfferWallPopupOffer)
+
+    with transaction.atomic():
+        if reset:
+            OfferWall.objects.all().delete()
+            Offer.objects.all().delete()
+        offers = Offer.objects.bulk_create(
+            Offer(
+                uuid=offer.uuid,
+                id=offer.id,
+                name=offer.name,
+                url=offer.url,
+                is_active=offer.is_active,
+                sum_to=str(offer.sum_to),
+                term_to=offer.term_to,
+                percent_rate=offer.percent_rate,
+            )
+            for offer in catalog
+        )
+        by_id = {offer.id: offer for offer in offers}
+        walls = OfferWall.objects.bulk_create(
+            OfferWall(token=wall.token, name=wall.name) for wall in dataset
+        )
+        OfferWallOffer.objects.bulk_create(
+            (
+                OfferWallOffer(offer_wall=wall, offer=by_id[offer_id], order=order)
+                for wall, seed in zip(walls, dataset)
+                for order, offer_id in enumerate(seed.offers)
+            ),
+            batch_size=5000,
+        )
+        OfferWallPopupOffer.objects.bulk_create(
+            OfferWallPopupOffer(offer_wall=wall, offer=by_id[offer_id], order=order)
+            for wall, seed in zip(walls, dataset)
+            for order, offer_id in enumerate(seed.popups)
+        )
+
+
+def seed_litestar(catalog, dataset, reset: bool, dsn: str | None) -> None:
+    sys.path.insert(0, str(ROOT / "litestar_service"))
+    from resources.db import Base
+    from resources.models import (Offer, OfferWall, OfferWallOffer,
+                                  OfferWallPopupOffer)
+    from resources.settings import settings
+    from sqlalchemy import create_engine, insert
+
+    engine = create_engine(
+        dsn or settings.DATABASE_URL.replace("+asyncpg", "+psycopg2")
+    )
+    with engine.begin() as conn:
+        if reset:
+            Base.metadata.drop_all(conn)
+        Base.metadata.create_all(conn)
+        conn.execute(
+            insert(Offer),
+            [
+                {
+                    "id": offer.id,
+                    "uuid": str(offer.uuid),
+                    "name": offer.name,
+                    "url": offer.url,
+                    "is_active": offer.is_active,
+                    "sum_to": float(offer.sum_to),
+                    "term_to": offer.term_to,
+                    "percent_rate": float(offer.percent_rate),
+                }
+                for offer in catalog
+            ],
+        )
+        conn.execute(
+            insert(OfferWall),
+            [
+                {
+                    "id": i + 1,
+                    "token": str(wall.token),
+                    "name": wall.name,
+                    "url": "",
+                    "description": None,
+                }
+                for i, wall in enumerate(dataset)
+            ],
+        )
+        for model, attr in (
+            (OfferWallOffer, "offers"),
+            (OfferWallPopupOffer, "popups"),
+        ):
+            conn.execute(
+                insert(model),
+                [
+                    {"offer_wall_id": i + 1, "offer_id": offer_id, "order": order}
+                    for i, wall in enumerate(dataset)
+                    for order, offer_id in enumerate(getattr(wall, attr))
+                ],
+            )
+    engine.dispose()
+
+
+def write_log(path: Path, dataset, requests: int, rng: random.Random) -> None:
+    """
+    Traffic mix: popular walls dominate (Zipf-like), a few unknown tokens,
+    batch lookups of 20 walls and the offer names catalog.
+    """
+    tokens = [str(wall.token) for wall in dataset]
+    weights = [1 / (rank + 1) for rank in range(len(tokens))]
+    with path.open("w") as log:
+        for _ in range(requests):
+            roll = rng.random()
+            if roll < 0.80:
+                token = rng.choices(tokens, weights)[0]
+                entry = {
+                    "endpoint": "GET /api/offerwalls/{token}/",
+                    "method": "GET",
+                    "path": f"/api/offerwalls/{token}/",
+                }
+            elif roll < 0.85:
+                entry = {
+                    "endpoint": "GET /api/offerwalls/{token}/",
+                    "method": "GET",
+                    "path": f"/api/offerwalls/{uuid.uuid4()}/",
+                }
+            elif roll < 0.95:
+                entry = {
+                    "endpoint": "POST /api/offerwalls/batch/",
+                    "method": "POST",
+                    "path": "/api/offerwalls/batch/",
+                    "body": {"tokens": rng.choices(tokens, weights, k=20)},
+                }
+            else:
+                entry = {
+                    "endpoint": "GET /api/offerwalls/get_offer_names/",
+                    "method": "GET",
+                    "path": "/api/offerwalls/get_offer_names/",
+                }
+            log.write(json.dumps(entry) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--walls", type=int, default=500)
+    parser.add_argument("--offers", type=int, default=200)
+    parser.add_argument("--offers-per-wall", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument(
+        "--log", type=Path, default=ROOT / "benchmarks/requests.log.jsonl"
+    )
+    parser.add_argument(
+        "--service", choices=("both", "django", "litestar"), default="both"
+    )
+    parser.add_argument("--litestar-dsn", help="sync SQLAlchemy URL of the Litestar DB")
+    parser.add_argument(
+        "--reset", action="store_true", help="delete existing data first"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog, dataset = build_dataset(args.walls, args.offers, args.offers_per_wall, rng)
+    if args.service in ("both", "django"):
+        seed_django(catalog, dataset, args.reset)
+    if args.service in ("both", "litestar"):
+        seed_litestar(catalog, dataset, args.reset, args.litestar_dsn)
+    write_log(args.log, dataset, args.requests, rng)
+    print(f"Seeded {args.walls} walls x {args.offers_per_wall} offers; log: {args.log}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from litestar import Response, get, status_codes
+from resources.warmup import cache_warmer
+
+
+@get("/ready", include_in_schema=False)
+async def get_ready() -> Response[dict]:
+    """Readiness probe: 503 until this worker has warmed its offerwall cache."""
+    return Response(
+        content={
+            "status": "ready" if cache_warmer.ready else "warming",
+            **cache_warmer.as_dict(),
+        },
+        status_code=(
+            status_codes.HTTP_200_OK
+            if cache_warmer.ready
+            else status_codes.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
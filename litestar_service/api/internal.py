@@ -0,0 +1,66 @@
+import os
+import typing
+from dataclasses import asdict
+
+from litestar import Response, Router, get
+from resources.cache import offerwall_cache, snapshot_cache
+from resources.db import engine
+from resources.metrics import pool_status, prometheus_text
+from resources.replicas import replica_pool
+from resources.singleflight import inflight_loads
+from resources.snapshot_file import shared_snapshots
+
+
+def _cache_stats() -> dict[str, dict]:
+    return {
+        cache.name: {"size": len(cache), **asdict(cache.stats)}
+        for cache in (offerwall_cache, snapshot_cache)
+    }
+
+
+@get("/pool/")
+async def get_pool_status() -> dict:
+    """Connection pool state and checkout wait times of this worker."""
+    return pool_status(engine.sync_engine.pool)
+
+
+@get("/caches/")
+async def get_cache_status() -> dict:
+    """Offerwall cache and coalesced load counters of this worker."""
+    return {
+        "pid": os.getpid(),
+        "caches": _cache_stats(),
+        "inflight_loads": {
+            "pending": len(inflight_loads),
+            **asdict(inflight_loads.stats),
+        },
+        "snapshot_file": shared_snapshots.status() if shared_snapshots else None,
+    }
+
+
+@get("/replicas/")
+async def get_replica_status() -> dict:
+    """Read replica health, replay lag and rotation state of this worker."""
+    return {"pid": os.getpid(), **replica_pool.status()}
+
+
+@get("/metrics/")
+async def get_metrics() -> Response[str]:
+    """Per-route latency, SQL and serialization metrics in Prometheus format."""
+    return Response(
+        content=prometheus_text(engine.sync_engine.pool, _cache_stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+# Not proxied by nginx; reach workers directly on the service port.
+ROUTER: typing.Final = Router(
+    path="/internal",
+    route_handlers=[
+        get_pool_status,
+        get_cache_status,
+        get_replica_status,
+        get_metrics,
+    ],
+    include_in_schema=False,
+)
@@ -1,28 +1,122 @@
 import typing
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
 
-from litestar import Router, get, status_codes
+from litestar import (MediaType, Request, Response, Router, get, post,
+                      status_codes)
 from litestar.exceptions import HTTPException
+from resources.catalog import offer_names_catalog
+from resources.instrumentation import serialize_phase
 from resources.repositories import OfferWallRepository
-from resources.schemas import OfferWallSchema
+from resources.schemas import OfferWallBatchSchema, OfferWallSchema
+from resources.settings import settings
+from resources.snapshots import encode_snapshot_map, http_date, offerwall_etag
+from resources.structs import offerwall_content
+
+
+def _not_modified(
+    request: Request, etag: str, updated_at: Optional[datetime] = None
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return if_none_match.strip() == "*" or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since or updated_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at.replace(microsecond=0) <= since
 
 
 @get("/offerwalls/{token:str}/")
-async def get_offerwall(token: str, repo: OfferWallRepository) -> OfferWallSchema:
+async def get_offerwall(
+    token: str, request: Request, repo: OfferWallRepository
+) -> Response[OfferWallSchema]:
+    if settings.OFFERWALL_PREENCODED:
+        snapshot = await repo.get_snapshot(token)
+        if not snapshot:
+            raise HTTPException(
+                status_code=status_codes.HTTP_404_NOT_FOUND,
+                detail="OfferWall not found",
+            )
+        headers = {"ETag": snapshot.etag, "Last-Modified": snapshot.last_modified}
+        if _not_modified(request, snapshot.etag, snapshot.updated_at):
+            return Response(
+                content=b"",
+                status_code=status_codes.HTTP_304_NOT_MODIFIED,
+                headers=headers,
+            )
+        return Response(
+            content=snapshot.body, media_type=MediaType.JSON, headers=headers
+        )
+
     offerwall = await repo.get_by_token(token)
     if not offerwall:
         raise HTTPException(
             status_code=status_codes.HTTP_404_NOT_FOUND, detail="OfferWall not found"
         )
-    return OfferWallSchema.model_validate(offerwall)
+    etag = offerwall_etag(offerwall.version)
+    headers = {"ETag": etag, "Last-Modified": http_date(offerwall.updated_at)}
+    if _not_modified(request, etag, offerwall.updated_at):
+        return Response(
+            content=b"",
+            status_code=status_codes.HTTP_304_NOT_MODIFIED,
+            headers=headers,
+        )
+    with serialize_phase():
+        content = offerwall_content(offerwall)
+    return Response(content=content, headers=headers)
+
+
+@post("/offerwalls/batch/", status_code=status_codes.HTTP_200_OK)
+async def get_offerwalls_batch(
+    data: OfferWallBatchSchema, repo: OfferWallRepository
+) -> Response[Dict[str, Optional[OfferWallSchema]]]:
+    """
+    Resolve many offerwalls at once. The result maps every requested token
+    to its offerwall, or to null when the token is unknown.
+    """
+    if settings.OFFERWALL_PREENCODED:
+        snapshots = await repo.get_snapshots(data.tokens)
+        return Response(
+            content=encode_snapshot_map(snapshots), media_type=MediaType.JSON
+        )
+
+    offerwalls = await repo.get_many_by_token(data.tokens)
+    with serialize_phase():
+        content = {
+            token: offerwall_content(offerwall) if offerwall else None
+            for token, offerwall in offerwalls.items()
+        }
+    return Response(content=content)
 
 
 @get("/offerwalls/get_offer_names/")
-async def get_offer_names(repo: OfferWallRepository) -> dict:
-    names = await repo.get_offer_names()
-    return {"offer_names": names}
+async def get_offer_names(request: Request) -> Response[dict]:
+    catalog = offer_names_catalog
+    headers = {
+        "ETag": catalog.etag,
+        "Cache-Control": f"public, max-age={settings.OFFER_NAMES_MAX_AGE}",
+    }
+    if _not_modified(request, catalog.etag):
+        return Response(
+            content=b"",
+            status_code=status_codes.HTTP_304_NOT_MODIFIED,
+            headers=headers,
+        )
+    return Response(content=catalog.body, media_type=MediaType.JSON, headers=headers)
 
 
 ROUTER: typing.Final = Router(
     path="/api",
-    route_handlers=[get_offerwall, get_offer_names],
+    route_handlers=[get_offerwall, get_offerwalls_batch, get_offer_names],
 )
@@ -0,0 +1,103 @@
+"""
+ORM-to-wire conversion cost of the Pydantic schemas and the msgspec Structs.
+
+Builds transient offerwalls with 10, 100 and 1000 offers (no database
+needed) and times turning each into JSON bytes:
+
+- pydantic:         OfferWallSchema.model_validate(...).model_dump_json()
+- pydantic+litestar: model_validate, then Litestar's response encoder
+- msgspec:          offerwall_struct(...) encoded with msgspec
+
+    python -m benchmarks.encoders --iterations 2000
+"""
+
+import argparse
+import timeit
+import uuid
+
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+from resources.models import (Offer, OfferWall, OfferWallOffer,
+                              OfferWallPopupOffer)
+from resources.schemas import OfferWallSchema
+from resources.structs import encoder, offerwall_struct
+
+
+def build_offerwall(offers: int) -> OfferWall:
+    catalog = [
+        Offer(
+            id=i,
+            uuid=str(uuid.uuid4()),
+            url=f"https://example.com/offers/{i}",
+            is_active=True,
+            name=f"Offer{i}",
+            sum_to="10000",
+            term_to=30,
+            percent_rate=2,
+            images=[
+                {
+                    "url": f"/media/offers/variants/Offer{i}.0123456789abcdef.{width}w.{fmt}",
+                    "width": width,
+                    "height": width // 2,
+                    "format": fmt,
+                }
+                for width in (96, 192, 384)
+                for fmt in ("webp", "png")
+            ],
+        )
+        for i in range(offers)
+    ]
+    return OfferWall(
+        token=str(uuid.uuid4()),
+        name="Benchmark wall",
+        url="https://example.com",
+        description="Ціни та умови",
+        version=1,
+        offer_assignments=[
+            OfferWallOffer(offer=offer, order=order)
+            for order, offer in enumerate(catalog)
+        ],
+        popup_assignments=[
+            OfferWallPopupOffer(offer=offer, order=order)
+            for order, offer in enumerate(catalog[:3])
+        ],
+    )
+
+
+# What Litestar uses to encode Pydantic response content
+litestar_serializer = get_serializer(PydanticInitPlugin.encoders())
+
+ENCODERS = {
+    "pydantic": lambda ow: OfferWallSchema.model_validate(ow).model_dump_json(),
+    "pydantic+litestar": lambda ow: encode_json(
+        OfferWallSchema.model_validate(ow), serializer=litestar_serializer
+    ),
+    "msgspec": lambda ow: encoder.encode(offerwall_struct(ow)),
+}
+
+
+def main(iterations: int) -> None:
+    print(f"{'offers':>6} {'encoder':<18} {'per call (us)':>14} {'speedup':>8}")
+    for offers in (10, 100, 1000):
+        offerwall = build_offerwall(offers)
+        reference = ENCODERS["pydantic"](offerwall).encode()
+        assert encoder.encode(offerwall_struct(offerwall)) == reference
+
+        number = max(1, iterations * 10 // offers)
+        baseline = None
+        for name, encode in ENCODERS.items():
+            best = min(
+                timeit.repeat(lambda: encode(offerwall), number=number, repeat=5)
+            )
+            per_call = best / number * 1e6
+            baseline = baseline or per_call
+            print(
+                f"{offers:>6} {name:<18} {per_call:>14.1f} {baseline / per_call:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.iterations)
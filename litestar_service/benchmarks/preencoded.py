@@ -0,0 +1,107 @@
+"""
+Requests/sec of GET /api/offerwalls/{token}/ with and without pre-encoded
+bodies.
+
+Both modes are served from a warm in-process cache, so the numbers isolate
+the per-request validation and encoding cost; no database is needed.
+
+    python -m benchmarks.preencoded --offers 50 --requests 5000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from litestar.testing import AsyncTestClient
+from resources.application import create_app
+from resources.cache import offerwall_cache, snapshot_cache
+from resources.models import (Offer, OfferWall, OfferWallOffer,
+                              OfferWallPopupOffer)
+from resources.settings import settings
+from resources.snapshots import OfferWallSnapshot
+
+
+def build_offerwall(token: str, offers: int) -> OfferWall:
+    items = [
+        Offer(
+            id=i,
+            uuid=str(uuid.uuid4()),
+            url=f"https://example.com/offers/{i}",
+            is_active=True,
+            name=f"Offer {i}",
+            sum_to="10000",
+            term_to=30,
+            percent_rate=2,
+            images=[
+                {
+                    "url": f"/media/offers/variants/Offer{i}.0123456789abcdef.{width}w.{fmt}",
+                    "width": width,
+                    "height": width // 2,
+                    "format": fmt,
+                }
+                for width in (96, 192, 384)
+                for fmt in ("webp", "png")
+            ],
+        )
+        for i in range(offers)
+    ]
+    return OfferWall(
+        id=1,
+        token=token,
+        name="Benchmark wall",
+        url="https://example.com",
+        description="Benchmark wall",
+        version=1,
+        updated_at=datetime.now(timezone.utc),
+        offer_assignments=[
+            OfferWallOffer(offer=offer, order=i) for i, offer in enumerate(items)
+        ],
+        popup_assignments=[
+            OfferWallPopupOffer(offer=offer, order=i)
+            for i, offer in enumerate(items[:3])
+        ],
+    )
+
+
+async def measure(client: AsyncTestClient, path: str, requests: int) -> float:
+    for _ in range(min(100, requests)):
+        await client.get(path)
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(path)
+        assert response.status_code == 200, response.text
+    return requests / (time.perf_counter() - started)
+
+
+async def main(offers: int, requests: int) -> None:
+    token = "benchmark"
+    offerwall = build_offerwall(token, offers)
+    offerwall_cache.set(token, offerwall)
+    snapshot_cache.set(token, OfferWallSnapshot.from_orm(offerwall))
+
+    path = f"/api/offerwalls/{token}/"
+    app = create_app()
+    # Everything is served from the cache; skip the startup DB ping.
+    app.on_startup.clear()
+
+    results = {}
+    async with AsyncTestClient(app=app) as client:
+        for preencoded in (False, True):
+            settings.OFFERWALL_PREENCODED = preencoded
+            results[preencoded] = await measure(client, path, requests)
+
+    print(f"offers per wall: {offers}, requests: {requests}")
+    print(f"model_validate per request: {results[False]:10.1f} req/s")
+    print(f"pre-encoded bytes:          {results[True]:10.1f} req/s")
+    print(f"speedup:                    {results[True] / results[False]:10.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--offers", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.offers, args.requests))
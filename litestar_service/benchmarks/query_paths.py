@@ -0,0 +1,65 @@
+"""
+Side-by-side load latency of the ORM and json_agg offerwall query paths.
+
+Runs against the database configured in Settings and times loading and
+encoding each offerwall through both paths, bypassing the cache.
+
+    python -m benchmarks.query_paths --iterations 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from resources.db import SessionLocal, engine
+from resources.models import OfferWall
+from resources.repositories import OfferWallRepository
+from resources.settings import settings
+from sqlalchemy import select
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(mode: str, tokens: list[str], iterations: int) -> list[float]:
+    settings.OFFERWALL_QUERY_MODE = mode
+    samples = []
+    async with SessionLocal() as session:
+        repo = OfferWallRepository(session)
+        for i in range(iterations):
+            token = tokens[i % len(tokens)]
+            started = time.perf_counter()
+            snapshot = await repo._load_snapshot(token)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert snapshot is not None, token
+    return samples
+
+
+async def main(iterations: int, walls: int) -> None:
+    async with SessionLocal() as session:
+        tokens = list(await session.scalars(select(OfferWall.token).limit(walls)))
+    if not tokens:
+        raise SystemExit("No offerwalls in the database")
+
+    print(f"walls: {len(tokens)}, iterations: {iterations}")
+    print(f"{'path':<6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for mode in ("orm", "json"):
+        await measure(mode, tokens, min(50, iterations))
+        samples = await measure(mode, tokens, iterations)
+        print(
+            f"{mode:<6} {statistics.mean(samples):8.3f} "
+            f"{percentile(samples, 50):8.3f} {percentile(samples, 95):8.3f} "
+            f"{percentile(samples, 99):8.3f}"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--walls", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.walls))
@@ -0,0 +1,3 @@
+#!/bin/sh
+# Let the replica stream WAL from the primary with the regular credentials.
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
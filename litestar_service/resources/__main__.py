@@ -1,3 +1,53 @@
-from resources.application import create_app
+"""
+Production entry point: ``python -m resources``.
 
-app = create_app()
+Runs Granian with the server options from Settings. Workers are started
+with the ``spawn`` method, so each one imports the app and reads .env and
+the environment afresh. On SIGHUP Granian re-reads .env and replaces the
+workers one at a time; an old worker stops accepting connections and gets
+GRANIAN_WORKERS_KILL_TIMEOUT seconds to finish the requests it holds, so
+config changes roll out without dropping in-flight offerwall requests.
+"""
+
+import multiprocessing
+import os
+from pathlib import Path
+
+from granian import Granian
+from granian.constants import Interfaces, Loops, RuntimeModes
+from granian.http import HTTP1Settings
+from resources.settings import settings
+
+
+def build_server() -> Granian:
+    return Granian(
+        "resources.application:create_app",
+        factory=True,
+        interface=Interfaces.ASGI,
+        address=settings.GRANIAN_HOST,
+        port=settings.GRANIAN_PORT,
+        workers=settings.GRANIAN_WORKERS or os.cpu_count() or 1,
+        runtime_threads=settings.GRANIAN_RUNTIME_THREADS,
+        runtime_mode=RuntimeModes(settings.GRANIAN_RUNTIME_MODE),
+        loop=Loops(settings.GRANIAN_LOOP),
+        backlog=settings.GRANIAN_BACKLOG,
+        backpressure=settings.GRANIAN_BACKPRESSURE,
+        http1_settings=HTTP1Settings(
+            keep_alive=settings.GRANIAN_HTTP1_KEEP_ALIVE,
+            header_read_timeout=settings.GRANIAN_HTTP1_HEADER_READ_TIMEOUT,
+        ),
+        respawn_failed_workers=True,
+        respawn_interval=settings.GRANIAN_RESPAWN_INTERVAL,
+        workers_lifetime=settings.GRANIAN_WORKERS_LIFETIME,
+        workers_max_rss=settings.GRANIAN_WORKERS_MAX_RSS,
+        workers_kill_timeout=settings.GRANIAN_WORKERS_KILL_TIMEOUT,
+        log_access=settings.GRANIAN_LOG_ACCESS,
+        env_files=[Path(".env")] if Path(".env").exists() else None,
+    )
+
+
+if __name__ == "__main__":
+    # Forked workers would inherit the settings loaded here and ignore a
+    # reload; spawned ones import everything again.
+    multiprocessing.set_start_method("spawn")
+    build_server().serve()
@@ -1,10 +1,19 @@
 from litestar import Litestar
+from litestar.di import Provide
 from litestar.openapi import OpenAPIConfig
 from litestar.openapi.plugins import SwaggerRenderPlugin
-from resources.db import on_shutdown, on_startup
+from resources.db import on_shutdown, on_startup, provide_session
+from resources.instrumentation import (InstrumentationMiddleware,
+                                       mark_handler_returned)
+from resources.repositories import provide_repository
+from resources.snapshot_file import (start_shared_snapshots,
+                                     stop_shared_snapshots)
+from resources.warmup import cache_warmer
 
 
 def create_app() -> Litestar:
+    from api.health import get_ready
+    from api.internal import ROUTER as INTERNAL_ROUTER
     from api.offerwalls import ROUTER
 
     openapi = OpenAPIConfig(
@@ -15,8 +24,14 @@ def create_app() -> Litestar:
     )
 
     return Litestar(
-        route_handlers=[ROUTER],
-        on_startup=[on_startup],
-        on_shutdown=[on_shutdown],
+        route_handlers=[ROUTER, INTERNAL_ROUTER, get_ready],
+        dependencies={
+            "db_session": Provide(provide_session),
+            "repo": Provide(provide_repository),
+        },
+        middleware=[InstrumentationMiddleware()],
+        after_request=mark_handler_returned,
+        on_startup=[on_startup, start_shared_snapshots, cache_warmer.start],
+        on_shutdown=[cache_warmer.stop, stop_shared_snapshots, on_shutdown],
         openapi_config=openapi,
     )
@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Iterable, TypeVar
+
+from resources.settings import settings
+from resources.singleflight import inflight_loads
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded in-process LRU cache with per-entry TTL.
+
+    ``None`` values are cached as negative entries with their own (usually
+    shorter) TTL, so unknown keys don't hit the database on every lookup.
+    The cache is not thread-safe: each worker process owns one instance and
+    only touches it from its event loop.
+
+    ``epoch`` moves on every invalidation. Loaders read it before querying
+    and pass it back to ``set()``, which drops the value if an invalidation
+    arrived in between, so a slow load can't cache data older than the
+    change notification.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, negative_ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = CacheStats()
+        self.epoch = 0
+        self._data: OrderedDict[K, tuple[float, V | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: K) -> tuple[bool, V | None]:
+        """Return ``(found, value)``; ``found`` is True for negative entries too."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return False, None
+
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return True, value
+
+    def set(self, key: K, value: V | None, epoch: int | None = None) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        if epoch is not None and epoch != self.epoch:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: K) -> bool:
+        self.epoch += 1
+        if self._data.pop(key, None) is None:
+            return False
+        self.stats.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self.stats.invalidations += len(self._data)
+        self._data.clear()
+
+
+offerwall_cache: LRUCache = LRUCache(
+    name="offerwalls",
+    maxsize=settings.OFFERWALL_CACHE_MAXSIZE,
+    ttl=settings.OFFERWALL_CACHE_TTL,
+    negative_ttl=settings.OFFERWALL_CACHE_NEGATIVE_TTL,
+)
+snapshot_cache: LRUCache = LRUCache(
+    name="snapshots",
+    maxsize=settings.OFFERWALL_CACHE_MAXSIZE,
+    ttl=settings.OFFERWALL_CACHE_TTL,
+    negative_ttl=settings.OFFERWALL_CACHE_NEGATIVE_TTL,
+)
+
+
+def invalidate_offerwalls(tokens: Iterable[str] | None) -> None:
+    """Drop cached offerwalls by token; ``None`` drops every entry."""
+    for cache in (offerwall_cache, snapshot_cache):
+        if tokens is None:
+            cache.clear()
+            continue
+        for token in tokens:
+            cache.invalidate(token)
+
+    if tokens is None:
+        inflight_loads.clear()
+        return
+    for token in tokens:
+        for cache in (offerwall_cache, snapshot_cache):
+            inflight_loads.forget((cache.name, token))
@@ -0,0 +1,61 @@
+import hashlib
+import json
+from typing import Final
+
+# Same names, in the same order, as admin_panel.models.OfferChoices, which
+# is what the DRF get_offer_names action serves. Keep the two in sync;
+# tests/test_admin_parity.py compares them.
+OFFER_NAMES: Final = (
+    "Loanplus",
+    "SgroshiCPA2",
+    "Novikredyty",
+    "TurboGroshi",
+    "Crypsee",
+    "Suncredit",
+    "Lehko",
+    "Monto",
+    "Limon",
+    "Amigo",
+    "FirstCredit",
+    "Finsfera",
+    "Pango",
+    "Treba",
+    "StarFin",
+    "BitCapital",
+    "SgroshiCPL",
+    "LoviLave",
+    "Prostocredit",
+    "Sloncredit",
+    "Clickcredit",
+    "Credos",
+    "Dodam",
+    "SelfieCredit",
+    "Egroshi",
+    "Alexcredit",
+    "SgroshiCPA1",
+    "Tengo",
+    "Credit7",
+    "Tpozyka",
+    "Creditkasa",
+    "Moneyveo",
+    "MyCredit",
+    "CreditPlus",
+    "Miloan",
+    "AvansCredit",
+)
+
+
+class OfferNamesCatalog:
+    """
+    Pre-encoded ``{"offer_names": [...]}`` body with a content-hash ETag,
+    built once per worker so the endpoint costs no DB or encoding work.
+    """
+
+    def __init__(self, names: tuple[str, ...]):
+        self.body = json.dumps(
+            {"offer_names": list(names)}, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+
+
+offer_names_catalog: Final = OfferNamesCatalog(OFFER_NAMES)
@@ -1,6 +1,11 @@
 from typing import AsyncGenerator
 
+from resources.instrumentation import instrument_engine
+from resources.metrics import InstrumentedPool
+from resources.notifications import change_listener
+from resources.replicas import replica_pool
 from resources.settings import settings
+from resources.versions import VersionSync
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
                                     create_async_engine)
@@ -11,9 +16,33 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    },
+)
+instrument_engine(engine.sync_engine)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# ETag/Last-Modified versions come from the admin's database; without its
+# DSN the service keeps the versions stored in its own.
+version_sync = (
+    VersionSync(settings.OFFERWALL_CHANGES_DSN, engine)
+    if settings.OFFERWALL_CHANGES_DSN
+    else None
+)
+if version_sync is not None:
+    change_listener.subscribe(version_sync.on_change, first=True)
+
 
 async def provide_session() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
@@ -23,7 +52,21 @@ async def provide_session() -> AsyncGenerator[AsyncSession, None]:
 async def on_startup() -> None:
     async with engine.begin() as conn:
         await conn.execute(text("SELECT 1"))
+    await replica_pool.start()
+
+    if settings.OFFERWALL_CHANGES_LISTEN:
+        if version_sync is not None:
+            await version_sync.start()
+        await change_listener.start()
+        if version_sync is not None:
+            # Once listening, so no change slips in between
+            await version_sync.sync(None)
 
 
 async def on_shutdown() -> None:
+    if settings.OFFERWALL_CHANGES_LISTEN:
+        await change_listener.stop()
+        if version_sync is not None:
+            await version_sync.stop()
+    await replica_pool.stop()
     await engine.dispose()
@@ -0,0 +1,131 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from litestar import Response
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from resources.metrics import route_metrics
+from resources.settings import settings
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class RequestTimings:
+    """
+    Where one request spent its time. Shared by reference with the tasks
+    the request starts, so coalesced loads are charged to the request that
+    ran them.
+    """
+
+    started: float
+    db_statements: int = 0
+    db_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    handler_returned: float | None = None
+
+    def server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_statements} queries", '
+            f"serialize;dur={self.serialize_seconds * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def serialize_phase() -> Iterator[None]:
+    """Charge the enclosed validation/encoding work to the current request."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serialize_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Count statements and their execution time per request. The async
+    engine runs these hooks in a greenlet that shares the caller's context,
+    so ``current_timings`` resolves to the request being served.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        started = conn.info["query_started"].pop()
+        timings = current_timings.get()
+        if timings is not None:
+            timings.db_statements += 1
+            timings.db_seconds += time.perf_counter() - started
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+async def mark_handler_returned(response: Response) -> Response:
+    """
+    ``after_request`` hook: Litestar encodes the response after this point,
+    so the time until the response head is sent counts as serialization.
+    """
+    timings = current_timings.get()
+    if timings is not None:
+        timings.handler_returned = time.perf_counter()
+    return response
+
+
+class InstrumentationMiddleware(ASGIMiddleware):
+    """
+    Record per-route latency, SQL and serialization time, and optionally
+    report them to the client in a ``Server-Timing`` header.
+    """
+
+    scopes = (ScopeType.HTTP,)
+
+    async def handle(
+        self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp
+    ) -> None:
+        timings = RequestTimings(started=time.perf_counter())
+        token = current_timings.set(timings)
+        metrics = route_metrics[(scope["method"], scope["path_template"])]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                if timings.handler_returned is not None:
+                    timings.serialize_seconds += now - timings.handler_returned
+                total = now - timings.started
+                metrics.duration.observe(total)
+                metrics.db_duration.observe(timings.db_seconds)
+                metrics.serialize_duration.observe(timings.serialize_seconds)
+                metrics.db_statements += timings.db_statements
+                metrics.responses[message["status"]] += 1
+                if settings.SERVER_TIMING:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"server-timing", timings.server_timing(total).encode()),
+                    ]
+            await send(message)
+
+        try:
+            await next_app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
@@ -0,0 +1,249 @@
+import os
+import time
+import weakref
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Seconds; tuned for connection checkout and query latencies.
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram, cumulative on export like Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        result = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": dict(self.cumulative()),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    timeouts: int = 0
+    connects: int = 0
+    overflow_connects: int = 0
+    wait: Histogram = field(default_factory=Histogram)
+    records: weakref.WeakSet = field(default_factory=weakref.WeakSet)
+
+    def prepared_statements(self) -> int:
+        """Entries in the asyncpg prepared-statement caches of open connections."""
+        return sum(
+            len(
+                getattr(record.dbapi_connection, "_prepared_statement_cache", None)
+                or ()
+            )
+            for record in list(self.records)
+        )
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Default asyncio queue pool that records how long callers wait for a
+    connection, checkout timeouts and connections opened beyond pool_size.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.wait.observe(time.perf_counter() - started)
+        pool_metrics.checkouts += 1
+        return connection
+
+    def _create_connection(self):
+        record = super()._create_connection()
+        pool_metrics.connects += 1
+        if self._overflow > 0:
+            pool_metrics.overflow_connects += 1
+        pool_metrics.records.add(record)
+        return record
+
+
+def pool_status(pool: InstrumentedPool) -> dict:
+    return {
+        "pid": os.getpid(),
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool_metrics.checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "connects": pool_metrics.connects,
+        "overflow_connects": pool_metrics.overflow_connects,
+        "prepared_statements": pool_metrics.prepared_statements(),
+        "wait_seconds": pool_metrics.wait.snapshot(),
+    }
+
+
+@dataclass
+class RouteMetrics:
+    duration: Histogram = field(default_factory=Histogram)
+    db_duration: Histogram = field(default_factory=Histogram)
+    serialize_duration: Histogram = field(default_factory=Histogram)
+    db_statements: int = 0
+    responses: Counter = field(default_factory=Counter)
+
+
+# Keyed by (method, path template), so cardinality is bounded by the routes.
+route_metrics: defaultdict[tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+
+
+def _labels(**labels: object) -> str:
+    def escape(value: object) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(
+    name: str, histogram: Histogram, **labels: object
+) -> Iterator[str]:
+    for bound, count in histogram.cumulative():
+        yield f"{name}_bucket{_labels(**labels, le=bound)} {count}"
+    yield f"{name}_sum{_labels(**labels)} {histogram.sum}"
+    yield f"{name}_count{_labels(**labels)} {histogram.count}"
+
+
+def prometheus_text(pool: InstrumentedPool, caches: dict[str, dict]) -> str:
+    """Render this worker's metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    routes = sorted(route_metrics.items())
+    family(
+        "offerwall_http_request_duration_seconds",
+        "histogram",
+        "Time from receiving a request to sending its response head.",
+    )
+    for (method, route), metrics in routes:
+        lines.extend(
+            _histogram_lines(
+                "offerwall_http_request_duration_seconds",
+                metrics.duration,
+                method=method,
+                route=route,
+            )
+        )
+    family("offerwall_http_responses_total", "counter", "Responses by status code.")
+    for (method, route), metrics in routes:
+        for status, count in sorted(metrics.responses.items()):
+            lines.append(
+                f"offerwall_http_responses_total"
+                f"{_labels(method=method, route=route, status=status)} {count}"
+            )
+    family(
+        "offerwall_db_statements_total",
+        "counter",
+        "SQL statements executed on behalf of requests.",
+    )
+    for (method, route), metrics in routes:
+        lines.append(
+            f"offerwall_db_statements_total{_labels(method=method, route=route)} "
+            f"{metrics.db_statements}"
+        )
+    family(
+        "offerwall_db_duration_seconds",
+        "histogram",
+        "Time per request spent executing SQL statements.",
+    )
+    for (method, route), metrics in routes:
+        lines.extend(
+            _histogram_lines(
+                "offerwall_db_duration_seconds",
+                metrics.db_duration,
+                method=method,
+                route=route,
+            )
+        )
+    family(
+        "offerwall_serialize_duration_seconds",
+        "histogram",
+        "Time per request spent validating and encoding response bodies.",
+    )
+    for (method, route), metrics in routes:
+        lines.extend(
+            _histogram_lines(
+                "offerwall_serialize_duration_seconds",
+                metrics.serialize_duration,
+                method=method,
+                route=route,
+            )
+        )
+
+    status = pool_status(pool)
+    for key in ("size", "checked_out", "checked_in", "overflow", "prepared_statements"):
+        family(f"offerwall_db_pool_{key}", "gauge", f"Connection pool {key}.")
+        lines.append(f"offerwall_db_pool_{key} {status[key]}")
+    for key in ("checkouts", "timeouts", "connects", "overflow_connects"):
+        family(f"offerwall_db_pool_{key}_total", "counter", f"Connection pool {key}.")
+        lines.append(f"offerwall_db_pool_{key}_total {status[key]}")
+    family(
+        "offerwall_db_pool_wait_seconds",
+        "histogram",
+        "Time spent waiting for a pooled connection.",
+    )
+    lines.extend(_histogram_lines("offerwall_db_pool_wait_seconds", pool_metrics.wait))
+
+    for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        family(f"offerwall_cache_{key}_total", "counter", f"Offerwall cache {key}.")
+        for name, stats in sorted(caches.items()):
+            lines.append(
+                f"offerwall_cache_{key}_total{_labels(cache=name)} {stats[key]}"
+            )
+    family("offerwall_cache_size", "gauge", "Entries held by the offerwall cache.")
+    for name, stats in sorted(caches.items()):
+        lines.append(f"offerwall_cache_size{_labels(cache=name)} {stats['size']}")
+
+    return "\n".join(lines) + "\n"
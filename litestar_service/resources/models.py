@@ -1,5 +1,9 @@
+from datetime import datetime
+
 from resources.db import Base
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import (BigInteger, DateTime, ForeignKey, String, Text, func,
+                        text)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 
@@ -8,18 +12,24 @@ class Offer(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     uuid: Mapped[str] = mapped_column(String(64), unique=True)
-    url: Mapped[str] = mapped_column(Text)
+    url: Mapped[str | None] = mapped_column(Text)
     is_active: Mapped[bool]
     name: Mapped[str]
-    sum_to: Mapped[float]
-    term_to: Mapped[int]
-    percent_rate: Mapped[float]
+    # Same types as the admin's Offer model, so both APIs render the same JSON
+    sum_to: Mapped[str | None]
+    term_to: Mapped[int | None]
+    percent_rate: Mapped[int | None]
+    # Resized image variants: [{"url", "width", "height", "format"}, ...]
+    images: Mapped[list] = mapped_column(
+        JSONB, default=list, server_default=text("'[]'::jsonb")
+    )
 
 
 class OfferWallOffer(Base):
     __tablename__ = "offer_wall_offers"
 
     id: Mapped[int] = mapped_column(primary_key=True)
+    offer_wall_id: Mapped[int] = mapped_column(ForeignKey("offer_walls.id"))
     offer_id: Mapped[int] = mapped_column(ForeignKey("offers.id"))
     offer: Mapped["Offer"] = relationship("Offer", lazy="joined")
     order: Mapped[int]
@@ -29,8 +39,10 @@ class OfferWallPopupOffer(Base):
     __tablename__ = "offer_wall_popup_offers"
 
     id: Mapped[int] = mapped_column(primary_key=True)
+    offer_wall_id: Mapped[int] = mapped_column(ForeignKey("offer_walls.id"))
     offer_id: Mapped[int] = mapped_column(ForeignKey("offers.id"))
     offer: Mapped["Offer"] = relationship("Offer", lazy="joined")
+    order: Mapped[int]
 
 
 class OfferWall(Base):
@@ -38,13 +50,17 @@ class OfferWall(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     token: Mapped[str] = mapped_column(String(64), unique=True)
-    name: Mapped[str]
-    url: Mapped[str]
+    name: Mapped[str | None]
+    url: Mapped[str | None]
     description: Mapped[str | None]
+    version: Mapped[int] = mapped_column(BigInteger, default=1)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
 
     offer_assignments: Mapped[list["OfferWallOffer"]] = relationship(
         "OfferWallOffer", lazy="selectin", order_by="OfferWallOffer.order"
     )
     popup_assignments: Mapped[list["OfferWallPopupOffer"]] = relationship(
-        "OfferWallPopupOffer", lazy="selectin"
+        "OfferWallPopupOffer", lazy="selectin", order_by="OfferWallPopupOffer.order"
     )
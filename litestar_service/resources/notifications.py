@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+import asyncpg
+from resources.cache import invalidate_offerwalls
+from resources.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OfferWallChange:
+    """
+    One notification from the Django admin change feed.
+
+    ``everything`` is set when the publisher could not list the affected
+    objects (payload too large) or when notifications may have been missed
+    while the listener was reconnecting.
+    """
+
+    wall_tokens: frozenset[str] = field(default_factory=frozenset)
+    offer_ids: frozenset[int] = field(default_factory=frozenset)
+    everything: bool = False
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "OfferWallChange":
+        data = json.loads(payload)
+        return cls(
+            wall_tokens=frozenset(data.get("walls", ())),
+            offer_ids=frozenset(data.get("offers", ())),
+            everything=bool(data.get("all", False)),
+        )
+
+
+ChangeHandler = Callable[[OfferWallChange], Awaitable[None] | None]
+
+
+class ChangeListener:
+    """
+    Dedicated asyncpg connection LISTENing on the offerwall change channel.
+
+    The connection lives outside the SQLAlchemy pool so it never competes
+    with request traffic. If it drops, the listener reconnects with backoff
+    and reports an ``everything`` change, since notifications sent while it
+    was away are lost.
+    """
+
+    def __init__(self, dsn: str, channel: str, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.handlers: list[ChangeHandler] = []
+        self._connection: asyncpg.Connection | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        # The loop only keeps weak references to tasks
+        self._dispatches: set[asyncio.Task] = set()
+        self._closing = False
+
+    def subscribe(self, handler: ChangeHandler, first: bool = False) -> None:
+        """Handlers run one after another; ``first`` puts this one ahead."""
+        if first:
+            self.handlers.insert(0, handler)
+        else:
+            self.handlers.append(handler)
+
+    async def start(self) -> None:
+        self._closing = False
+        await self._connect()
+
+    async def stop(self) -> None:
+        self._closing = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._connection and not self._connection.is_closed():
+            await self._connection.close()
+        self._connection = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches)
+
+    async def _connect(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        connection.add_termination_listener(self._on_termination)
+        await connection.add_listener(self.channel, self._on_notification)
+        self._connection = connection
+
+    def _on_notification(self, _connection, _pid, _channel, payload: str) -> None:
+        try:
+            change = OfferWallChange.from_payload(payload)
+        except (ValueError, TypeError):
+            logger.warning("Malformed change notification: %r", payload)
+            change = OfferWallChange(everything=True)
+        task = asyncio.ensure_future(self.dispatch(change))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    def _on_termination(self, _connection) -> None:
+        if self._closing or self._reconnect_task:
+            return
+        self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = self.reconnect_delay
+        try:
+            while not self._closing:
+                try:
+                    await self._connect()
+                except (OSError, asyncpg.PostgresError) as exc:
+                    logger.warning("Change listener reconnect failed: %s", exc)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+                    continue
+                await self.dispatch(OfferWallChange(everything=True))
+                return
+        finally:
+            self._reconnect_task = None
+
+    async def dispatch(self, change: OfferWallChange) -> None:
+        for handler in self.handlers:
+            try:
+                result = handler(change)
+                if result is not None:
+                    await result
+            except Exception:
+                logger.exception("Change handler %r failed", handler)
+
+
+def invalidate_cached_offerwalls(change: OfferWallChange) -> None:
+    invalidate_offerwalls(None if change.everything else change.wall_tokens)
+
+
+change_listener = ChangeListener(
+    dsn=settings.LISTENER_DSN, channel=settings.OFFERWALL_CHANGES_CHANNEL
+)
+change_listener.subscribe(invalidate_cached_offerwalls)
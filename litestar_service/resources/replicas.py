@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+
+from resources.instrumentation import instrument_engine
+from resources.notifications import change_listener
+from resources.settings import settings
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
+
+logger = logging.getLogger(__name__)
+
+# Replay lag in seconds; 0 when the replica has replayed everything it
+# received, so an idle primary doesn't look like a lagging replica. That
+# only holds while WAL is streaming in: NULL (out of rotation) for a
+# replica whose WAL receiver is gone and for a server that is not in
+# recovery, which may have diverged from the primary. Without
+# pg_read_all_stats the receiver's status reads as NULL, so only its
+# presence is checked.
+LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE coalesce(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(
+            extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+# Errors that take a replica out of rotation when a read fails on it
+READ_ERRORS = (exc.DBAPIError, exc.TimeoutError, OSError, asyncio.TimeoutError)
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session: async_sessionmaker[AsyncSession]
+    weight: int = 1
+    healthy: bool = False
+    lag: float | None = None
+    last_error: str | None = None
+    failures: int = 0
+    # Smooth weighted round-robin state
+    current_weight: int = field(default=0, repr=False)
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "last_error": self.last_error,
+            "failures": self.failures,
+        }
+
+
+class ReplicaPool:
+    """
+    Read replicas with health checks and weighted round-robin.
+
+    A background task measures every replica's replay lag each
+    ``check_interval`` seconds. Replicas that fail the check, lag more than
+    ``max_lag`` or fail a read are skipped until a later check passes; with
+    none left, reads fall back to the primary.
+
+    Cache loads right after a change notification must not read the old
+    row from a replica that has not replayed the change yet, or the stale
+    wall would be cached for the full TTL. ``pin_primary()`` sends all reads
+    to the primary until every healthy replica is guaranteed to have caught
+    up.
+    """
+
+    def __init__(
+        self,
+        replicas: list[Replica],
+        max_lag: float,
+        check_interval: float,
+        check_timeout: float,
+    ):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.primary_until = 0.0
+        self.primary_reads = 0
+        self._task: asyncio.Task | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Replica | None:
+        """Next healthy replica by smooth weighted round-robin, or None."""
+        if time.monotonic() < self.primary_until:
+            self.primary_reads += 1
+            return None
+
+        best = None
+        total = 0
+        for replica in self.replicas:
+            if not replica.healthy:
+                continue
+            replica.current_weight += replica.weight
+            total += replica.weight
+            if best is None or replica.current_weight > best.current_weight:
+                best = replica
+        if best is None:
+            self.primary_reads += 1
+            return None
+        best.current_weight -= total
+        return best
+
+    def pin_primary(self) -> None:
+        self.primary_until = time.monotonic() + self.max_lag + self.check_interval
+
+    def mark_down(self, replica: Replica, error: BaseException) -> None:
+        if replica.healthy:
+            logger.warning("Replica %s taken out of rotation: %r", replica.name, error)
+        replica.healthy = False
+        replica.failures += 1
+        replica.last_error = repr(error)
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with replica.engine.connect() as conn:
+                    lag = await conn.scalar(LAG_SQL)
+        except READ_ERRORS as error:
+            replica.lag = None
+            self.mark_down(replica, error)
+            return
+
+        if lag is None:
+            replica.lag = None
+            self.mark_down(
+                replica, RuntimeError("not streaming WAL from the primary")
+            )
+            return
+        replica.lag = lag = float(lag)
+        if lag > self.max_lag:
+            self.mark_down(replica, RuntimeError(f"replay lag {lag:.1f}s"))
+            return
+        if not replica.healthy:
+            logger.info("Replica %s back in rotation (lag %.2fs)", replica.name, lag)
+        replica.healthy = True
+        replica.last_error = None
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check_all()
+
+    async def start(self) -> None:
+        if not self.replicas or self._task is not None:
+            return
+        await self.check_all()
+        self._task = asyncio.create_task(self._run(), name="replica-health")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def status(self) -> dict:
+        return {
+            "max_lag_seconds": self.max_lag,
+            "primary_pinned": time.monotonic() < self.primary_until,
+            "primary_reads": self.primary_reads,
+            "replicas": [replica.status() for replica in self.replicas],
+        }
+
+
+def _replica(dsn: str, weight: int) -> Replica:
+    url = make_url(dsn).set(drivername="postgresql+asyncpg")
+    engine = create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "timeout": settings.DB_REPLICA_CHECK_TIMEOUT,
+        },
+    )
+    instrument_engine(engine.sync_engine)
+    return Replica(
+        name=url.render_as_string(hide_password=True),
+        engine=engine,
+        session=async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession),
+        weight=weight,
+    )
+
+
+def build_replica_pool() -> ReplicaPool:
+    weights = settings.DB_REPLICA_WEIGHTS or [1] * len(settings.DB_REPLICA_URLS)
+    if len(weights) != len(settings.DB_REPLICA_URLS):
+        raise ValueError(
+            "DB_REPLICA_WEIGHTS needs one weight per DB_REPLICA_URLS entry"
+        )
+    return ReplicaPool(
+        [
+            _replica(dsn, weight)
+            for dsn, weight in zip(settings.DB_REPLICA_URLS, weights)
+        ],
+        max_lag=settings.DB_REPLICA_MAX_LAG,
+        check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+        check_timeout=settings.DB_REPLICA_CHECK_TIMEOUT,
+    )
+
+
+replica_pool = build_replica_pool()
+if replica_pool:
+    change_listener.subscribe(lambda change: replica_pool.pin_primary())
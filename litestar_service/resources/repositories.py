@@ -1,18 +1,233 @@
+from typing import Iterable
+
+from resources.cache import LRUCache, offerwall_cache, snapshot_cache
+from resources.db import SessionLocal
 from resources.models import (Offer, OfferWall, OfferWallOffer,
                               OfferWallPopupOffer)
-from sqlalchemy import select
+from resources.replicas import READ_ERRORS, replica_pool
+from resources.settings import settings
+from resources.singleflight import inflight_loads
+from resources.snapshot_file import shared_snapshots
+from resources.snapshots import OfferWallSnapshot
+from sqlalchemy import (String, Text, any_, func, literal, literal_column,
+                        select)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 
+def _offer_json():
+    return func.json_build_object(
+        "uuid",
+        Offer.uuid,
+        "id",
+        Offer.id,
+        "url",
+        Offer.url,
+        "is_active",
+        Offer.is_active,
+        "name",
+        Offer.name,
+        "sum_to",
+        Offer.sum_to,
+        "term_to",
+        Offer.term_to,
+        "percent_rate",
+        Offer.percent_rate,
+        "images",
+        Offer.images,
+    )
+
+
+def _assignments_json(model):
+    """Correlated subquery aggregating a wall's assignments ordered by ``order``."""
+    assignment = func.json_build_object("offer", _offer_json())
+    return (
+        select(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(assignment, model.order)),
+                literal_column("'[]'::json"),
+            )
+        )
+        .join(Offer, Offer.id == model.offer_id)
+        .where(model.offer_wall_id == OfferWall.id)
+        .scalar_subquery()
+    )
+
+
+def _token_in(tokens: list[str]):
+    if len(tokens) == 1:
+        return OfferWall.token == tokens[0]
+    return OfferWall.token == any_(literal(tokens, ARRAY(String)))
+
+
+def offerwall_document():
+    """
+    Select the whole offerwall as one JSON document (``text``), in the same
+    shape as ``OfferWallSchema``, so it loads in a single round trip. The
+    wall's version and updated_at come along for the HTTP validators.
+    """
+    return select(
+        func.json_build_object(
+            "token",
+            OfferWall.token,
+            "name",
+            OfferWall.name,
+            "url",
+            OfferWall.url,
+            "description",
+            OfferWall.description,
+            "offer_assignments",
+            _assignments_json(OfferWallOffer),
+            "popup_assignments",
+            _assignments_json(OfferWallPopupOffer),
+        ).cast(Text),
+        OfferWall.version,
+        OfferWall.updated_at,
+    )
+
+
 class OfferWallRepository:
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        cache: LRUCache = offerwall_cache,
+        snapshots: LRUCache = snapshot_cache,
+    ):
         self.session = session
+        self.cache = cache
+        self.snapshots = snapshots
 
     async def get_by_token(self, token: str) -> OfferWall | None:
+        found, offerwall = self.cache.get(token)
+        if found:
+            return offerwall
+        return await self._fill(self.cache, token, OfferWallRepository._load_by_token)
+
+    async def get_many_by_token(
+        self, tokens: Iterable[str]
+    ) -> dict[str, OfferWall | None]:
+        """Resolve many tokens through the cache, loading misses together."""
+        return await self._get_many(
+            tokens, self.cache, OfferWallRepository._load_many_by_token
+        )
+
+    async def get_snapshot(self, token: str) -> OfferWallSnapshot | None:
+        if shared_snapshots is not None:
+            snapshot = shared_snapshots.get(token)
+            if snapshot is not None:
+                return snapshot
+        found, snapshot = self.snapshots.get(token)
+        if found:
+            return snapshot
+        return await self._fill(
+            self.snapshots, token, OfferWallRepository._load_snapshot
+        )
+
+    async def _fill(self, cache: LRUCache, token: str, load):
+        """
+        Load a cache miss once no matter how many requests ask for it.
+
+        The shared load runs on a session of its own, so it outlives the
+        request that happened to start it.
+        """
+
+        async def run():
+            epoch = cache.epoch
+            value = await self._read(load, token)
+            cache.set(token, value, epoch)
+            return value
+
+        return await inflight_loads.do((cache.name, token), run)
+
+    async def _read(self, load, arg, session: AsyncSession | None = None):
+        """
+        Run ``load(repository, arg)`` on a read replica, falling back to the
+        primary when none is usable or the replica fails mid-read.
+
+        The fallback uses ``session`` if given, otherwise a fresh one.
+        """
+        replica = replica_pool.pick()
+        if replica is not None:
+            try:
+                async with replica.session() as replica_session:
+                    return await load(OfferWallRepository(replica_session), arg)
+            except READ_ERRORS as exc:
+                replica_pool.mark_down(replica, exc)
+
+        if session is not None:
+            return await load(OfferWallRepository(session), arg)
+        async with SessionLocal() as session:
+            return await load(OfferWallRepository(session), arg)
+
+    async def get_snapshots(
+        self, tokens: Iterable[str]
+    ) -> dict[str, OfferWallSnapshot | None]:
+        """Resolve many tokens through the cache, loading misses together."""
+        if shared_snapshots is None:
+            return await self._get_many(
+                tokens, self.snapshots, OfferWallRepository._load_snapshots
+            )
+
+        result = {token: shared_snapshots.get(token) for token in tokens}
+        misses = [token for token, snapshot in result.items() if snapshot is None]
+        if misses:
+            result.update(
+                await self._get_many(
+                    misses, self.snapshots, OfferWallRepository._load_snapshots
+                )
+            )
+        return result
+
+    async def _get_many(self, tokens, cache: LRUCache, load) -> dict:
+        result = {}
+        misses = []
+        for token in dict.fromkeys(tokens):
+            found, value = cache.get(token)
+            if found:
+                result[token] = value
+            else:
+                misses.append(token)
+
+        if misses:
+            epoch = cache.epoch
+            loaded = await self._read(load, misses, self.session)
+            for token in misses:
+                result[token] = loaded.get(token)
+                cache.set(token, result[token], epoch)
+        return result
+
+    async def _load_snapshot(self, token: str) -> OfferWallSnapshot | None:
+        return (await self._load_snapshots([token])).get(token)
+
+    async def _load_snapshots(self, tokens: list[str]) -> dict[str, OfferWallSnapshot]:
+        if settings.OFFERWALL_QUERY_MODE == "json":
+            stmt = (
+                offerwall_document()
+                .add_columns(OfferWall.token)
+                .where(_token_in(tokens))
+            )
+            res = await self.session.execute(stmt)
+            return {
+                token: OfferWallSnapshot.from_document(
+                    token, document, version, updated_at
+                )
+                for document, version, updated_at, token in res.all()
+            }
+
+        offerwalls = await self._load_many_by_token(tokens)
+        return {
+            token: OfferWallSnapshot.from_orm(offerwall)
+            for token, offerwall in offerwalls.items()
+        }
+
+    async def _load_by_token(self, token: str) -> OfferWall | None:
+        return (await self._load_many_by_token([token])).get(token)
+
+    async def _load_many_by_token(self, tokens: list[str]) -> dict[str, OfferWall]:
         stmt = (
             select(OfferWall)
-            .where(OfferWall.token == token)
+            .where(_token_in(tokens))
             .options(
                 selectinload(OfferWall.offer_assignments).joinedload(
                     OfferWallOffer.offer
@@ -23,8 +238,8 @@ class OfferWallRepository:
             )
         )
         res = await self.session.execute(stmt)
-        return res.scalars().unique().first()
+        return {offerwall.token: offerwall for offerwall in res.scalars().unique()}
+
 
-    async def get_offer_names(self) -> list[str]:
-        result = await self.session.execute(select(Offer.name).distinct())
-        return [r[0] for r in result.all()]
+async def provide_repository(db_session: AsyncSession) -> OfferWallRepository:
+    return OfferWallRepository(db_session)
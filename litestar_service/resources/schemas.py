@@ -1,18 +1,27 @@
 from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+from resources.settings import settings
+
+
+class OfferImageSchema(BaseModel):
+    url: str
+    width: int
+    height: int
+    format: str
 
 
 class OfferSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     uuid: str
     id: int
-    url: str
+    url: Optional[str]
     is_active: bool
     name: str
-    sum_to: float
-    term_to: int
-    percent_rate: float
+    sum_to: Optional[str]
+    term_to: Optional[int]
+    percent_rate: Optional[int]
+    images: List[OfferImageSchema]
 
 
 class OfferWallOfferSchema(BaseModel):
@@ -28,8 +37,14 @@ class OfferWallPopupOfferSchema(BaseModel):
 class OfferWallSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     token: str
-    name: str
-    url: str
+    name: Optional[str]
+    url: Optional[str]
     description: Optional[str]
     offer_assignments: List[OfferWallOfferSchema]
     popup_assignments: List[OfferWallPopupOfferSchema]
+
+
+class OfferWallBatchSchema(BaseModel):
+    tokens: List[str] = Field(
+        min_length=1, max_length=settings.OFFERWALL_BATCH_MAX_TOKENS
+    )
@@ -0,0 +1,60 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class SingleFlightStats:
+    loads: int = 0
+    coalesced: int = 0
+    errors: int = 0
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Collapse concurrent loads of the same key into one.
+
+    The first caller starts the load as a separate task; everyone asking for
+    the key while it runs awaits that task instead of starting their own.
+    Callers await through ``asyncio.shield``, so a cancelled request only
+    stops waiting and never aborts the load other callers depend on. An
+    exception raised by the load is re-raised in every waiter.
+    """
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        future = self._calls.get(key)
+        if future is None:
+            self.stats.loads += 1
+            future = asyncio.ensure_future(load())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.stats.coalesced += 1
+        return await asyncio.shield(future)
+
+    def forget(self, key: K) -> None:
+        """Let the next caller start a fresh load, e.g. after invalidation."""
+        self._calls.pop(key, None)
+
+    def clear(self) -> None:
+        self._calls.clear()
+
+    def _finish(self, key: K, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Retrieve the exception so an unawaited failure isn't logged as lost.
+        if not future.cancelled() and future.exception() is not None:
+            self.stats.errors += 1
+
+
+inflight_loads: SingleFlight = SingleFlight()
@@ -0,0 +1,364 @@
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+import msgspec
+from resources.db import SessionLocal
+from resources.models import OfferWall
+from resources.notifications import OfferWallChange, change_listener
+from resources.settings import settings
+from resources.snapshots import OfferWallSnapshot
+from sqlalchemy import exc
+
+logger = logging.getLogger(__name__)
+
+# magic, generation, built_from (unix time), index offset, index length
+HEADER = struct.Struct("<8sQdQQ")
+MAGIC = b"OWSNAP01"
+
+
+class IndexEntry(msgspec.Struct, array_like=True, gc=False):
+    token: str
+    offset: int
+    length: int
+    version: int
+    # Microseconds since the epoch, UTC
+    updated_at: int
+
+
+index_encoder = msgspec.msgpack.Encoder()
+index_decoder = msgspec.msgpack.Decoder(list[IndexEntry])
+
+
+def _micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _datetime(micros: int) -> datetime:
+    seconds, micros = divmod(micros, 1_000_000)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=micros)
+
+
+def write_snapshot_file(
+    path: str, generation: int, built_from: float, rows: list[tuple]
+) -> None:
+    """
+    Write ``(token, body, version, updated_at_micros)`` rows as a snapshot
+    file: header, bodies back to back, then the msgpack index. The file is
+    written under a temporary name and renamed over ``path``, so readers
+    only ever map complete files.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    index = []
+    offset = HEADER.size
+    with open(tmp_path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        for token, body, version, updated_at in rows:
+            f.write(body)
+            index.append(IndexEntry(token, offset, len(body), version, updated_at))
+            offset += len(body)
+        index_bytes = index_encoder.encode(index)
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, generation, built_from, offset, len(index_bytes)))
+    os.replace(tmp_path, path)
+
+
+class SnapshotMap:
+    """
+    One snapshot file mapped read-only. A replaced file stays mapped (and
+    valid) until the last reference to its map goes away.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_id = (stat.st_dev, stat.st_ino)
+        magic, self.generation, self.built_from, index_offset, index_length = (
+            HEADER.unpack_from(self.buffer)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an offerwall snapshot file")
+        self.index = {
+            entry.token: entry
+            for entry in index_decoder.decode(
+                self.buffer[index_offset : index_offset + index_length]
+            )
+        }
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def snapshot(self, entry: IndexEntry) -> OfferWallSnapshot:
+        # ASGI servers want ``bytes`` bodies (Granian sends an empty body for
+        # a memoryview), so the slice is copied out of the shared pages.
+        return OfferWallSnapshot.build(
+            entry.token,
+            self.buffer[entry.offset : entry.offset + entry.length],
+            entry.version,
+            _datetime(entry.updated_at),
+        )
+
+    def rows(self, exclude: set[str]) -> list[tuple]:
+        """Rows of this file, bodies as zero-copy views, for an incremental build."""
+        view = memoryview(self.buffer)
+        return [
+            (
+                entry.token,
+                view[entry.offset : entry.offset + entry.length],
+                entry.version,
+                entry.updated_at,
+            )
+            for entry in self.index.values()
+            if entry.token not in exclude
+        ]
+
+
+@dataclass
+class SnapshotFileStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    remaps: int = 0
+    builds: int = 0
+    build_errors: int = 0
+
+
+class SharedSnapshots:
+    """
+    Pre-encoded offerwalls shared by all workers through one mapped file.
+
+    Workers race for an exclusive ``flock`` on ``<path>.lock``; the winner
+    builds the file (in full at startup and every ``refresh`` seconds,
+    incrementally for the walls named in change notifications) and every
+    worker, the builder included, maps whichever file is current.
+
+    A wall named in a change notification is not served from the file
+    until a build that started after the notification was mapped; in the
+    meantime lookups miss and go through the regular cache. Notifications
+    reach the workers at slightly different times, so a build only counts
+    if it started at least one poll interval after this worker heard of the
+    change, and the builder lets changes settle for two poll intervals
+    before picking them up. Files older than ``2 * refresh`` are not served
+    at all, in case the builder is stuck.
+    """
+
+    def __init__(self, path: str, refresh: float, poll_interval: float):
+        self.path = path
+        self.refresh = refresh
+        self.poll_interval = poll_interval
+        self.map: SnapshotMap | None = None
+        self.mapped = asyncio.Event()
+        self.stats = SnapshotFileStats()
+        self.builder = False
+        self._lock_fd: int | None = None
+        self._notified: dict[str, float] = {}
+        self._everything_at = 0.0
+        # Builder only: changed walls and full rebuild requests, by the time
+        # this worker heard of them
+        self._pending: dict[str, float] = {}
+        self._full_at: float | None = 0.0
+        self._last_build = 0.0
+        self._task: asyncio.Task | None = None
+
+    def get(self, token: str) -> OfferWallSnapshot | None:
+        snapshot_map = self.map
+        if snapshot_map is None:
+            return None
+        entry = snapshot_map.index.get(token)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        built_from = snapshot_map.built_from
+        changed_at = max(self._notified.get(token, 0.0), self._everything_at)
+        if (
+            built_from <= changed_at + self.poll_interval
+            or time.time() - built_from > 2 * self.refresh
+        ):
+            self.stats.stale += 1
+            return None
+        self.stats.hits += 1
+        return snapshot_map.snapshot(entry)
+
+    def on_change(self, change: OfferWallChange) -> None:
+        now = time.time()
+        if change.everything:
+            self._everything_at = now
+            if self.builder:
+                self._full_at = now
+            return
+        for token in change.wall_tokens:
+            self._notified[token] = now
+            if self.builder:
+                self._pending[token] = now
+
+    def _try_lock(self) -> bool:
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        self._full_at = 0.0
+        logger.info("Worker %d builds the offerwall snapshot file", os.getpid())
+        return True
+
+    def _remap(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if self.map is not None and self.map.file_id == (stat.st_dev, stat.st_ino):
+            return
+        try:
+            snapshot_map = SnapshotMap(self.path)
+        except (OSError, ValueError) as error:
+            logger.warning("Cannot map %s: %r", self.path, error)
+            return
+
+        self.map = snapshot_map
+        self.stats.remaps += 1
+        covered = snapshot_map.built_from - self.poll_interval
+        self._notified = {
+            token: at for token, at in self._notified.items() if at >= covered
+        }
+        self.mapped.set()
+
+    async def _load(self, tokens: list[str] | None) -> list[tuple]:
+        from resources.repositories import offerwall_document
+
+        stmt = offerwall_document().add_columns(OfferWall.token)
+        if tokens is not None:
+            stmt = stmt.where(OfferWall.token.in_(tokens))
+        rows = []
+        async with SessionLocal() as session:
+            result = await session.stream(stmt.execution_options(yield_per=500))
+            async for document, version, updated_at, token in result:
+                snapshot = OfferWallSnapshot.from_document(
+                    token, document, version, updated_at
+                )
+                rows.append((token, snapshot.body, version, _micros(updated_at)))
+        return rows
+
+    def _settled(self, now: float) -> float:
+        return now - 2 * self.poll_interval
+
+    def _build_due(self, now: float) -> bool:
+        settled = self._settled(now)
+        return (
+            self.map is None
+            or now - self._last_build >= self.refresh
+            or (self._full_at is not None and self._full_at <= settled)
+            or any(at <= settled for at in self._pending.values())
+        )
+
+    async def build(self) -> None:
+        built_from = time.time()
+        settled = self._settled(built_from)
+        full_requested = self._full_at is not None and self._full_at <= settled
+        full = (
+            full_requested
+            or self.map is None
+            or built_from - self._last_build >= self.refresh
+        )
+        tokens = {token for token, at in self._pending.items() if at <= settled}
+        if not full and not tokens:
+            return
+
+        if full:
+            rows = await self._load(None)
+        else:
+            rows = self.map.rows(exclude=tokens)
+            rows.extend(await self._load(sorted(tokens)))
+        generation = self.map.generation + 1 if self.map else 1
+        await asyncio.to_thread(
+            write_snapshot_file, self.path, generation, built_from, rows
+        )
+
+        if full_requested:
+            self._full_at = None
+        for token in tokens if not full else list(self._pending):
+            if self._pending[token] <= settled:
+                del self._pending[token]
+        self._last_build = built_from
+        self.stats.builds += 1
+        self._remap()
+
+    async def _run(self) -> None:
+        while True:
+            if not self.builder:
+                self.builder = self._try_lock()
+            if self.builder and self._build_due(time.time()):
+                try:
+                    await self.build()
+                except (exc.SQLAlchemyError, OSError) as error:
+                    self.stats.build_errors += 1
+                    logger.warning("Snapshot file build failed: %r", error)
+            else:
+                self._remap()
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._remap()
+            self._task = asyncio.create_task(self._run(), name="snapshot-file")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            self.builder = False
+
+    def status(self) -> dict:
+        snapshot_map = self.map
+        return {
+            "path": self.path,
+            "builder": self.builder,
+            "generation": snapshot_map.generation if snapshot_map else None,
+            "offerwalls": len(snapshot_map) if snapshot_map else 0,
+            "age_seconds": (
+                round(time.time() - snapshot_map.built_from, 3)
+                if snapshot_map
+                else None
+            ),
+            **asdict(self.stats),
+        }
+
+
+shared_snapshots: SharedSnapshots | None = None
+if settings.OFFERWALL_SNAPSHOT_FILE and settings.OFFERWALL_PREENCODED:
+    shared_snapshots = SharedSnapshots(
+        settings.OFFERWALL_SNAPSHOT_FILE,
+        refresh=settings.OFFERWALL_SNAPSHOT_FILE_REFRESH,
+        poll_interval=settings.OFFERWALL_SNAPSHOT_FILE_POLL,
+    )
+    change_listener.subscribe(shared_snapshots.on_change)
+
+
+async def start_shared_snapshots() -> None:
+    if shared_snapshots is not None:
+        await shared_snapshots.start()
+
+
+async def stop_shared_snapshots() -> None:
+    if shared_snapshots is not None:
+        await shared_snapshots.stop()
@@ -0,0 +1,102 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from resources.instrumentation import serialize_phase
+from resources.models import OfferWall
+from resources.schemas import OfferWallSchema
+from resources.settings import settings
+from resources.structs import document_decoder, encoder, offerwall_struct
+
+
+@dataclass(frozen=True, slots=True)
+class OfferWallSnapshot:
+    """
+    Immutable, pre-encoded JSON body of one offerwall.
+
+    The body is rendered once when the offerwall is loaded and then served
+    as-is, so cache hits skip both Pydantic validation and JSON encoding.
+    The HTTP validators are derived from the wall's data version and kept
+    alongside, so conditional requests are answered from the cache too.
+    """
+
+    token: str
+    body: bytes
+    etag: str
+    last_modified: str
+    updated_at: datetime
+
+    @classmethod
+    def from_orm(cls, offerwall: OfferWall) -> "OfferWallSnapshot":
+        return cls.build(
+            offerwall.token,
+            encode_offerwall(offerwall),
+            offerwall.version,
+            offerwall.updated_at,
+        )
+
+    @classmethod
+    def from_document(
+        cls, token: str, document: str, version: int, updated_at: datetime
+    ) -> "OfferWallSnapshot":
+        """
+        Build a snapshot from the JSON produced by ``offerwall_document()``.
+
+        Postgres pads ``json_build_object`` output with spaces, so the
+        document goes through the schema once to come out byte-identical
+        to the ORM path.
+        """
+        with serialize_phase():
+            if settings.OFFERWALL_ENCODER == "msgspec":
+                body = encoder.encode(document_decoder.decode(document))
+            else:
+                schema = OfferWallSchema.model_validate_json(document)
+                body = schema.model_dump_json().encode()
+        return cls.build(token, body, version, updated_at)
+
+    @classmethod
+    def build(
+        cls, token: str, body: bytes, version: int, updated_at: datetime
+    ) -> "OfferWallSnapshot":
+        return cls(
+            token=token,
+            body=body,
+            etag=offerwall_etag(version),
+            last_modified=http_date(updated_at),
+            updated_at=updated_at,
+        )
+
+
+def encode_offerwall(offerwall: OfferWall) -> bytes:
+    """
+    Render an offerwall the way the DRF ``OfferWallSerializer`` does:
+    same key order, compact separators and unescaped UTF-8.
+    """
+    with serialize_phase():
+        if settings.OFFERWALL_ENCODER == "msgspec":
+            return encoder.encode(offerwall_struct(offerwall))
+        return OfferWallSchema.model_validate(offerwall).model_dump_json().encode()
+
+
+def encode_snapshot_map(snapshots: dict[str, OfferWallSnapshot | None]) -> bytes:
+    """Join pre-encoded bodies into a token-keyed JSON object; misses are null."""
+    members = (
+        json.dumps(token, ensure_ascii=False).encode()
+        + b":"
+        + (snapshot.body if snapshot else b"null")
+        for token, snapshot in snapshots.items()
+    )
+    with serialize_phase():
+        return b"{" + b",".join(members) + b"}"
+
+
+def offerwall_etag(version: int) -> str:
+    """Same validator the DRF ``OfferWallViewSet.retrieve`` sends."""
+    return f'"{version}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
@@ -0,0 +1,91 @@
+from typing import Optional
+
+import msgspec
+from resources.models import Offer, OfferWall
+from resources.schemas import OfferWallSchema
+from resources.settings import settings
+
+
+class OfferImageStruct(msgspec.Struct, gc=False):
+    url: str
+    width: int
+    height: int
+    format: str
+
+
+class OfferStruct(msgspec.Struct, gc=False):
+    uuid: str
+    id: int
+    url: Optional[str]
+    is_active: bool
+    name: str
+    sum_to: Optional[str]
+    term_to: Optional[int]
+    percent_rate: Optional[int]
+    images: list[OfferImageStruct]
+
+
+class OfferWallOfferStruct(msgspec.Struct, gc=False):
+    offer: OfferStruct
+
+
+class OfferWallPopupOfferStruct(msgspec.Struct, gc=False):
+    offer: OfferStruct
+
+
+class OfferWallStruct(msgspec.Struct):
+    """
+    msgspec mirror of ``OfferWallSchema``, field for field and in the same
+    order, so both encode to identical bytes. Structs are built straight
+    from trusted ORM rows without a validation pass; the Pydantic schemas
+    stay the source of truth for the OpenAPI document.
+    """
+
+    token: str
+    name: Optional[str]
+    url: Optional[str]
+    description: Optional[str]
+    offer_assignments: list[OfferWallOfferStruct]
+    popup_assignments: list[OfferWallPopupOfferStruct]
+
+
+encoder = msgspec.json.Encoder()
+document_decoder = msgspec.json.Decoder(OfferWallStruct)
+
+
+def offer_struct(offer: Offer) -> OfferStruct:
+    return OfferStruct(
+        uuid=offer.uuid,
+        id=offer.id,
+        url=offer.url,
+        is_active=offer.is_active,
+        name=offer.name,
+        sum_to=offer.sum_to,
+        term_to=offer.term_to,
+        percent_rate=offer.percent_rate,
+        images=[OfferImageStruct(**image) for image in offer.images],
+    )
+
+
+def offerwall_struct(offerwall: OfferWall) -> OfferWallStruct:
+    return OfferWallStruct(
+        token=offerwall.token,
+        name=offerwall.name,
+        url=offerwall.url,
+        description=offerwall.description,
+        offer_assignments=[
+            OfferWallOfferStruct(offer=offer_struct(assignment.offer))
+            for assignment in offerwall.offer_assignments
+        ],
+        popup_assignments=[
+            OfferWallPopupOfferStruct(offer=offer_struct(assignment.offer))
+            for assignment in offerwall.popup_assignments
+        ],
+    )
+
+
+def offerwall_content(offerwall: OfferWall) -> OfferWallSchema | OfferWallStruct:
+    """Response content for one offerwall, in the configured encoder's type."""
+    if settings.OFFERWALL_ENCODER == "msgspec":
+        return offerwall_struct(offerwall)
+    return OfferWallSchema.model_validate(offerwall)
@@ -0,0 +1,83 @@
+import logging
+from typing import Iterable
+
+import asyncpg
+from resources.notifications import OfferWallChange
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# The admin's OfferWall table, bumped by ``OfferWall.bump_versions``
+ADMIN_VERSIONS_SQL = """
+SELECT token::text, version, updated_at
+FROM admin_panel_offerwall
+WHERE $1::text[] IS NULL OR token::text = ANY($1::text[])
+"""
+
+# Versions only move forward, so a late sync can't undo a newer one.
+UPDATE_VERSIONS_SQL = text(
+    """
+UPDATE offer_walls AS wall
+SET version = admin.version, updated_at = admin.updated_at
+FROM unnest(
+    CAST(:tokens AS text[]),
+    CAST(:versions AS bigint[]),
+    CAST(:updated_at AS timestamptz[])
+) AS admin(token, version, updated_at)
+WHERE wall.token = admin.token AND wall.version < admin.version
+"""
+)
+
+
+class VersionSync:
+    """
+    Copy offerwall data versions from the Django admin's database.
+
+    The admin bumps ``version`` and ``updated_at`` of every wall it changes
+    (``OfferWall.bump_versions``) before announcing the change. The service
+    derives its ETag and Last-Modified from the same two columns of its own
+    ``offer_walls`` table, so they are copied over on every change
+    notification, for every wall at startup and after the listener missed
+    notifications. Subscribed ahead of the cache handlers, so a wall is
+    never reloaded with the version it had before the change.
+    """
+
+    def __init__(self, dsn: str, engine: AsyncEngine):
+        self.dsn = dsn
+        self.engine = engine
+        self._pool: asyncpg.Pool | None = None
+
+    async def start(self) -> None:
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=1)
+
+    async def stop(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def sync(self, tokens: Iterable[str] | None) -> int:
+        """Copy the versions of ``tokens`` (``None``: all walls); returns the count."""
+        if self._pool is None:
+            return 0
+        rows = await self._pool.fetch(
+            ADMIN_VERSIONS_SQL, None if tokens is None else list(tokens)
+        )
+        if not rows:
+            return 0
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                UPDATE_VERSIONS_SQL,
+                {
+                    "tokens": [row["token"] for row in rows],
+                    "versions": [row["version"] for row in rows],
+                    "updated_at": [row["updated_at"] for row in rows],
+                },
+            )
+        return result.rowcount
+
+    async def on_change(self, change: OfferWallChange) -> None:
+        if change.everything:
+            await self.sync(None)
+        elif change.wall_tokens:
+            await self.sync(change.wall_tokens)
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+
+from resources.cache import offerwall_cache, snapshot_cache
+from resources.db import SessionLocal
+from resources.models import OfferWall
+from resources.repositories import OfferWallRepository
+from resources.settings import settings
+from resources.snapshot_file import shared_snapshots
+from sqlalchemy import exc, select
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmUpStatus:
+    ready: bool = False
+    offerwalls: int = 0
+    queries: int = 0
+    seconds: float | None = None
+    attempts: int = 0
+    last_error: str | None = None
+
+
+class CacheWarmer:
+    """
+    Fill this worker's offerwall cache before it takes its share of traffic.
+
+    With a shared snapshot file, warm means having the file mapped.
+    Otherwise one query lists the walls to load, most recently changed first, and each
+    batch of ``OFFERWALL_WARMUP_BATCH_SIZE`` tokens loads through the
+    repository's batch path (one statement per batch with the json query
+    mode). Startup waits up to ``OFFERWALL_WARMUP_TIMEOUT`` seconds; after
+    that the worker serves cold and warming goes on in the background,
+    retrying on database errors, while ``/ready`` keeps reporting not ready.
+    """
+
+    def __init__(self, retry_delay: float = 1.0):
+        self.retry_delay = retry_delay
+        self.status = WarmUpStatus()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status.ready
+
+    def _limit(self) -> int:
+        if settings.OFFERWALL_CACHE_TTL <= 0:
+            return 0
+        limit = settings.OFFERWALL_CACHE_MAXSIZE
+        if settings.OFFERWALL_WARMUP_LIMIT:
+            limit = min(limit, settings.OFFERWALL_WARMUP_LIMIT)
+        return limit
+
+    async def warm_up(self) -> int:
+        if shared_snapshots is not None:
+            # Served from the shared file; wait until it is mapped.
+            await shared_snapshots.mapped.wait()
+            self.status.offerwalls = len(shared_snapshots.map)
+            return self.status.offerwalls
+
+        limit = self._limit()
+        if limit <= 0:
+            return 0
+
+        batch_size = settings.OFFERWALL_WARMUP_BATCH_SIZE
+        async with SessionLocal() as session:
+            tokens = list(
+                await session.scalars(
+                    select(OfferWall.token)
+                    .order_by(OfferWall.updated_at.desc())
+                    .limit(limit)
+                )
+            )
+            self.status.queries = 1
+            repo = OfferWallRepository(session, offerwall_cache, snapshot_cache)
+            for start in range(0, len(tokens), batch_size):
+                batch = tokens[start : start + batch_size]
+                if settings.OFFERWALL_PREENCODED:
+                    await repo.get_snapshots(batch)
+                else:
+                    await repo.get_many_by_token(batch)
+                self.status.offerwalls += len(batch)
+                self.status.queries += 1
+        return len(tokens)
+
+    async def _run(self) -> None:
+        delay = self.retry_delay
+        started = time.perf_counter()
+        while True:
+            self.status.attempts += 1
+            self.status.offerwalls = 0
+            try:
+                count = await self.warm_up()
+            except (exc.SQLAlchemyError, OSError) as error:
+                self.status.last_error = repr(error)
+                logger.warning(
+                    "Cache warm-up failed, retrying in %.0fs: %r", delay, error
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            break
+
+        self.status.seconds = round(time.perf_counter() - started, 3)
+        self.status.last_error = None
+        self.status.ready = True
+        logger.info(
+            "Cache warmed with %d offerwalls in %.2fs", count, self.status.seconds
+        )
+
+    async def start(self) -> None:
+        self.status = WarmUpStatus()
+        if not settings.OFFERWALL_WARMUP:
+            self.status.ready = True
+            return
+
+        self._task = asyncio.create_task(self._run(), name="cache-warmup")
+        await asyncio.wait({self._task}, timeout=settings.OFFERWALL_WARMUP_TIMEOUT)
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def as_dict(self) -> dict:
+        return asdict(self.status)
+
+
+cache_warmer = CacheWarmer()
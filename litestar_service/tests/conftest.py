@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import asyncpg
+import pytest
+from resources.settings import settings
+
+# Point the service at a throwaway database before resources.db builds the
+# engine, and keep the tests off the admin's change feed.
+settings.POSTGRES_DB = f"test_{settings.POSTGRES_DB}"
+settings.OFFERWALL_CHANGES_LISTEN = False
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+async def _create_database() -> None:
+    conn = await asyncpg.connect(settings.DATABASE_DSN.rsplit("/", 1)[0] + "/postgres")
+    try:
+        exists = await conn.fetchval(
+            "SELECT 1 FROM pg_database WHERE datname = $1", settings.POSTGRES_DB
+        )
+        if not exists:
+            await conn.execute(f'CREATE DATABASE "{settings.POSTGRES_DB}"')
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(scope="session")
+def service_database():
+    """The service's test database, created if missing."""
+    asyncio.run(_create_database())
+
+
+@pytest.fixture(scope="session")
+def admin_django():
+    """
+    The Django admin app from the repository root, for tests that check the
+    service against it. Skipped when Django isn't installed.
+    """
+    django = pytest.importorskip("django")
+    pytest.importorskip("rest_framework")
+    # Appended, not prepended: both trees have top-level packages of the
+    # same name (``benchmarks``) and the service's must win.
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.append(str(REPO_ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "offersAdmin.settings.base")
+    os.environ.setdefault("SECRET_KEY", "litestar-tests")
+    django.setup()
+    return django
+
+
+@pytest.fixture(scope="session")
+def admin_database(admin_django):
+    """
+    A migrated test copy of the admin's database (the ``DB_*`` variables its
+    settings read), which Django's ORM now uses; yields its DSN.
+    """
+    from django.db import connection
+
+    database = connection.settings_dict
+    if not database["NAME"]:
+        pytest.skip("DB_NAME is not set")
+    old_name = database["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    yield (
+        f"postgresql://{database['USER']}:{database['PASSWORD']}"
+        f"@{database['HOST'] or 'localhost'}:{database['PORT'] or 5432}"
+        f"/{database['NAME']}"
+    )
+    connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,117 @@
+"""
+The service must render an offerwall byte for byte like the admin's DRF
+endpoint, since clients get either one depending on routing and caches.
+No database needed; Django models are built in memory.
+"""
+
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from resources.catalog import offer_names_catalog
+from resources.models import (Offer, OfferWall, OfferWallOffer,
+                              OfferWallPopupOffer)
+from resources.settings import settings
+from resources.snapshots import OfferWallSnapshot, encode_offerwall
+
+WALL_TOKEN = uuid.UUID("6f1c2a9e-3b4d-4e5f-8a7b-9c0d1e2f3a4b")
+OFFERS = [
+    {
+        "uuid": uuid.UUID("0b8e6f6c-1a2b-4c3d-9e8f-7a6b5c4d3e2f"),
+        "id": 1,
+        "url": "https://example.com/loanplus",
+        "is_active": True,
+        "name": "Loanplus",
+        "sum_to": "50000",
+        "term_to": 30,
+        "percent_rate": 1,
+        "images": [
+            {
+                "url": "/media/offers/variants/ab12cd34-96.webp",
+                "width": 96,
+                "height": 48,
+                "format": "webp",
+            }
+        ],
+    },
+    {
+        "uuid": uuid.UUID("1c9f7a7d-2b3c-4d4e-8f9a-8b7c6d5e4f3a"),
+        "id": 2,
+        "url": None,
+        "is_active": False,
+        "name": "Займер",
+        "sum_to": None,
+        "term_to": None,
+        "percent_rate": None,
+        "images": [],
+    },
+]
+WALL = {"name": "Главная", "url": None, "description": 'Offers "for" you'}
+
+
+def _admin_body() -> bytes:
+    from rest_framework.renderers import JSONRenderer
+
+    from admin_panel import models
+    from admin_panel.api.offer_walls import OfferWallSerializer
+
+    wall = models.OfferWall(token=WALL_TOKEN, **WALL)
+    offers = [models.Offer(**offer) for offer in OFFERS]
+    wall._prefetched_objects_cache = {
+        "offer_assignments": [
+            models.OfferWallOffer(offer_wall=wall, offer=offer, order=order)
+            for order, offer in enumerate(offers)
+        ],
+        "popup_assignments": [
+            models.OfferWallPopupOffer(offer_wall=wall, offer=offers[0], order=0)
+        ],
+    }
+    return JSONRenderer().render(OfferWallSerializer(wall).data)
+
+
+def _service_offerwall() -> OfferWall:
+    offers = [Offer(**{**offer, "uuid": str(offer["uuid"])}) for offer in OFFERS]
+    return OfferWall(
+        token=str(WALL_TOKEN),
+        version=1,
+        updated_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        offer_assignments=[
+            OfferWallOffer(offer=offer, order=order)
+            for order, offer in enumerate(offers)
+        ],
+        popup_assignments=[OfferWallPopupOffer(offer=offers[0], order=0)],
+        **WALL,
+    )
+
+
+@pytest.fixture(params=["msgspec", "pydantic"])
+def encoder(request, monkeypatch):
+    monkeypatch.setattr(settings, "OFFERWALL_ENCODER", request.param)
+    return request.param
+
+
+def test_orm_encoding_matches_drf(admin_django, encoder):
+    assert encode_offerwall(_service_offerwall()) == _admin_body()
+
+
+def test_document_encoding_matches_drf(admin_django, encoder):
+    admin_body = _admin_body()
+    # json_build_object output is padded the way json.dumps pads by default.
+    document = json.dumps(json.loads(admin_body), ensure_ascii=False)
+
+    snapshot = OfferWallSnapshot.from_document(
+        str(WALL_TOKEN), document, 1, datetime(2025, 1, 1, tzinfo=timezone.utc)
+    )
+
+    assert snapshot.body == admin_body
+
+
+def test_offer_names_match_drf(admin_django):
+    from rest_framework.renderers import JSONRenderer
+
+    from admin_panel.models import OfferChoices
+
+    names = [value for value, _label in OfferChoices.choices]
+
+    assert offer_names_catalog.body == JSONRenderer().render({"offer_names": names})
@@ -0,0 +1,133 @@
+"""
+LRUCache behaviour; no database needed.
+"""
+
+import pytest
+from resources import cache as cache_module
+from resources.cache import LRUCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def _cache(maxsize: int = 3, ttl: float = 10.0, negative_ttl: float = 2.0) -> LRUCache:
+    return LRUCache(name="test", maxsize=maxsize, ttl=ttl, negative_ttl=negative_ttl)
+
+
+def test_get_miss_and_hit(clock):
+    cache = _cache()
+
+    assert cache.get("a") == (False, None)
+    cache.set("a", 1)
+
+    assert cache.get("a") == (True, 1)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = _cache()
+    cache.set("a", 1)
+
+    clock.now += 9.9
+    assert "a" in cache
+    clock.now += 0.1
+
+    assert "a" not in cache
+    assert cache.get("a") == (False, None)
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_negative_entry_uses_negative_ttl(clock):
+    cache = _cache()
+    cache.set("missing", None)
+
+    assert cache.get("missing") == (True, None)
+    clock.now += 2.0
+
+    assert cache.get("missing") == (False, None)
+    assert cache.stats.expirations == 1
+
+
+def test_zero_ttl_disables_caching(clock):
+    cache = _cache(negative_ttl=0)
+    cache.set("missing", None)
+
+    assert cache.get("missing") == (False, None)
+
+
+def test_evicts_least_recently_used(clock):
+    cache = _cache(maxsize=3)
+    for key in "abc":
+        cache.set(key, key)
+
+    # Reading "a" makes "b" the oldest entry.
+    cache.get("a")
+    cache.set("d", "d")
+
+    assert "b" not in cache
+    assert [key for key in "acd" if key in cache] == ["a", "c", "d"]
+    assert cache.stats.evictions == 1
+
+
+def test_set_refreshes_recency(clock):
+    cache = _cache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 3)
+    cache.set("c", 4)
+
+    assert cache.get("a") == (True, 3)
+    assert "b" not in cache
+
+
+def test_invalidate_moves_epoch(clock):
+    cache = _cache()
+    cache.set("a", 1)
+    epoch = cache.epoch
+
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    assert cache.epoch == epoch + 2
+    assert cache.stats.invalidations == 1
+
+
+def test_set_drops_value_loaded_before_invalidation(clock):
+    cache = _cache()
+    epoch = cache.epoch
+
+    # A load started at ``epoch``; a change notification arrives before it
+    # finishes, so its result must not be cached.
+    cache.invalidate("a")
+    cache.set("a", "stale", epoch=epoch)
+
+    assert "a" not in cache
+    cache.set("a", "fresh", epoch=cache.epoch)
+    assert cache.get("a") == (True, "fresh")
+
+
+def test_clear_drops_everything_and_moves_epoch(clock):
+    cache = _cache()
+    cache.set("a", 1)
+    cache.set("b", None)
+    epoch = cache.epoch
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.epoch == epoch + 1
+    assert cache.stats.invalidations == 2
+    cache.set("a", 1, epoch=epoch)
+    assert "a" not in cache
@@ -0,0 +1,57 @@
+"""
+End to end: a change published by the Django admin reaches the listener
+and drops the affected offerwalls from the caches.
+
+Needs Postgres for a test copy of the admin's database, see
+``admin_database`` in conftest.py.
+"""
+
+import asyncio
+import uuid
+
+from resources.cache import (invalidate_offerwalls, offerwall_cache,
+                             snapshot_cache)
+from resources.notifications import (ChangeListener,
+                                     invalidate_cached_offerwalls)
+from resources.settings import settings
+
+
+def _publish(wall_tokens: list[str]) -> None:
+    from django.db import connection
+
+    from admin_panel.notifications import publish_changes
+
+    try:
+        publish_changes(wall_tokens=wall_tokens)
+    finally:
+        connection.close()
+
+
+async def _publish_and_wait(dsn: str, wall_tokens: list[str]) -> None:
+    listener = ChangeListener(dsn=dsn, channel=settings.OFFERWALL_CHANGES_CHANNEL)
+    received = asyncio.Event()
+    listener.subscribe(invalidate_cached_offerwalls)
+    listener.subscribe(lambda change: received.set())
+    await listener.start()
+    try:
+        # Outside a transaction the admin notifies immediately.
+        await asyncio.to_thread(_publish, wall_tokens)
+        await asyncio.wait_for(received.wait(), timeout=5)
+    finally:
+        await listener.stop()
+
+
+def test_admin_change_drops_cached_offerwalls(admin_database):
+    changed, kept = str(uuid.uuid4()), str(uuid.uuid4())
+    for cache in (offerwall_cache, snapshot_cache):
+        cache.set(changed, object())
+        cache.set(kept, object())
+
+    try:
+        asyncio.run(_publish_and_wait(admin_database, [changed]))
+
+        for cache in (offerwall_cache, snapshot_cache):
+            assert changed not in cache
+            assert kept in cache
+    finally:
+        invalidate_offerwalls([changed, kept])
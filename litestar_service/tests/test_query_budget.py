@@ -0,0 +1,168 @@
+"""
+SQL statement budgets per endpoint, constant in the number of assigned offers.
+
+Needs a reachable Postgres; conftest.py points the service at
+``test_<POSTGRES_DB>``, which is created if missing.
+Run from litestar_service: ``python -m pytest tests``.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from litestar.testing import TestClient
+from resources.application import create_app
+from resources.cache import invalidate_offerwalls
+from resources.db import Base, engine
+from resources.models import (Offer, OfferWall, OfferWallOffer,
+                              OfferWallPopupOffer)
+from resources.settings import settings
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+ASSIGNMENT_COUNTS = (1, 50, 500)
+TOKENS = {count: f"wall-{count}" for count in ASSIGNMENT_COUNTS}
+
+
+async def _seed() -> None:
+    # A throwaway engine: the app's pool must not hold connections bound to
+    # this event loop.
+    seed_engine = create_async_engine(settings.DATABASE_URL)
+    async with seed_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Offer),
+            [
+                {
+                    "id": i,
+                    "uuid": str(uuid.uuid4()),
+                    "name": f"Offer{i}",
+                    "url": f"https://example.com/{i}",
+                    "is_active": True,
+                    "sum_to": "1000",
+                    "term_to": 30,
+                    "percent_rate": 1,
+                }
+                for i in range(1, max(ASSIGNMENT_COUNTS) + 1)
+            ],
+        )
+        for wall_id, (count, token) in enumerate(TOKENS.items(), start=1):
+            await conn.execute(
+                insert(OfferWall),
+                [{"id": wall_id, "token": token, "name": f"{count} offers", "url": ""}],
+            )
+            await conn.execute(
+                insert(OfferWallOffer),
+                [
+                    {"offer_wall_id": wall_id, "offer_id": offer_id, "order": offer_id}
+                    for offer_id in range(1, count + 1)
+                ],
+            )
+            await conn.execute(
+                insert(OfferWallPopupOffer),
+                [
+                    {"offer_wall_id": wall_id, "offer_id": offer_id, "order": offer_id}
+                    for offer_id in range(1, min(count, 3) + 1)
+                ],
+            )
+    await seed_engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def client(service_database):
+    asyncio.run(_seed())
+    with TestClient(create_app()) as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+
+@pytest.fixture(
+    params=[(True, "json"), (True, "orm"), (False, "orm")],
+    ids=["preencoded-json", "preencoded-orm", "orm"],
+)
+def mode(request, monkeypatch):
+    preencoded, query_mode = request.param
+    monkeypatch.setattr(settings, "OFFERWALL_PREENCODED", preencoded)
+    monkeypatch.setattr(settings, "OFFERWALL_QUERY_MODE", query_mode)
+    # Budgets are for cold requests; a cache hit runs no SQL at all.
+    invalidate_offerwalls(None)
+    return request.param
+
+
+def _budget(mode) -> int:
+    preencoded, query_mode = mode
+    # The json query builds the whole document; the ORM path adds one
+    # selectin query per assignment relationship.
+    return 1 if preencoded and query_mode == "json" else 3
+
+
+@pytest.mark.parametrize("count", ASSIGNMENT_COUNTS)
+def test_get_offerwall(client, statements, mode, count):
+    response = client.get(f"/api/offerwalls/{TOKENS[count]}/")
+
+    assert response.status_code == 200
+    assert len(response.json()["offer_assignments"]) == count
+    assert len(statements) == _budget(mode), statements
+
+
+def test_get_offerwall_cached(client, statements, mode):
+    client.get(f"/api/offerwalls/{TOKENS[500]}/")
+    statements.clear()
+
+    response = client.get(f"/api/offerwalls/{TOKENS[500]}/")
+
+    assert response.status_code == 200
+    assert statements == []
+
+
+def test_get_offerwall_unknown_token(client, statements, mode):
+    response = client.get("/api/offerwalls/unknown/")
+
+    assert response.status_code == 404
+    assert len(statements) == 1, statements
+
+
+@pytest.mark.parametrize("count", ASSIGNMENT_COUNTS)
+def test_get_offerwalls_batch(client, statements, mode, count):
+    tokens = [token for size, token in TOKENS.items() if size <= count]
+    response = client.post(
+        "/api/offerwalls/batch/", json={"tokens": [*tokens, "unknown"]}
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == len(tokens) + 1
+    assert len(statements) == _budget(mode), statements
+
+
+def test_get_offer_names(client, statements):
+    response = client.get("/api/offerwalls/get_offer_names/")
+
+    assert response.status_code == 200
+    assert statements == []
+
+
+@pytest.mark.parametrize(
+    "if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"]
+)
+def test_get_offer_names_not_modified(client, if_none_match):
+    etag = client.get("/api/offerwalls/get_offer_names/").headers["etag"]
+
+    response = client.get(
+        "/api/offerwalls/get_offer_names/",
+        headers={"If-None-Match": if_none_match.format(etag=etag)},
+    )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
@@ -0,0 +1,125 @@
+"""
+Replica selection and health checks; no database needed, the lag query
+runs against a stub engine.
+"""
+
+import asyncio
+from collections import Counter
+
+from resources.replicas import Replica, ReplicaPool
+
+
+class StubConnection:
+    def __init__(self, engine: "StubEngine"):
+        self.engine = engine
+
+    async def __aenter__(self):
+        if isinstance(self.engine.lag, BaseException):
+            raise self.engine.lag
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def scalar(self, _statement):
+        return self.engine.lag
+
+
+class StubEngine:
+    """Answers the lag query with ``lag``; an exception is raised instead."""
+
+    def __init__(self, lag=0):
+        self.lag = lag
+
+    def connect(self) -> StubConnection:
+        return StubConnection(self)
+
+
+def _replica(name: str, weight: int = 1, lag=0, healthy: bool = True) -> Replica:
+    return Replica(
+        name=name, engine=StubEngine(lag), session=None, weight=weight, healthy=healthy
+    )
+
+
+def _pool(*replicas: Replica, max_lag: float = 5.0) -> ReplicaPool:
+    return ReplicaPool(
+        list(replicas), max_lag=max_lag, check_interval=2.0, check_timeout=1.0
+    )
+
+
+def test_pick_follows_weights_smoothly():
+    pool = _pool(_replica("a", weight=3), _replica("b", weight=1))
+
+    picks = [pool.pick().name for _ in range(8)]
+
+    assert Counter(picks) == {"a": 6, "b": 2}
+    # Smooth: the heavier replica's turns are spread out, not bunched.
+    assert picks[:4] == ["a", "a", "b", "a"]
+
+
+def test_pick_skips_unhealthy_replicas():
+    pool = _pool(_replica("a"), _replica("b", healthy=False))
+
+    assert {pool.pick().name for _ in range(4)} == {"a"}
+
+
+def test_pick_falls_back_to_primary():
+    pool = _pool(_replica("a", healthy=False))
+
+    assert pool.pick() is None
+    assert pool.primary_reads == 1
+
+
+def test_pin_primary_bypasses_healthy_replicas():
+    pool = _pool(_replica("a"))
+
+    pool.pin_primary()
+
+    assert pool.pick() is None
+    assert pool.status()["primary_pinned"] is True
+
+
+def test_check_excludes_lagging_replica():
+    replica = _replica("a", lag=7.5)
+    pool = _pool(replica, max_lag=5.0)
+
+    asyncio.run(pool.check(replica))
+
+    assert replica.healthy is False
+    assert replica.lag == 7.5
+    assert "replay lag 7.5s" in replica.last_error
+    assert pool.pick() is None
+
+
+def test_check_excludes_replica_not_streaming():
+    replica = _replica("a", lag=None)
+    pool = _pool(replica)
+
+    asyncio.run(pool.check(replica))
+
+    assert replica.healthy is False
+    assert replica.lag is None
+    assert "not streaming" in replica.last_error
+
+
+def test_check_excludes_unreachable_replica():
+    replica = _replica("a", lag=OSError("connection refused"))
+    pool = _pool(replica)
+
+    asyncio.run(pool.check(replica))
+
+    assert replica.healthy is False
+    assert replica.failures == 1
+
+
+def test_check_brings_replica_back_once_caught_up():
+    replica = _replica("a", lag=7.5)
+    pool = _pool(replica, max_lag=5.0)
+    asyncio.run(pool.check(replica))
+
+    replica.engine.lag = 0.5
+    asyncio.run(pool.check(replica))
+
+    assert replica.healthy is True
+    assert replica.last_error is None
+    assert pool.pick() is replica
@@ -0,0 +1,134 @@
+"""
+SingleFlight coalescing; no database needed.
+"""
+
+import asyncio
+
+import pytest
+from resources.singleflight import SingleFlight
+
+
+class Load:
+    """A load that blocks until released, counting how often it started."""
+
+    def __init__(self, result=None, error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def _settle() -> None:
+    # Let every task reach its first await.
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_callers_share_one_load():
+    async def run():
+        flight = SingleFlight()
+        load = Load(result="wall")
+        waiters = [asyncio.ensure_future(flight.do("key", load)) for _ in range(5)]
+        await _settle()
+        assert len(flight) == 1
+
+        load.release.set()
+        results = await asyncio.gather(*waiters)
+        return flight, load, results
+
+    flight, load, results = asyncio.run(run())
+
+    assert results == ["wall"] * 5
+    assert load.calls == 1
+    assert (flight.stats.loads, flight.stats.coalesced) == (1, 4)
+    assert len(flight) == 0
+
+
+def test_distinct_keys_load_separately():
+    async def run():
+        flight = SingleFlight()
+        first, second = Load(result=1), Load(result=2)
+        first.release.set()
+        second.release.set()
+        return await asyncio.gather(flight.do("a", first), flight.do("b", second))
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_error_reaches_every_waiter():
+    async def run():
+        flight = SingleFlight()
+        load = Load(error=LookupError("boom"))
+        waiters = [asyncio.ensure_future(flight.do("key", load)) for _ in range(3)]
+        await _settle()
+        load.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(run())
+
+    assert all(isinstance(result, LookupError) for result in results)
+    assert flight.stats.errors == 1
+    assert len(flight) == 0
+
+
+def test_next_call_after_error_loads_again():
+    async def run():
+        flight = SingleFlight()
+        failing = Load(error=LookupError("boom"))
+        failing.release.set()
+        with pytest.raises(LookupError):
+            await flight.do("key", failing)
+        working = Load(result="wall")
+        working.release.set()
+        return await flight.do("key", working)
+
+    assert asyncio.run(run()) == "wall"
+
+
+def test_cancelled_starter_does_not_abort_the_load():
+    async def run():
+        flight = SingleFlight()
+        load = Load(result="wall")
+        starter = asyncio.ensure_future(flight.do("key", load))
+        await _settle()
+        waiter = asyncio.ensure_future(flight.do("key", load))
+        await _settle()
+
+        starter.cancel()
+        await _settle()
+        assert starter.cancelled()
+        assert len(flight) == 1
+
+        load.release.set()
+        return load, await waiter
+
+    load, result = asyncio.run(run())
+
+    assert result == "wall"
+    assert load.calls == 1
+
+
+def test_forget_lets_the_next_caller_start_fresh():
+    async def run():
+        flight = SingleFlight()
+        stale = Load(result="old")
+        waiter = asyncio.ensure_future(flight.do("key", stale))
+        await _settle()
+
+        flight.forget("key")
+        fresh = Load(result="new")
+        fresh.release.set()
+        result = await flight.do("key", fresh)
+
+        stale.release.set()
+        return result, await waiter, len(flight)
+
+    assert asyncio.run(run()) == ("new", "old", 0)
@@ -0,0 +1,157 @@
+"""
+Shared snapshot file: writing, mapping and stale-file fallback; no
+database needed.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+from resources.notifications import OfferWallChange
+from resources.snapshot_file import (SharedSnapshots, SnapshotMap, _micros,
+                                     write_snapshot_file)
+from resources.snapshots import offerwall_etag
+
+UPDATED_AT = datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+ROWS = [
+    ("wall-a", b'{"token":"wall-a"}', 3, _micros(UPDATED_AT)),
+    ("wall-b", '{"token":"wall-b","name":"Головна"}'.encode(), 7, 0),
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "offerwalls.snapshot")
+
+
+def _shared(path: str, refresh: float = 60.0) -> SharedSnapshots:
+    return SharedSnapshots(path, refresh=refresh, poll_interval=0.25)
+
+
+def test_round_trip(path):
+    write_snapshot_file(path, generation=4, built_from=123.5, rows=ROWS)
+
+    snapshot_map = SnapshotMap(path)
+
+    assert (snapshot_map.generation, snapshot_map.built_from) == (4, 123.5)
+    assert len(snapshot_map) == 2
+    snapshot = snapshot_map.snapshot(snapshot_map.index["wall-a"])
+    assert snapshot.body == b'{"token":"wall-a"}'
+    assert type(snapshot.body) is bytes
+    assert snapshot.etag == offerwall_etag(3)
+    assert snapshot.updated_at == UPDATED_AT
+    assert snapshot.last_modified == "Thu, 02 Jan 2025 03:04:05 GMT"
+    assert snapshot_map.snapshot(snapshot_map.index["wall-b"]).body == ROWS[1][1]
+
+
+def test_rows_feed_an_incremental_build(path):
+    write_snapshot_file(path, generation=1, built_from=1.0, rows=ROWS)
+    rows = SnapshotMap(path).rows(exclude={"wall-a"})
+    rows.append(("wall-a", b'{"token":"wall-a","v":2}', 4, 0))
+
+    write_snapshot_file(path, generation=2, built_from=2.0, rows=rows)
+    snapshot_map = SnapshotMap(path)
+
+    assert snapshot_map.snapshot(snapshot_map.index["wall-a"]).etag == '"4"'
+    assert snapshot_map.snapshot(snapshot_map.index["wall-b"]).body == ROWS[1][1]
+
+
+def test_rejects_foreign_file(path):
+    with open(path, "wb") as f:
+        f.write(bytes(64))
+
+    with pytest.raises(ValueError):
+        SnapshotMap(path)
+
+
+def test_serves_fresh_file(path):
+    write_snapshot_file(path, generation=1, built_from=time.time(), rows=ROWS)
+    shared = _shared(path)
+    shared._remap()
+
+    assert shared.get("wall-a").body == ROWS[0][1]
+    assert shared.get("unknown") is None
+    assert (shared.stats.hits, shared.stats.misses) == (1, 1)
+
+
+def test_changed_wall_falls_back_until_newer_file(path):
+    write_snapshot_file(path, generation=1, built_from=time.time(), rows=ROWS)
+    shared = _shared(path)
+    shared._remap()
+
+    shared.on_change(OfferWallChange(wall_tokens=frozenset({"wall-a"})))
+
+    assert shared.get("wall-a") is None
+    assert shared.get("wall-b") is not None
+    assert shared.stats.stale == 1
+
+    # A build that started more than one poll interval after the change
+    write_snapshot_file(path, generation=2, built_from=time.time() + 1, rows=ROWS)
+    shared._remap()
+
+    assert shared.get("wall-a") is not None
+    assert shared.stats.remaps == 2
+
+
+def test_everything_change_falls_back_for_every_wall(path):
+    write_snapshot_file(path, generation=1, built_from=time.time(), rows=ROWS)
+    shared = _shared(path)
+    shared._remap()
+
+    shared.on_change(OfferWallChange(everything=True))
+
+    assert shared.get("wall-a") is None
+    assert shared.get("wall-b") is None
+
+
+def test_old_file_is_not_served(path):
+    write_snapshot_file(path, generation=1, built_from=time.time() - 25, rows=ROWS)
+    shared = _shared(path, refresh=10.0)
+    shared._remap()
+
+    assert shared.map is not None
+    assert shared.get("wall-a") is None
+    assert shared.stats.stale == 1
+
+
+def test_unreadable_replacement_keeps_current_map(path):
+    write_snapshot_file(path, generation=1, built_from=time.time(), rows=ROWS)
+    shared = _shared(path)
+    shared._remap()
+    current = shared.map
+
+    with open(f"{path}.new", "wb") as f:
+        f.write(bytes(64))
+    os.replace(f"{path}.new", path)
+    shared._remap()
+
+    assert shared.map is current
+    assert shared.get("wall-a") is not None
+
+
+def test_incremental_build_reloads_only_changed_walls(path, monkeypatch):
+    write_snapshot_file(path, generation=1, built_from=time.time(), rows=ROWS)
+    shared = _shared(path)
+    shared._remap()
+    shared.builder = True
+    shared._full_at = None
+    shared._last_build = time.time()
+    loaded = []
+
+    async def load(tokens):
+        loaded.append(tokens)
+        return [("wall-a", b'{"token":"wall-a","v":2}', 4, 0)]
+
+    monkeypatch.setattr(shared, "_load", load)
+    shared.on_change(OfferWallChange(wall_tokens=frozenset({"wall-a"})))
+    shared._pending["wall-a"] -= 1  # settled
+
+    asyncio.run(shared.build())
+
+    assert loaded == [["wall-a"]]
+    assert shared.map.generation == 2
+    assert shared._pending == {}
+    assert shared.map.snapshot(shared.map.index["wall-a"]).etag == '"4"'
+    assert shared.map.snapshot(shared.map.index["wall-b"]).body == ROWS[1][1]
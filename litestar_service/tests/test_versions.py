@@ -0,0 +1,120 @@
+"""
+Offerwall versions follow the admin: a change published through
+``admin_panel.notifications.publish_changes`` bumps the admin's version,
+and the service copies it into ``offer_walls`` before dropping its caches.
+
+Needs Postgres for both test databases, see conftest.py.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from resources.db import Base
+from resources.models import OfferWall
+from resources.notifications import ChangeListener
+from resources.settings import settings
+from resources.versions import VersionSync
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+@pytest.fixture
+def admin_wall(admin_database):
+    from admin_panel.models import OfferWall as AdminOfferWall
+
+    wall = AdminOfferWall.objects.create(name="Versions", url=None)
+    yield wall
+    wall.delete()
+
+
+async def _with_service_wall(token: str, version: int, run):
+    # A throwaway engine: the app's pool must not hold connections bound to
+    # this event loop.
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(OfferWall),
+            # Clear of the ids test_query_budget.py seeds explicitly
+            [
+                {
+                    "id": 10_000,
+                    "token": token,
+                    "name": "Versions",
+                    "url": None,
+                    "version": version,
+                }
+            ],
+        )
+    try:
+        await run(engine)
+        async with engine.connect() as conn:
+            row = await conn.execute(
+                select(OfferWall.version, OfferWall.updated_at).where(
+                    OfferWall.token == token
+                )
+            )
+            return row.one()
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(OfferWall).where(OfferWall.token == token))
+        await engine.dispose()
+
+
+def _publish(wall_tokens: list[str]) -> None:
+    from django.db import connection
+
+    from admin_panel.notifications import publish_changes
+
+    try:
+        publish_changes(wall_tokens=wall_tokens)
+    finally:
+        connection.close()
+
+
+def test_notification_copies_admin_version(
+    service_database, admin_database, admin_wall
+):
+    token = str(admin_wall.token)
+
+    async def run(engine):
+        sync = VersionSync(admin_database, engine)
+        listener = ChangeListener(
+            dsn=admin_database, channel=settings.OFFERWALL_CHANGES_CHANNEL
+        )
+        synced = asyncio.Event()
+        listener.subscribe(lambda change: synced.set())
+        listener.subscribe(sync.on_change, first=True)
+        await sync.start()
+        await listener.start()
+        try:
+            await asyncio.to_thread(_publish, [token])
+            await asyncio.wait_for(synced.wait(), timeout=5)
+        finally:
+            await listener.stop()
+            await sync.stop()
+
+    version, updated_at = asyncio.run(_with_service_wall(token, 1, run))
+
+    admin_wall.refresh_from_db()
+    assert admin_wall.version > 1
+    assert (version, updated_at) == (admin_wall.version, admin_wall.updated_at)
+
+
+def test_sync_never_moves_version_back(service_database, admin_database, admin_wall):
+    token = str(admin_wall.token)
+    synced = []
+
+    async def run(engine):
+        sync = VersionSync(admin_database, engine)
+        await sync.start()
+        try:
+            synced.append(await sync.sync(None))
+        finally:
+            await sync.stop()
+
+    version, _ = asyncio.run(_with_service_wall(token, 1000, run))
+
+    assert version == 1000
+    assert synced == [0]
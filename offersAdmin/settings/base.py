@@ -93,6 +93,21 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process local memory by default; set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION to a
+# directory to share entries between gunicorn workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "offers-admin"),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -127,6 +142,20 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
 }
 
+# Postgres NOTIFY channel the Litestar service listens on for cache invalidation
+OFFERWALL_CHANGES_CHANNEL = os.getenv("OFFERWALL_CHANGES_CHANNEL", "offerwall_changes")
+# Seconds a serialized offerwall stays cached; entries are keyed by the wall's
+# data version, so edits never serve stale data and old entries just expire.
+OFFERWALL_CACHE_TIMEOUT = int(os.getenv("OFFERWALL_CACHE_TIMEOUT", "300"))
+# Directory that receives pre-rendered offerwall JSON for nginx (see
+# admin_panel/publishing.py); publishing is off when unset.
+OFFERWALL_PUBLISH_ROOT = os.getenv("OFFERWALL_PUBLISH_ROOT") or None
+# Private directory for uploaded CSV files waiting for an import worker
+# (``manage.py process_import_jobs``); not served by nginx, unlike MEDIA_ROOT.
+OFFER_IMPORT_ROOT = os.getenv("OFFER_IMPORT_ROOT") or os.path.join(BASE_DIR, "imports")
+# Maximum number of tokens accepted by POST /api/offerwalls/batch/
+OFFERWALL_BATCH_MAX_TOKENS = int(os.getenv("OFFERWALL_BATCH_MAX_TOKENS", "100"))
+
 CORS_ALLOW_ALL_ORIGINS = True
 CSRF_TRUSTED_ORIGINS = ["https://localhost", "https://mb30host.online"]
 
@@ -149,6 +178,14 @@ STATIC_URL = "static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Widths of the resized offer image variants (see admin_panel/images.py)
+OFFER_IMAGE_WIDTHS = [
+    int(width) for width in os.getenv("OFFER_IMAGE_WIDTHS", "96,192,384").split(",")
+]
+# Threads resizing and encoding uploaded offer images
+OFFER_IMAGE_WORKERS = int(
+    os.getenv("OFFER_IMAGE_WORKERS") or min(4, os.cpu_count() or 1)
+)
 DATA_UPLOAD_MAX_NUMBER_FILES = 300
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field